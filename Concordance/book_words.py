@@ -0,0 +1,87 @@
+"""
+This module works out the words of a single book from the concordance instead
+of storing them with the book summary. Books are contiguous runs of verse
+ordinals and every posting in the concordance is sorted, so the verses a word
+is in within one book are the slice of its postings between the book's first
+ordinal and the first ordinal after it, found with two binary searches.
+
+The book summaries used to hold a words_count and words_list for every book,
+which was the whole concordance a second time. Now they only hold the number
+of chapters and verses, and the counts and postings of a book are sliced out
+of the concordance when they are looked up.
+"""
+
+
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+def book_slice(postings, start: int, end: int) -> tuple[int, int]:
+    """
+    Returns the indexes of the postings from the first one at or after start
+    up to the first one at or after end.
+    """
+    first = bisect_left(postings, start)
+    return first, bisect_left(postings, end, first)
+
+
+class BookWords(Mapping):
+    """
+    A read-only dictionary of word: number of times it occurs in one book,
+    like the words_count of the old book summaries. Looking up a word slices
+    its postings, and the words of the whole book are only found the first
+    time it is iterated over.
+    """
+    def __init__(self, concordance, verse_table, book: str):
+        self.__concordance = concordance
+        self.__start, self.__end = verse_table.book_range(book)
+        self.__words = None
+
+    def postings(self, word: str):
+        """
+        Returns the verse ordinals of every occurrence of the word in the
+        book, like the words_list of the old book summaries. Raises KeyError
+        if the word isn't in the book.
+        """
+        postings = self.__concordance[word]
+        first, last = book_slice(postings, self.__start, self.__end)
+        if first == last:
+            raise KeyError(word)
+        return postings[first:last]
+
+    def __getitem__(self, word):
+        if self.__words is not None:
+            return self.__words[word]
+        postings = self.__concordance[word]
+        first, last = book_slice(postings, self.__start, self.__end)
+        if first == last:
+            raise KeyError(word)
+        return last - first
+
+    def __contains__(self, word):
+        try:
+            self[word]
+        except KeyError:
+            return False
+        return True
+
+    def words(self) -> dict:
+        """
+        Returns word: count for every word in the book, in the order of the
+        concordance.
+        """
+        if self.__words is None:
+            start, end = self.__start, self.__end
+            words = {}
+            for word, postings in self.__concordance.items():
+                first, last = book_slice(postings, start, end)
+                if first != last:
+                    words[word] = last - first
+            self.__words = words
+        return self.__words
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def __len__(self):
+        return len(self.words())
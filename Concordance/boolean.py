@@ -0,0 +1,140 @@
+"""
+This module runs boolean queries over the concordance, like
+faith AND works NOT law. The query is parsed into the usual precedence, from
+loosest to tightest:
+
+    OR          verses with either side
+    AND, NOT    verses with both sides, or the left side without the right;
+                two terms next to each other are joined by AND
+    NOT x       every verse without x
+    NEAR        a NEAR/n b, see Concordance.phrase
+    terms       a word, a "quoted phrase" or a query in parentheses
+
+The operators have to be in capitals since and, or and not are also words in
+the Bible. Every term is turned into sorted unique verse ordinals and they are
+combined with the functions in Concordance.postings, so nothing is looked up
+verse by verse.
+"""
+
+
+from array import array
+from collections import deque
+import re
+from Concordance.phrase import PhraseSearch, NEAR_DISTANCE, tokenize
+from Concordance.postings import unique, intersect, union, difference
+
+
+QUERY_TOKEN = re.compile(r'"[^"]*"?|[()]|[\w-]+(?:/\d+)?')
+NEAR_TOKEN = re.compile(r'NEAR(?:/(\d+))?')
+OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def is_query(query: str) -> bool:
+    """
+    Checks if the query is more than a single word, so that it has to be run
+    by the query engine rather than looked up in the concordance.
+    """
+    tokens = QUERY_TOKEN.findall(query)
+    return len(tokens) > 1 or any(token.startswith('"') for token in tokens)
+
+
+class BooleanSearch:
+    def __init__(self, concordance, phrase_search: PhraseSearch, total_verses: int):
+        """
+        Takes the concordance of word: [verse ordinals], the phrase search for
+        quoted phrases and NEAR, and the number of verses in the Bible for NOT
+        on its own.
+        """
+        self.concordance = concordance
+        self.phrase_search = phrase_search
+        self.total_verses = total_verses
+
+    def word(self, word: str) -> array:
+        """
+        Returns the sorted unique verse ordinals of a word.
+        """
+        word = word.lower()
+        if word not in self.concordance:
+            return array('I')
+        return unique(self.concordance[word])
+
+    def search(self, query: str) -> array:
+        """
+        Runs the query and returns the sorted unique verse ordinals that match.
+        Raises ValueError if the query can't be parsed.
+        """
+        tokens = deque(QUERY_TOKEN.findall(query))
+        if not tokens:
+            raise ValueError('The query is empty')
+        result = self._parse_or(tokens)
+        if tokens:
+            raise ValueError(f"Unexpected {tokens[0]!r} in the query")
+        return result
+
+    def _parse_or(self, tokens: deque) -> array:
+        result = self._parse_and(tokens)
+        while tokens and tokens[0] == 'OR':
+            tokens.popleft()
+            result = union(result, self._parse_and(tokens))
+        return result
+
+    def _parse_and(self, tokens: deque) -> array:
+        result = self._parse_not(tokens)
+        while tokens and tokens[0] not in ('OR', ')'):
+            operator = tokens[0]
+            if operator == 'AND':
+                tokens.popleft()
+                operator = tokens[0] if tokens else None
+            if operator == 'NOT':
+                # a NOT b and a AND NOT b both subtract b rather than
+                # intersecting a with every verse that doesn't hold b
+                tokens.popleft()
+                result = difference(result, self._parse_not(tokens))
+            else:
+                result = intersect(result, self._parse_not(tokens))
+        return result
+
+    def _parse_not(self, tokens: deque) -> array:
+        if tokens and tokens[0] == 'NOT':
+            tokens.popleft()
+            every_verse = array('I', range(self.total_verses))
+            return difference(every_verse, self._parse_not(tokens))
+        return self._parse_near(tokens)
+
+    def _parse_near(self, tokens: deque) -> array:
+        first = tokens[0] if tokens else None
+        if len(tokens) < 2 or not NEAR_TOKEN.fullmatch(tokens[1]):
+            return self._parse_term(tokens)
+
+        near = NEAR_TOKEN.fullmatch(tokens[1])
+        second = tokens[2] if len(tokens) > 2 else None
+        if not self._is_word(first) or not self._is_word(second):
+            raise ValueError('NEAR has to be between two words')
+        for _ in range(3):
+            tokens.popleft()
+        distance = NEAR_DISTANCE if near.group(1) is None else int(near.group(1))
+        return self.phrase_search.near(first.lower(), second.lower(), distance)
+
+    def _parse_term(self, tokens: deque) -> array:
+        if not tokens:
+            raise ValueError('The query ended before a word')
+        token = tokens.popleft()
+        if token == '(':
+            result = self._parse_or(tokens)
+            if not tokens or tokens.popleft() != ')':
+                raise ValueError('A parenthesis in the query is not closed')
+            return result
+        if token.startswith('"'):
+            return self.phrase_search.phrase(tokenize(token))
+        if not self._is_word(token):
+            raise ValueError(f"Expected a word but found {token!r}")
+        return self.word(token)
+
+    @staticmethod
+    def _is_word(token) -> bool:
+        """
+        Checks if the token is a plain word rather than an operator, a phrase
+        or a parenthesis.
+        """
+        return token is not None and token not in OPERATORS and token not in ('(', ')') \
+            and not token.startswith('"') and NEAR_TOKEN.fullmatch(token) is None
@@ -0,0 +1,500 @@
+"""
+This module reads and writes the binary corpus file. The corpus holds the same
+information as the three json files (the verse text, the chapter and verse
+numbers for every book, and the concordance) in one compact file that can be
+opened with mmap. Nothing is parsed when the file is opened; verses and
+concordance entries are only decoded when they are looked up, so opening the
+corpus takes milliseconds and every process that opens it shares the same
+pages from the operating system's page cache.
+
+The file is laid out like this (all integers are little-endian):
+
+    header      magic b'KJVC', format version (u16), number of sections (u16)
+    sections    one (tag, offset, length) entry per section
+    BOOK        the book names as utf-8 joined by newlines
+    BSTR        u32 first verse ordinal of every book plus the total verses
+    BIDX        u8 book index of every verse ordinal
+    CHAP        u16 chapter number of every verse ordinal
+    VERS        u16 verse number of every verse ordinal
+    TOFF        u32 byte offset of every verse in TEXT plus the end offset
+    TEXT        all the verse text as one utf-8 buffer, see
+                Concordance.verse_texts
+    WORD        keyed table of word: [verse ordinals]
+    POSN        u16 position within its verse of every value in WORD
+    FUZZ        keyed table of deleted string: [positions in the WORD keys],
+                see Concordance.fuzzy
+    STEM        keyed table of stem: [verse ordinals of all its forms]
+    SFRM        keyed table of stem: [positions of its forms in the WORD keys],
+                see Concordance.stems
+    TRGM        keyed table of trigram: [verse ordinals], see Concordance.trigram
+    VLEN        u16 number of words in every verse ordinal
+    DFRQ        u32 number of verses each word in WORD is in, in key order
+
+The BSTR, BIDX, CHAP and VERS sections are the arrays of the verse table, see
+Concordance.verses. Sections are found by their tag, so a section added later
+(like POSN) is simply missing from older files.
+"""
+
+
+from array import array
+from collections.abc import Mapping
+from Concordance.verses import VerseTable
+from Concordance.verse_texts import VerseTexts
+from Concordance.fuzzy import build_fuzzy_table
+from Concordance.ranking import build_verse_lengths, build_document_frequencies
+from pathlib import Path
+import mmap
+import os
+import struct
+import sys
+
+
+CORPUS_NAME = 'kjv_corpus.bin'
+MAGIC = b'KJVC'
+VERSION = 2
+
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<4sQQ')
+_TABLE_HEADER = struct.Struct('<II')
+
+
+def _pack_table(table: dict) -> bytes:
+    """
+    Packs a dictionary of str: [unsigned ints] into a keyed table section.
+    The keys are sorted by their utf-8 bytes so that the reader can binary
+    search them without decoding anything.
+    """
+    encoded = sorted((key.encode('UTF-8'), values) for key, values in table.items())
+    key_offsets = array('I', [0])
+    value_offsets = array('I', [0])
+    values = array('I')
+    keys = bytearray()
+    for key, key_values in encoded:
+        keys.extend(key)
+        key_offsets.append(len(keys))
+        values.extend(key_values)
+        value_offsets.append(len(values))
+    return b''.join([_TABLE_HEADER.pack(len(encoded), len(values)),
+                     key_offsets.tobytes(), value_offsets.tobytes(),
+                     values.tobytes(), bytes(keys)])
+
+
+def _pack_parallel(table: dict, parallel: dict, typecode: str) -> bytes:
+    """
+    Packs the values of a dictionary with the same keys as a keyed table, in
+    the same order as the table's values, so that the value at an offset in
+    the table lines up with the value at the same offset here.
+    """
+    values = array(typecode)
+    for _, key in sorted((key.encode('UTF-8'), key) for key in table):
+        if len(parallel[key]) != len(table[key]):
+            raise ValueError(f"The values for {key!r} don't line up with the table")
+        values.extend(parallel[key])
+    return values.tobytes()
+
+
+def write_corpus(path, kjv_bible: dict, concordance: dict, positions=None, stems=None,
+                 trigrams=None):
+    """
+    Writes the bible dictionary and the concordance of word: [verse ordinals]
+    to a single corpus file, along with the fuzzy index of the words and the
+    verse lengths and document frequencies used for ranking. If positions of
+    word: [position within the verse] is given it is written alongside the
+    concordance, and if stems of (stem: [verse ordinals], stem: [forms]) is
+    given the stem index is written too, as is the trigram index of trigram:
+    [verse ordinals] if it is given. The file is written to a temporary path
+    and then moved into place so a process that already has the old corpus
+    mapped is never left reading a truncated file.
+    """
+    if sys.byteorder != 'little':
+        raise ValueError('The corpus file can only be written on a little-endian machine')
+
+    table = VerseTable.from_bible(kjv_bible)
+    verse_texts = VerseTexts.from_bible(kjv_bible)
+
+    sections = [(b'BOOK', '\n'.join(table.books).encode('UTF-8')),
+                (b'BSTR', table.book_starts.tobytes()),
+                (b'BIDX', table.book_indexes.tobytes()),
+                (b'CHAP', table.chapters.tobytes()),
+                (b'VERS', table.verses.tobytes()),
+                (b'TOFF', verse_texts.offsets.tobytes()),
+                (b'TEXT', verse_texts.text),
+                (b'WORD', _pack_table(concordance))]
+    if positions is not None:
+        sections.append((b'POSN', _pack_parallel(concordance, positions, 'H')))
+    words = sorted(concordance)
+    sections.append((b'FUZZ', _pack_table(build_fuzzy_table(words))))
+    frequencies = build_document_frequencies(concordance)
+    sections.append((b'VLEN', build_verse_lengths(kjv_bible).tobytes()))
+    sections.append((b'DFRQ', array('I', [frequencies[word] for word in words]).tobytes()))
+    if stems is not None:
+        stem_postings, stem_forms = stems
+        word_positions = {word: position for position, word in enumerate(words)}
+        sections.append((b'STEM', _pack_table(stem_postings)))
+        sections.append((b'SFRM', _pack_table({
+            word_stem: [word_positions[word] for word in forms]
+            for word_stem, forms in stem_forms.items()})))
+    if trigrams is not None:
+        sections.append((b'TRGM', _pack_table(trigrams)))
+
+    # Every section starts on an 8 byte boundary so the arrays can be cast
+    # directly from the mapped file.
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    entries = []
+    for tag, data in sections:
+        offset += -offset % 8
+        entries.append((tag, offset, len(data)))
+        offset += len(data)
+
+    temp_path = Path(f"{path}.tmp")
+    with open(temp_path, 'wb') as corpus_file:
+        corpus_file.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        for entry in entries:
+            corpus_file.write(_SECTION.pack(*entry))
+        for (tag, data), (_, start, _) in zip(sections, entries):
+            corpus_file.write(b'\0' * (start - corpus_file.tell()))
+            corpus_file.write(data)
+    os.replace(temp_path, path)
+
+
+class KeyedTable(Mapping):
+    """
+    A read-only dictionary of str: [unsigned ints] backed by a keyed table
+    section. Lookups binary search the sorted keys and return a memoryview
+    of the values without copying them out of the file.
+    """
+    def __init__(self, buffer: memoryview):
+        self.__length, values_length = _TABLE_HEADER.unpack_from(buffer)
+        position = _TABLE_HEADER.size
+        self.__key_offsets = buffer[position:position + 4 * (self.__length + 1)].cast('I')
+        position += 4 * (self.__length + 1)
+        self.__value_offsets = buffer[position:position + 4 * (self.__length + 1)].cast('I')
+        position += 4 * (self.__length + 1)
+        self.__values = buffer[position:position + 4 * values_length].cast('I')
+        position += 4 * values_length
+        self.__keys = buffer[position:]
+
+    def _key_bytes(self, index: int) -> bytes:
+        """
+        Returns the utf-8 bytes of the key at the index.
+        """
+        return bytes(self.__keys[self.__key_offsets[index]:self.__key_offsets[index + 1]])
+
+    def key_at(self, index: int) -> str:
+        """
+        Returns the key at the index.
+        """
+        return self._key_bytes(index).decode('UTF-8')
+
+    def index(self, key: str) -> int:
+        """
+        Returns the position of the key in the sorted keys or -1 if the key is
+        not in the table.
+        """
+        target = key.encode('UTF-8')
+        low, high = 0, self.__length
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.__length and self._key_bytes(low) == target:
+            return low
+        return -1
+
+    def value_range(self, index: int) -> tuple[int, int]:
+        """
+        Returns the offsets of the first and after the last value of the key
+        at the index.
+        """
+        return self.__value_offsets[index], self.__value_offsets[index + 1]
+
+    def values_at(self, index: int) -> memoryview:
+        """
+        Returns the values for the key at the index.
+        """
+        return self.__values[self.__value_offsets[index]:self.__value_offsets[index + 1]]
+
+    def __getitem__(self, key):
+        index = self.index(key) if isinstance(key, str) else -1
+        if index == -1:
+            raise KeyError(key)
+        return self.values_at(index)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self.index(key) != -1
+
+    def __iter__(self):
+        for index in range(self.__length):
+            yield self.key_at(index)
+
+    def __len__(self):
+        return self.__length
+
+    def items(self):
+        """
+        Yields (key, values) pairs in key order without searching for each
+        key.
+        """
+        for index in range(self.__length):
+            yield self.key_at(index), self.values_at(index)
+
+
+class ParallelTable(Mapping):
+    """
+    A read-only dictionary with the same keys as a keyed table whose values
+    are stored in a separate section at the same offsets as the table's.
+    """
+    def __init__(self, table: KeyedTable, values: memoryview):
+        self.__table = table
+        self.__values = values
+
+    def __getitem__(self, key):
+        index = self.__table.index(key) if isinstance(key, str) else -1
+        if index == -1:
+            raise KeyError(key)
+        start, end = self.__table.value_range(index)
+        return self.__values[start:end]
+
+    def __contains__(self, key):
+        return key in self.__table
+
+    def __iter__(self):
+        return iter(self.__table)
+
+    def __len__(self):
+        return len(self.__table)
+
+
+class KeyCounts(Mapping):
+    """
+    A read-only dictionary with the same keys as a keyed table and one count
+    for each key, stored in key order.
+    """
+    def __init__(self, table: KeyedTable, counts: memoryview):
+        self.__table = table
+        self.__counts = counts
+
+    def __getitem__(self, key):
+        index = self.__table.index(key) if isinstance(key, str) else -1
+        if index == -1:
+            raise KeyError(key)
+        return self.__counts[index]
+
+    def __contains__(self, key):
+        return key in self.__table
+
+    def __iter__(self):
+        return iter(self.__table)
+
+    def __len__(self):
+        return len(self.__table)
+
+
+class WordsTable(Mapping):
+    """
+    A read-only dictionary of str: [words] backed by a keyed table whose
+    values are positions in the WORD keys.
+    """
+    def __init__(self, table: KeyedTable, words: KeyedTable):
+        self.__table = table
+        self.__words = words
+
+    def __getitem__(self, key):
+        return [self.__words.key_at(position) for position in self.__table[key]]
+
+    def __contains__(self, key):
+        return key in self.__table
+
+    def __iter__(self):
+        return iter(self.__table)
+
+    def __len__(self):
+        return len(self.__table)
+
+
+class BookView(Mapping):
+    """
+    A read-only dictionary of 'chapter:verse': 'verse_text' for one book that
+    reads the verse text only when it is looked up.
+    """
+    def __init__(self, table: VerseTable, verse_texts, book: str):
+        self.__table = table
+        self.__verse_texts = verse_texts
+        self.__book = book
+        self.__start, self.__end = table.book_range(book)
+
+    def __getitem__(self, key):
+        chapter, _, verse = str(key).partition(':')
+        if not (chapter.isdigit() and verse.isdigit()):
+            raise KeyError(key)
+        ordinal = self.__table.ordinal(self.__book, int(chapter), int(verse))
+        if ordinal == -1:
+            raise KeyError(key)
+        return self.__verse_texts[ordinal]
+
+    def __iter__(self):
+        for ordinal in range(self.__start, self.__end):
+            yield self.__table.key(ordinal)
+
+    def values(self):
+        """
+        Returns the text of every verse of the book, read as one slice.
+        """
+        return self.__verse_texts[self.__start:self.__end]
+
+    def items(self):
+        """
+        Returns the ('chapter:verse', verse_text) pairs of the book, with the
+        text read as one slice.
+        """
+        return list(zip(self, self.values()))
+
+    def __len__(self):
+        return self.__end - self.__start
+
+
+class BibleView(Mapping):
+    """
+    A read-only dictionary of book_name: BookView that looks like the
+    kjv_bible dictionary, over the verse table and the list of verse text in
+    ordinal order.
+    """
+    def __init__(self, table: VerseTable, verse_texts):
+        self.__table = table
+        self.__verse_texts = verse_texts
+
+    def __getitem__(self, book):
+        return BookView(self.__table, self.__verse_texts, book)
+
+    def __iter__(self):
+        return iter(self.__table.books)
+
+    def __len__(self):
+        return len(self.__table.books)
+
+
+class SummaryView(Mapping):
+    """
+    A read-only dictionary of book_name: {'number_chapters': int,
+    'chapter_verses': {chapter: number_verses}} that is worked out from the
+    chapter and verse numbers of the verse table the first time a book is
+    looked up.
+    """
+    def __init__(self, table: VerseTable):
+        self.__table = table
+        self.__summaries = {}
+
+    def __getitem__(self, book):
+        if book not in self.__summaries:
+            table = self.__table
+            start, end = table.book_range(book)
+            chapter_verses = {}
+            for ordinal in range(start, end):
+                chapter = str(table.chapters[ordinal])
+                chapter_verses[chapter] = max(chapter_verses.get(chapter, 0),
+                                              table.verses[ordinal])
+            number_chapters = table.chapters[end - 1] if end > start else 0
+            self.__summaries[book] = {'number_chapters': number_chapters,
+                                      'chapter_verses': chapter_verses}
+        return self.__summaries[book]
+
+    def __iter__(self):
+        return iter(self.__table.books)
+
+    def __len__(self):
+        return len(self.__table.books)
+
+
+class Corpus:
+    def __init__(self, path):
+        """
+        Opens the corpus file and maps it into memory. Only the header and the
+        book names are read here, everything else is read from the mapping
+        when it is needed.
+        """
+        if sys.byteorder != 'little':
+            raise ValueError('The corpus file can only be read on a little-endian machine')
+
+        self.path = Path(path)
+        with open(self.path, 'rb') as corpus_file:
+            self.__mmap = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__buffer = memoryview(self.__mmap)
+
+        magic, version, number_sections = _HEADER.unpack_from(self.__buffer)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} corpus file")
+
+        self.__sections = {}
+        for index in range(number_sections):
+            tag, offset, length = _SECTION.unpack_from(self.__buffer,
+                                                       _HEADER.size + index * _SECTION.size)
+            self.__sections[tag] = self.__buffer[offset:offset + length]
+
+        books = bytes(self.__sections[b'BOOK']).decode('UTF-8').split('\n')
+        self.table = VerseTable(books,
+                                self.__sections[b'BSTR'].cast('I'),
+                                self.__sections[b'BIDX'].cast('B'),
+                                self.__sections[b'CHAP'].cast('H'),
+                                self.__sections[b'VERS'].cast('H'))
+        self.verse_texts = VerseTexts(self.__sections[b'TOFF'].cast('I'),
+                                      self.__sections[b'TEXT'])
+
+        self.bible = BibleView(self.table, self.verse_texts)
+        self.summary = SummaryView(self.table)
+        self.concordance = KeyedTable(self.__sections[b'WORD'])
+        # The counts and prefixes come from the postings and phrases from the
+        # positions
+        self.word_counts = self.phrases = self.prefixes = None
+        self.positions = None
+        if b'POSN' in self.__sections:
+            self.positions = ParallelTable(self.concordance,
+                                           self.__sections[b'POSN'].cast('H'))
+        self.fuzzy = None
+        if b'FUZZ' in self.__sections:
+            self.fuzzy = KeyedTable(self.__sections[b'FUZZ'])
+        self.stem_postings = self.stem_forms = None
+        if b'STEM' in self.__sections and b'SFRM' in self.__sections:
+            self.stem_postings = KeyedTable(self.__sections[b'STEM'])
+            self.stem_forms = WordsTable(KeyedTable(self.__sections[b'SFRM']),
+                                         self.concordance)
+        self.trigrams = None
+        if b'TRGM' in self.__sections:
+            self.trigrams = KeyedTable(self.__sections[b'TRGM'])
+        self.verse_lengths = self.document_frequencies = None
+        if b'VLEN' in self.__sections and b'DFRQ' in self.__sections:
+            self.verse_lengths = self.__sections[b'VLEN'].cast('H')
+            self.document_frequencies = KeyCounts(self.concordance,
+                                                  self.__sections[b'DFRQ'].cast('I'))
+
+    def verse_text(self, ordinal: int) -> str:
+        """
+        Decodes the text of the verse ordinal.
+        """
+        return self.verse_texts[ordinal]
+
+    def close(self):
+        """
+        Drops the views of the mapping and closes it. If verses or postings
+        returned by the corpus are still referenced somewhere the mapping stays
+        open until they are garbage collected.
+        """
+        self.__sections = {}
+        self.table = None
+        self.bible = self.verse_texts = self.summary = self.concordance = None
+        self.word_counts = self.phrases = self.prefixes = None
+        self.positions = self.fuzzy = self.stem_postings = self.stem_forms = None
+        self.trigrams = self.verse_lengths = self.document_frequencies = None
+        self.__buffer = None
+        try:
+            self.__mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
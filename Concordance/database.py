@@ -0,0 +1,379 @@
+"""
+This module writes and reads the SQLite database, the other way of storing the
+dictionaries besides the json files and the binary corpus. The database holds
+the same information as the corpus in one file that any SQLite client can
+query:
+
+    meta        key: value pairs, the format version and the arrays of the
+                verse table and the verse lengths as little-endian blobs
+    books       book_index, name, first_ordinal, end_ordinal
+    verses      ordinal (the rowid), book_index, chapter, verse, text
+    words       word, count, verses (the number of verses it is in) and the
+                postings, its verse ordinals as a blob of u32. The words are
+                the primary key, so completions are a range query over them
+    stems       stem, postings of all its forms and the forms joined by
+                newlines, see Concordance.stems
+    verses_fts  an FTS5 index of the verse text, which answers phrase and
+                NEAR queries without the word positions
+
+Opening the database only reads the verse table, so it is as quick as opening
+the corpus and the pages of the file are only read (and cached by SQLite and
+the operating system) as they are looked up. Database has the same
+attributes as Corpus, so the loader and everything that reads the
+dictionaries work the same with either. The fuzzy and trigram indexes aren't
+stored, so they are built in memory the first time they are needed, as they
+are for the json files.
+"""
+
+
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from Concordance.corpus import BibleView, SummaryView
+from Concordance.verses import VerseTable
+from Concordance.phrase import NEAR_DISTANCE, NEAR_PATTERN, tokenize
+from Concordance.ranking import build_verse_lengths, build_document_frequencies
+import os
+import sqlite3
+import sys
+import threading
+
+
+DATABASE_NAME = 'kjv_concordance.sqlite'
+VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;
+CREATE TABLE books (book_index INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,
+                    first_ordinal INTEGER NOT NULL, end_ordinal INTEGER NOT NULL);
+CREATE TABLE verses (ordinal INTEGER PRIMARY KEY, book_index INTEGER NOT NULL,
+                     chapter INTEGER NOT NULL, verse INTEGER NOT NULL, text TEXT NOT NULL);
+CREATE TABLE words (word TEXT PRIMARY KEY, count INTEGER NOT NULL, verses INTEGER NOT NULL,
+                    postings BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE stems (stem TEXT PRIMARY KEY, postings BLOB NOT NULL,
+                    forms TEXT NOT NULL) WITHOUT ROWID;
+CREATE VIRTUAL TABLE verses_fts USING fts5(
+    text, content='verses', content_rowid='ordinal',
+    tokenize="unicode61 remove_diacritics 0 tokenchars '-_'");
+"""
+
+
+def _postings(blob: bytes) -> array:
+    """
+    Turns a postings blob back into an array of verse ordinals.
+    """
+    postings = array('I')
+    postings.frombytes(blob)
+    return postings
+
+
+def write_database(path, kjv_bible: dict, concordance: dict, stems=None):
+    """
+    Writes the bible dictionary and the concordance of word: [verse ordinals]
+    to a SQLite database along with the verse lengths and document
+    frequencies used for ranking, and the stem index of (stem: [verse
+    ordinals], stem: [forms]) if it is given. The FTS5 index is built from the
+    verses table once it is filled. Like the corpus, the database is written to
+    a temporary path and then moved into place.
+    """
+    if sys.byteorder != 'little':
+        raise ValueError('The database can only be written on a little-endian machine')
+
+    table = VerseTable.from_bible(kjv_bible)
+    frequencies = build_document_frequencies(concordance)
+    temp_path = Path(f"{path}.tmp")
+    temp_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript(_SCHEMA)
+        meta = {'version': VERSION,
+                'book_starts': table.book_starts.tobytes(),
+                'book_indexes': table.book_indexes.tobytes(),
+                'chapters': table.chapters.tobytes(),
+                'verses': table.verses.tobytes(),
+                'verse_lengths': build_verse_lengths(kjv_bible).tobytes()}
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', meta.items())
+        connection.executemany('INSERT INTO books VALUES (?, ?, ?, ?)', (
+            (index, book, table.book_starts[index], table.book_starts[index + 1])
+            for index, book in enumerate(table.books)))
+        connection.executemany('INSERT INTO verses VALUES (?, ?, ?, ?, ?)', (
+            (ordinal, table.book_indexes[ordinal], table.chapters[ordinal],
+             table.verses[ordinal], verse_text)
+            for ordinal, verse_text in enumerate(
+                verse_text for book_dict in kjv_bible.values()
+                for verse_text in book_dict.values())))
+        connection.executemany('INSERT INTO words VALUES (?, ?, ?, ?)', (
+            (word, len(postings), frequencies[word], array('I', postings).tobytes())
+            for word, postings in concordance.items()))
+        if stems is not None:
+            stem_postings, stem_forms = stems
+            connection.executemany('INSERT INTO stems VALUES (?, ?, ?)', (
+                (word_stem, array('I', postings).tobytes(), '\n'.join(stem_forms[word_stem]))
+                for word_stem, postings in stem_postings.items()))
+        connection.execute("INSERT INTO verses_fts(verses_fts) VALUES ('rebuild')")
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_path, path)
+
+
+class ColumnTable(Mapping):
+    """
+    A read-only dictionary of key: value for one column of a table, keyed by
+    the table's primary key. convert turns the stored value into the one that
+    is returned, like a postings blob into an array.
+    """
+    def __init__(self, database, table: str, key: str, column: str, convert=None):
+        self.__database = database
+        self.__select = f"SELECT {column} FROM {table} WHERE {key} = ?"
+        self.__keys = f"SELECT {key} FROM {table} ORDER BY {key}"
+        self.__items = f"SELECT {key}, {column} FROM {table} ORDER BY {key}"
+        self.__length = f"SELECT count(*) FROM {table}"
+        self.__convert = convert
+
+    def __getitem__(self, key):
+        rows = self.__database.fetch(self.__select, (key,)) if isinstance(key, str) else ()
+        if not rows:
+            raise KeyError(key)
+        value = rows[0][0]
+        return value if self.__convert is None else self.__convert(value)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and bool(self.__database.fetch(self.__select, (key,)))
+
+    def __iter__(self):
+        return iter([key for key, in self.__database.fetch(self.__keys)])
+
+    def __len__(self):
+        return self.__database.fetch(self.__length)[0][0]
+
+    def items(self):
+        """
+        Returns every key and value from one query rather than a query per key.
+        """
+        convert = self.__convert or (lambda value: value)
+        return [(key, convert(value)) for key, value in self.__database.fetch(self.__items)]
+
+
+class VerseRows(Sequence):
+    """
+    A read-only list of the verse text in ordinal order. A slice of it is read
+    with one query over the range of ordinals.
+    """
+    def __init__(self, database):
+        self.__database = database
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self.__database.verse_text(range(len(self))[index])
+        first, end, step = index.indices(len(self))
+        if step != 1:
+            return [self[ordinal] for ordinal in range(first, end, step)]
+        if end <= first:
+            return []
+        return [verse_text for verse_text, in self.__database.fetch(
+            'SELECT text FROM verses WHERE ordinal >= ? AND ordinal < ? ORDER BY ordinal',
+            (first, end))]
+
+    def __len__(self):
+        return len(self.__database.table)
+
+
+class FullTextSearch:
+    def __init__(self, database):
+        """
+        Answers phrase and NEAR queries with the FTS5 index of the database.
+        It has the same methods as PhraseSearch so the boolean search can use
+        either one.
+        """
+        self.__database = database
+
+    def match(self, expression: str) -> array:
+        """
+        Returns the sorted verse ordinals that match an FTS5 query expression.
+        """
+        return array('I', [ordinal for ordinal, in self.__database.fetch(
+            'SELECT rowid FROM verses_fts WHERE verses_fts MATCH ? ORDER BY rowid',
+            (expression,))])
+
+    def phrase(self, words: list[str]) -> array:
+        """
+        Returns the sorted verse ordinals where the words occur one after the
+        other.
+        """
+        if not words:
+            return array('I')
+        return self.match('"' + ' '.join(words) + '"')
+
+    def near(self, first: str, second: str, distance=NEAR_DISTANCE) -> array:
+        """
+        Returns the sorted verse ordinals where the two words occur at most
+        distance words apart in either order. FTS5 counts the words between
+        the two, which is one less than the distance. It also lets one
+        occurrence of a word be near itself, so for a word near itself the
+        verses it is in are read and the gaps between its occurrences checked.
+        """
+        if distance < 1:
+            return array('I')
+        if first != second:
+            return self.match(f'NEAR("{first}" "{second}", {distance - 1})')
+        matches = array('I')
+        for ordinal, verse_text in self.__database.fetch(
+                'SELECT rowid, text FROM verses_fts WHERE verses_fts MATCH ? ORDER BY rowid',
+                (f'"{first}"',)):
+            positions = [position for position, word in enumerate(tokenize(verse_text))
+                         if word == first]
+            if any(later - earlier <= distance
+                   for earlier, later in zip(positions, positions[1:])):
+                matches.append(ordinal)
+        return matches
+
+    def search(self, query: str) -> array:
+        """
+        Runs a quoted phrase or NEAR query and returns the sorted verse
+        ordinals that match.
+        """
+        match = NEAR_PATTERN.fullmatch(query)
+        if match is not None:
+            first, distance, second = match.groups()
+            distance = NEAR_DISTANCE if distance is None else int(distance)
+            return self.near(first.lower(), second.lower(), distance)
+        return self.phrase(tokenize(query))
+
+
+class WordPrefixes:
+    def __init__(self, database):
+        """
+        Answers type-ahead completions with a range query over the words
+        table, whose primary key keeps the words sorted, so the vocabulary
+        isn't read into memory. It has the same methods as PrefixIndex so the
+        query service can use either one.
+        """
+        self.__database = database
+        self.__words = self.__counts = None
+
+    def complete(self, prefix: str, limit=10) -> list[tuple[str, int]]:
+        """
+        Returns up to limit (word, count) pairs for the words that start with
+        the prefix, most common first and alphabetical when the counts tie.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        return self.__database.fetch(
+            'SELECT word, count FROM words WHERE word >= ? AND word < ? '
+            'ORDER BY count DESC, word LIMIT ?', (prefix, prefix + '\U0010ffff', limit))
+
+    def count(self, word: str) -> int:
+        """
+        Returns the number of occurrences of the word or 0 if it isn't in the
+        concordance.
+        """
+        rows = self.__database.fetch('SELECT count FROM words WHERE word = ?', (word,))
+        return rows[0][0] if rows else 0
+
+    def __load(self):
+        pairs = self.__database.fetch('SELECT word, count FROM words ORDER BY word')
+        self.__words = [word for word, _ in pairs]
+        self.__counts = array('I', [count for _, count in pairs])
+
+    @property
+    def words(self) -> list[str]:
+        """
+        Returns the sorted vocabulary. Only the fuzzy index needs it, so it is
+        read from the database the first time it is asked for.
+        """
+        if self.__words is None:
+            self.__load()
+        return self.__words
+
+    @property
+    def counts(self) -> array:
+        """
+        Returns the counts of the words in the same order as words.
+        """
+        if self.__counts is None:
+            self.__load()
+        return self.__counts
+
+
+class Database:
+    def __init__(self, path):
+        """
+        Opens the database read-only and reads the verse table. Everything
+        else is queried when it is looked up. The connection is shared by the
+        GUI, the thread that loads the concordance and the server's pool of
+        search threads, so every query goes through fetch, which holds a lock.
+        """
+        if sys.byteorder != 'little':
+            raise ValueError('The database can only be read on a little-endian machine')
+
+        self.path = Path(path)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                                            check_same_thread=False)
+        try:
+            meta = dict(self.fetch('SELECT key, value FROM meta'))
+        except sqlite3.DatabaseError:
+            meta = {}
+        if meta.get('version') != VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} concordance database")
+
+        def unpack(typecode, key):
+            values = array(typecode)
+            values.frombytes(meta[key])
+            return values
+
+        books = [name for name, in self.fetch('SELECT name FROM books ORDER BY book_index')]
+        self.table = VerseTable(books, unpack('I', 'book_starts'), unpack('B', 'book_indexes'),
+                                unpack('H', 'chapters'), unpack('H', 'verses'))
+
+        self.verse_texts = VerseRows(self)
+        self.bible = BibleView(self.table, self.verse_texts)
+        self.summary = SummaryView(self.table)
+        self.concordance = ColumnTable(self, 'words', 'word', 'postings', _postings)
+        self.word_counts = ColumnTable(self, 'words', 'word', 'count')
+        self.phrases = FullTextSearch(self)
+        self.prefixes = WordPrefixes(self)
+        self.positions = self.fuzzy = self.trigrams = None
+        self.stem_postings = self.stem_forms = None
+        if self.fetch('SELECT 1 FROM stems LIMIT 1'):
+            self.stem_postings = ColumnTable(self, 'stems', 'stem', 'postings', _postings)
+            self.stem_forms = ColumnTable(self, 'stems', 'stem', 'forms',
+                                          lambda forms: forms.split('\n'))
+        self.verse_lengths = unpack('H', 'verse_lengths')
+        self.document_frequencies = ColumnTable(self, 'words', 'word', 'verses')
+
+    def fetch(self, sql: str, parameters=()) -> list[tuple]:
+        """
+        Runs a query and returns all of its rows.
+        """
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+    def verse_text(self, ordinal: int) -> str:
+        """
+        Returns the text of the verse ordinal.
+        """
+        rows = self.fetch('SELECT text FROM verses WHERE ordinal = ?', (ordinal,))
+        if not rows:
+            raise IndexError(ordinal)
+        return rows[0][0]
+
+    def close(self):
+        """
+        Drops the views of the database and closes the connection.
+        """
+        self.table = self.bible = self.verse_texts = self.summary = None
+        self.concordance = self.word_counts = self.phrases = self.prefixes = None
+        self.positions = self.fuzzy = self.trigrams = None
+        self.stem_postings = self.stem_forms = None
+        self.verse_lengths = self.document_frequencies = None
+        self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
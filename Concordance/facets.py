@@ -0,0 +1,98 @@
+"""
+This module splits the results of a search by book and testament. The results
+of every search but a ranked one are sorted verse ordinals, and the verses of a
+book are a contiguous run of ordinals starting at its entry in the verse
+table's book_starts. So one binary search per book finds where each book's
+results begin, and the count of a book is the difference between two of those
+offsets. Filtering the results to a book or testament is then a slice of them.
+This takes a few microseconds however many results there are, instead of
+turning every result into a reference and reading the book name out of it.
+
+Ranked results are in score order and there are at most TOP_K of them, so
+they are simply counted and filtered one by one.
+"""
+
+
+from array import array
+from bisect import bisect_left
+from Concordance.book_words import book_slice
+
+
+def facet_offsets(results, book_starts) -> array:
+    """
+    Returns the index of the first result in each book, followed by the number
+    of results, so the results of book i are from offsets[i] up to
+    offsets[i + 1]. results must be sorted.
+    """
+    offsets = array('I')
+    first = 0
+    for start in book_starts:
+        first = bisect_left(results, start, first)
+        offsets.append(first)
+    return offsets
+
+
+class Facets:
+    def __init__(self, results, verse_table, testaments: dict, scores=None):
+        """
+        Takes the verse ordinals of a search, the verse table, the testaments
+        dictionary of testament: list of book names and the scores if the
+        search was ranked.
+        """
+        self.results = results
+        self.scores = scores
+        self.verse_table = verse_table
+        self.testaments_dict = testaments
+        ordered = results if scores is None else sorted(results)
+        self.offsets = facet_offsets(ordered, verse_table.book_starts)
+
+    def count(self, index: int) -> int:
+        """
+        Returns the number of results in the book at that index.
+        """
+        return self.offsets[index + 1] - self.offsets[index]
+
+    def books(self) -> list[tuple[str, int]]:
+        """
+        Returns the (book, count) pairs of the books that have results, in
+        the order of the Bible.
+        """
+        return [(book, self.count(index)) for index, book in enumerate(self.verse_table.books)
+                if self.offsets[index + 1] != self.offsets[index]]
+
+    def testaments(self) -> dict:
+        """
+        Returns testament: number of results for both testaments.
+        """
+        books = self.verse_table.books
+        counts = {}
+        for testament, names in self.testaments_dict.items():
+            first, end = books.index(names[0]), books.index(names[-1]) + 1
+            counts[testament] = self.offsets[end] - self.offsets[first]
+        return counts
+
+    def ordinal_range(self, name: str) -> tuple[int, int]:
+        """
+        Returns the first ordinal of a book or testament and the first ordinal
+        after it. Raises KeyError if there is no book or testament by that name.
+        """
+        if name in self.testaments_dict:
+            names = self.testaments_dict[name]
+            return (self.verse_table.book_range(names[0])[0],
+                    self.verse_table.book_range(names[-1])[1])
+        return self.verse_table.book_range(name)
+
+    def filter(self, name=None) -> tuple:
+        """
+        Returns the results and scores that are in a book or testament, or all
+        of them if name is None. Unranked results are sliced without copying
+        when they are a memoryview of the corpus.
+        """
+        if name is None:
+            return self.results, self.scores
+        start, end = self.ordinal_range(name)
+        if self.scores is None:
+            first, last = book_slice(self.results, start, end)
+            return self.results[first:last], None
+        kept = [index for index, ordinal in enumerate(self.results) if start <= ordinal < end]
+        return [self.results[index] for index in kept], [self.scores[index] for index in kept]
@@ -0,0 +1,125 @@
+"""
+This module suggests words from the concordance for a word that isn't in it,
+using a symmetric delete index. Every word is stored under each string that is
+left after deleting up to two of its letters (one for words of four letters or
+fewer). Two words within two edits of each other always share one of those
+strings, so the candidates for a misspelled word are found by deleting up to
+two letters from it and looking each result up in the index. Only the few
+candidates that come back have their real edit distance worked out.
+
+The index maps each deleted string to the positions of its words in the sorted
+vocabulary. It is written to the corpus file when the dictionaries are created
+and built in memory the first time it is needed otherwise.
+"""
+
+
+from array import array
+
+
+MAX_DISTANCE = 2
+SHORT_WORD = 4
+
+
+def deletes(word: str, distance: int) -> set[str]:
+    """
+    Returns the word and every string left after deleting up to distance
+    letters from it.
+    """
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {string[:index] + string[index + 1:]
+                    for string in frontier for index in range(len(string))}
+        result |= frontier
+    return result
+
+
+def index_distance(word: str) -> int:
+    """
+    Returns how many letters are deleted from a word in the index. Short words
+    only get one so they don't suggest every other short word.
+    """
+    return 1 if len(word) <= SHORT_WORD else MAX_DISTANCE
+
+
+def build_fuzzy_table(words) -> dict:
+    """
+    Returns the symmetric delete index of deleted string: array of positions
+    in words, which must be the sorted vocabulary.
+    """
+    table = {}
+    for position, word in enumerate(words):
+        for string in deletes(word, index_distance(word)):
+            if string not in table:
+                table[string] = array('I')
+            table[string].append(position)
+    return table
+
+
+def edit_distance(first: str, second: str) -> int:
+    """
+    Returns the number of letters that have to be inserted, deleted, changed
+    or swapped with the next letter to turn one word into the other.
+    """
+    two_rows_back = None
+    last_row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            row[j] = min(last_row[j] + 1, row[j - 1] + 1, last_row[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] \
+                    and first[i - 2] == second[j - 1]:
+                row[j] = min(row[j], two_rows_back[j - 2] + 1)
+        two_rows_back, last_row = last_row, row
+    return last_row[-1]
+
+
+class FuzzyIndex:
+    def __init__(self, prefix_index, table=None):
+        """
+        Takes the prefix index for its sorted vocabulary and occurrence counts
+        and the symmetric delete index from the corpus, if it has one. The
+        vocabulary is only read from the prefix index when it is first used.
+        """
+        self.__prefix_index = prefix_index
+        self.__table = table
+
+    @property
+    def words(self) -> list[str]:
+        return self.__prefix_index.words
+
+    @property
+    def counts(self) -> array:
+        return self.__prefix_index.counts
+
+    @property
+    def table(self):
+        if self.__table is None:
+            self.__table = build_fuzzy_table(self.words)
+        return self.__table
+
+    def suggest(self, word: str, limit=5) -> list[tuple[str, int, int]]:
+        """
+        Returns up to limit (word, distance, count) suggestions for the word,
+        closest first and then most common first.
+        """
+        word = word.strip().lower()
+        if not word:
+            return []
+        candidates = set()
+        for string in deletes(word, MAX_DISTANCE):
+            positions = self.table.get(string)
+            if positions is not None:
+                candidates.update(positions)
+
+        suggestions = []
+        for position in candidates:
+            candidate = self.words[position]
+            if candidate == word:
+                continue
+            distance = edit_distance(word, candidate)
+            if distance <= MAX_DISTANCE:
+                suggestions.append((distance, -self.counts[position], candidate))
+        suggestions.sort()
+        return [(candidate, distance, -count) for distance, count, candidate in suggestions[:limit]]
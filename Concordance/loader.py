@@ -0,0 +1,176 @@
+"""
+This module loads the dictionaries the app needs. They are stored in one of
+three ways, the backends: the binary corpus file, which is opened with mmap
+and read lazily, the SQLite database, which is queried as things are looked
+up, and the json files, which are read into dictionaries. open_storage opens
+the corpus or the database, and the rest of this module reads through
+whichever one it returns the same way, since both have the same attributes.
+Loading is split in two so the app can show verses before the concordance is
+ready: load_bible reads the text and load_concordance reads the concordance
+and search indexes. Either way the concordance maps each word to a sorted
+array of verse ordinals that the verse table turns into references, and the
+positions of each word within its verses line up with those ordinals.
+
+The search indexes that are stored are returned in a dictionary of name:
+index. An index that isn't stored is None and is built in memory by the
+search that uses it the first time it is needed. verse_texts, the text of
+every verse in ordinal order, is always there, see Concordance.verse_texts.
+The database adds three: word_counts, the number of times each word occurs,
+phrases, which runs phrase and NEAR queries with its full text index instead
+of the word positions, and prefixes, which completes words with a range query
+instead of a sorted list of every word.
+"""
+
+
+import json
+from array import array
+from pathlib import Path
+from Concordance.corpus import Corpus, BibleView, SummaryView, CORPUS_NAME
+from Concordance.database import Database, DATABASE_NAME
+from Concordance.verses import VerseTable
+from Concordance.verse_texts import VerseTexts
+from Concordance.phrase import LazyPositions
+
+
+BACKENDS = ('corpus', 'sqlite', 'json')
+
+
+def create_testaments(books) -> dict:
+    """
+    Splits the list of book names into the Old and New Testament.
+    """
+    books = list(books)
+    index = books.index('Matthew')
+    return {'Old Testament': books[:index], 'New Testament': books[index:]}
+
+
+def dictionaries_exist(directory) -> bool:
+    """
+    Checks if the corpus file, the database or the json concordance exists in
+    the directory.
+    """
+    return any(Path.exists(Path.joinpath(directory, name))
+               for name in (CORPUS_NAME, DATABASE_NAME, 'concordance.json'))
+
+
+def convert_concordance(concordance: dict, verse_table: VerseTable) -> dict:
+    """
+    Converts the concordance read from json to word: array of verse ordinals.
+    Concordances written before verse ordinals were used hold "Book c:v"
+    strings, so those are converted with the verse table.
+    """
+    converted = {}
+    for word, verses in concordance.items():
+        if verses and isinstance(verses[0], str):
+            verses = [verse_table.parse_reference(verse) for verse in verses]
+        converted[word] = array('I', verses)
+    return converted
+
+
+def open_corpus(directory):
+    """
+    Opens the corpus file in the directory, or returns None if there isn't one.
+    """
+    corpus_path = Path.joinpath(directory, CORPUS_NAME)
+    return Corpus(corpus_path) if Path.exists(corpus_path) else None
+
+
+def open_database(directory):
+    """
+    Opens the database in the directory, or returns None if there isn't one.
+    """
+    database_path = Path.joinpath(directory, DATABASE_NAME)
+    return Database(database_path) if Path.exists(database_path) else None
+
+
+def open_storage(directory, backend=None):
+    """
+    Opens the corpus or the database in the directory, or returns None for the
+    json files. backend is one of BACKENDS, and if it is None the first of
+    them that is in the directory is used. Raises ValueError for an unknown
+    backend and FileNotFoundError if the one asked for isn't there.
+    """
+    if backend is None:
+        return open_corpus(directory) or open_database(directory)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == 'json':
+        return None
+    storage = open_corpus(directory) if backend == 'corpus' else open_database(directory)
+    if storage is None:
+        name = CORPUS_NAME if backend == 'corpus' else DATABASE_NAME
+        raise FileNotFoundError(f"There is no {name} in {directory}")
+    return storage
+
+
+def load_bible(directory, storage=None) -> tuple:
+    """
+    Returns what is needed to show verses: the bible and summary
+    dictionaries, the testaments dictionary, the verse table and the list of
+    verse text in ordinal order. From the corpus or database these are all
+    views of the file. From the json files only kjv_bible.json is read, its
+    verse text is packed into one buffer that the bible dictionary is a view
+    of, and the chapters and verses of each book are worked out from the
+    verse table, so this is quick either way.
+    """
+    if storage is not None:
+        return (storage.bible, storage.summary, create_testaments(storage.table.books),
+                storage.table, storage.verse_texts)
+
+    # Read the bible json and convert to dictionary
+    bible_path = Path.joinpath(directory, 'kjv_bible.json')
+    with open(bible_path, 'r') as bible_file:
+        bible = json.load(bible_file)
+
+    verse_table = VerseTable.from_bible(bible)
+    verse_texts = VerseTexts.from_bible(bible)
+    return (BibleView(verse_table, verse_texts), SummaryView(verse_table),
+            create_testaments(bible.keys()), verse_table, verse_texts)
+
+
+def load_concordance(directory, bible, verse_table, storage=None) -> tuple:
+    """
+    Returns the concordance and the search indexes. This is the slow part of
+    loading the json files, so the app does it in the background.
+    """
+    if storage is not None:
+        positions = storage.positions
+        if positions is None and storage.phrases is None:
+            positions = LazyPositions(storage.bible)
+        stems = None
+        if storage.stem_postings is not None:
+            stems = (storage.stem_postings, storage.stem_forms)
+        indexes = {'positions': positions, 'fuzzy': storage.fuzzy, 'stems': stems,
+                   'trigrams': storage.trigrams, 'verse_lengths': storage.verse_lengths,
+                   'document_frequencies': storage.document_frequencies,
+                   'verse_texts': storage.verse_texts, 'word_counts': storage.word_counts,
+                   'phrases': storage.phrases, 'prefixes': storage.prefixes}
+        return storage.concordance, indexes
+
+    # Read the concordance and convert to dictionary
+    concordance_path = Path.joinpath(directory, 'concordance.json')
+    with open(concordance_path, 'r') as concordance_file:
+        concordance = json.load(concordance_file)
+
+    concordance = convert_concordance(concordance, verse_table)
+    indexes = {'positions': LazyPositions(bible), 'fuzzy': None, 'stems': None,
+               'trigrams': None, 'verse_lengths': None, 'document_frequencies': None,
+               'verse_texts': None}
+    return concordance, indexes
+
+
+def load_dictionaries(directory=Path.cwd(), backend=None) -> tuple:
+    """
+    Returns the bible, summary and concordance dictionaries, the testaments
+    dictionary, the verse table and the search indexes from the backend (see
+    open_storage). The corpus file or database is used when it exists so that
+    nothing has to be parsed at startup. The json files don't hold the word
+    positions, so they are worked out from the verse text the first time a
+    phrase is searched for.
+    """
+    storage = open_storage(directory, backend)
+    bible, summary, testaments, verse_table, verse_texts = load_bible(directory, storage)
+    concordance, indexes = load_concordance(directory, bible, verse_table, storage)
+    if verse_texts is not None:
+        indexes['verse_texts'] = verse_texts
+    return bible, summary, concordance, testaments, verse_table, indexes
@@ -0,0 +1,175 @@
+"""
+This module searches for phrases and for words near each other. Every entry in
+a word's postings has a matching entry in its positions that says where in the
+verse that occurrence is, so a phrase is found by taking the rarest word of the
+phrase and checking, with a binary search of the other words' postings, that
+each of them is in the same verse at the right position. No verse text is read
+at query time.
+
+Queries are either a phrase in double quotes, like "grace of God", or two
+words joined by NEAR, like love NEAR/3 neighbour, which finds the verses where
+the words are at most that many words apart (10 if no distance is given).
+"""
+
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+import re
+from ScrapeText.bible_summaries import WORD_PATTERN
+
+
+NEAR_DISTANCE = 10
+NEAR_PATTERN = re.compile(r'\s*([\w-]+)\s+NEAR(?:/(\d+))?\s+([\w-]+)\s*')
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lower case words the same way the concordance was built.
+    """
+    return [word.lower() for word in WORD_PATTERN.findall(text)]
+
+
+def is_phrase_query(query: str) -> bool:
+    """
+    Checks if the query is a quoted phrase or a NEAR query rather than a word.
+    """
+    return query.strip().startswith('"') or NEAR_PATTERN.fullmatch(query) is not None
+
+
+def build_positions(kjv_bible) -> dict:
+    """
+    Returns word: array of the position of each occurrence within its verse by
+    reading the verses in order. The positions line up with the concordance
+    because it was built from the verses in the same order.
+    """
+    positions = {}
+    for book_dict in kjv_bible.values():
+        for verse_text in book_dict.values():
+            for position, word in enumerate(tokenize(verse_text)):
+                if word not in positions:
+                    positions[word] = array('H')
+                positions[word].append(position)
+    return positions
+
+
+class LazyPositions(Mapping):
+    """
+    The word positions for dictionaries that were saved without them, like
+    the json files. The positions are worked out from the verse text the first
+    time any of them is needed.
+    """
+    def __init__(self, kjv_bible):
+        self.__kjv_bible = kjv_bible
+        self.__positions = None
+
+    def _positions(self) -> dict:
+        if self.__positions is None:
+            self.__positions = build_positions(self.__kjv_bible)
+        return self.__positions
+
+    def __getitem__(self, word):
+        return self._positions()[word]
+
+    def __iter__(self):
+        return iter(self._positions())
+
+    def __len__(self):
+        return len(self._positions())
+
+
+class PhraseSearch:
+    def __init__(self, concordance, positions):
+        """
+        Takes the concordance of word: [verse ordinals] and the positions of
+        word: [position within the verse] that line up with it.
+        """
+        self.concordance = concordance
+        self.positions = positions
+
+    def occurrences(self, word: str):
+        """
+        Returns the verse ordinals and positions of the word or None if the
+        word isn't in the concordance.
+        """
+        if word not in self.concordance:
+            return None
+        return self.concordance[word], self.positions[word]
+
+    @staticmethod
+    def _find(postings, positions, ordinal: int, low: int, high: int) -> bool:
+        """
+        Checks if the occurrences hold the verse ordinal with a position
+        between low and high.
+        """
+        index = bisect_left(postings, ordinal)
+        while index < len(postings) and postings[index] == ordinal:
+            if low <= positions[index] <= high:
+                return True
+            index += 1
+        return False
+
+    def phrase(self, words: list[str]) -> array:
+        """
+        Returns the sorted verse ordinals where the words occur one after the
+        other.
+        """
+        terms = []
+        for offset, word in enumerate(words):
+            occurrences = self.occurrences(word)
+            if occurrences is None:
+                return array('I')
+            terms.append((len(occurrences[0]), offset, occurrences))
+        if not terms:
+            return array('I')
+
+        terms.sort(key=lambda term: term[0])
+        _, anchor_offset, (anchor_postings, anchor_positions) = terms[0]
+        matches = array('I')
+        for ordinal, position in zip(anchor_postings, anchor_positions):
+            start = position - anchor_offset
+            if start < 0 or (matches and matches[-1] == ordinal):
+                continue
+            if all(self._find(postings, positions, ordinal, start + offset, start + offset)
+                   for _, offset, (postings, positions) in terms[1:]):
+                matches.append(ordinal)
+        return matches
+
+    def near(self, first: str, second: str, distance=NEAR_DISTANCE) -> array:
+        """
+        Returns the sorted verse ordinals where the two words occur at most
+        distance words apart in either order.
+        """
+        first_occurrences = self.occurrences(first)
+        second_occurrences = self.occurrences(second)
+        if first_occurrences is None or second_occurrences is None:
+            return array('I')
+        if len(second_occurrences[0]) < len(first_occurrences[0]):
+            first_occurrences, second_occurrences = second_occurrences, first_occurrences
+
+        postings, positions = second_occurrences
+        matches = array('I')
+        for ordinal, position in zip(*first_occurrences):
+            if matches and matches[-1] == ordinal:
+                continue
+            if first == second:
+                found = self._find(postings, positions, ordinal, position - distance, position - 1) \
+                    or self._find(postings, positions, ordinal, position + 1, position + distance)
+            else:
+                found = self._find(postings, positions, ordinal,
+                                   position - distance, position + distance)
+            if found:
+                matches.append(ordinal)
+        return matches
+
+    def search(self, query: str) -> array:
+        """
+        Runs a quoted phrase or NEAR query and returns the sorted verse
+        ordinals that match.
+        """
+        match = NEAR_PATTERN.fullmatch(query)
+        if match is not None:
+            first, distance, second = match.groups()
+            distance = NEAR_DISTANCE if distance is None else int(distance)
+            return self.near(first.lower(), second.lower(), distance)
+        return self.phrase(tokenize(query))
@@ -0,0 +1,94 @@
+"""
+This module combines postings, the sorted arrays of verse ordinals in the
+concordance. A word's postings hold one ordinal for every time it occurs, so
+they are first made unique and then intersected, merged or subtracted as
+sorted sequences; the results are always sorted arrays of unique ordinals.
+
+When one side is much shorter than the other the shorter side is walked and
+the position in the longer side is found by galloping: probing 1, 2, 4, 8...
+entries ahead and then binary searching the last gap, so most of the longer
+side is skipped. When both sides are about the same size every entry has to
+be looked at anyway, so a single linear pass is made instead.
+"""
+
+
+from array import array
+from bisect import bisect_left
+from itertools import chain
+
+
+# One side has to be this many times longer than the other before it's
+# quicker to gallop through it than to make a linear pass
+GALLOP_RATIO = 8
+
+
+def unique(postings) -> array:
+    """
+    Returns the distinct ordinals of sorted postings in order.
+    """
+    return array('I', dict.fromkeys(postings))
+
+
+def gallop(postings, target: int, low=0, high=None) -> int:
+    """
+    Returns the first index from low on whose ordinal is not less than the
+    target, the same as bisect_left, by searching ahead in steps that double
+    in size. Finding an ordinal near low only takes a few comparisons.
+    """
+    if high is None:
+        high = len(postings)
+    step = 1
+    while low + step < high and postings[low + step] < target:
+        low += step
+        step *= 2
+    return bisect_left(postings, target, low, min(low + step + 1, high))
+
+
+def intersect(first, second) -> array:
+    """
+    Returns the ordinals that are in both sorted unique postings.
+    """
+    shorter, longer = sorted((first, second), key=len)
+    if not shorter:
+        return array('I')
+    if len(longer) < GALLOP_RATIO * len(shorter):
+        shorter_set = set(shorter)
+        return array('I', [ordinal for ordinal in longer if ordinal in shorter_set])
+
+    result = array('I')
+    index = 0
+    for ordinal in shorter:
+        index = gallop(longer, ordinal, index)
+        if index == len(longer):
+            break
+        if longer[index] == ordinal:
+            result.append(ordinal)
+    return result
+
+
+def union(first, second) -> array:
+    """
+    Returns the ordinals that are in either sorted unique postings. Sorting
+    two sorted runs only merges them, so this is a single linear pass.
+    """
+    return array('I', dict.fromkeys(sorted(chain(first, second))))
+
+
+def difference(first, second) -> array:
+    """
+    Returns the ordinals of the first sorted unique postings that are not in
+    the second.
+    """
+    if not first or not second:
+        return array('I', first)
+    if len(second) < GALLOP_RATIO * len(first):
+        second_set = set(second)
+        return array('I', [ordinal for ordinal in first if ordinal not in second_set])
+
+    result = array('I')
+    index = 0
+    for ordinal in first:
+        index = gallop(second, ordinal, index)
+        if index == len(second) or second[index] != ordinal:
+            result.append(ordinal)
+    return result
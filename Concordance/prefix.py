@@ -0,0 +1,57 @@
+"""
+This module creates the prefix index used for type-ahead search. The words of
+the concordance are kept in a sorted list next to an array of how many times
+each one occurs, so all the words that start with a prefix are found with two
+binary searches and the most common of them are picked from the counts without
+looking at the postings again.
+"""
+
+
+from array import array
+from bisect import bisect_left
+import heapq
+
+
+class PrefixIndex:
+    def __init__(self, concordance, counts=None):
+        """
+        Builds the sorted vocabulary and the counts from the concordance of
+        word: [verse ordinals]. If counts of word: number of occurrences is
+        given it is used instead, so the postings don't have to be read.
+        """
+        if counts is None:
+            counts = {word: len(verses) for word, verses in concordance.items()}
+        pairs = sorted(counts.items())
+        self.words = [word for word, _ in pairs]
+        self.counts = array('I', [count for _, count in pairs])
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """
+        Returns the first index of the words that start with the prefix and
+        the index after the last.
+        """
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\U0010ffff', start)
+        return start, end
+
+    def count(self, word: str) -> int:
+        """
+        Returns the number of occurrences of the word or 0 if it isn't in the
+        concordance.
+        """
+        index = bisect_left(self.words, word)
+        if index < len(self.words) and self.words[index] == word:
+            return self.counts[index]
+        return 0
+
+    def complete(self, prefix: str, limit=10) -> list[tuple[str, int]]:
+        """
+        Returns up to limit (word, count) pairs for the words that start with
+        the prefix, most common first and alphabetical when the counts tie.
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        start, end = self.prefix_range(prefix)
+        best = heapq.nlargest(limit, range(start, end), key=self.counts.__getitem__)
+        return [(self.words[index], self.counts[index]) for index in best]
@@ -0,0 +1,274 @@
+"""
+This module times the stages of building the dictionaries, loading them and
+the GUI callbacks. It is turned on by setting the CONCORDANCE_PROFILE
+environment variable to the directory to write the results to (1 for the
+current directory):
+
+    CONCORDANCE_PROFILE=profiles python main.py
+
+When the program exits two files are written for it: profile-<pid>.json with
+the total, mean and longest time of every stage, the time of each stage for
+every book and the list of every stage that ran, and trace-<pid>.json in the
+Chrome trace event format, which can be opened in chrome://tracing or
+https://ui.perfetto.dev to see the stages on a timeline. Setting
+CONCORDANCE_PROFILE_MEMORY=1 as well traces the allocations with tracemalloc,
+adding the bytes each stage allocated and its peak, but it makes everything
+a few times slower.
+
+Functions are timed with the profiled decorator and blocks of code with
+stage. When the variable isn't set profiled returns the function unchanged
+and stage returns a context manager that does nothing, so the timing costs
+nothing.
+
+Books are built in worker processes, which record their own stages. Running
+the work through collect returns the stages with the result, and collected
+adds them to this process's profile.
+"""
+
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+
+ENV_VARIABLE = 'CONCORDANCE_PROFILE'
+MEMORY_VARIABLE = 'CONCORDANCE_PROFILE_MEMORY'
+NULL_STAGE = nullcontext()
+
+profiler = None
+
+
+class Profiler:
+    def __init__(self, memory=False):
+        """
+        Records the stages that run. If memory is true tracemalloc is started
+        so the allocations of each stage are recorded too.
+        """
+        self.memory = memory
+        self.events = []
+        self.local = threading.local()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self) -> list:
+        """
+        Returns the stages running in this thread, innermost last.
+        """
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextmanager
+    def stage(self, name: str, category='app', **args):
+        """
+        Records the wall time of the code run in the with block. args are
+        saved with the stage, like the book it was run for.
+
+        tracemalloc only has one peak, so it is reset when a stage starts and
+        the peak of an inner stage is passed up to the stage around it when it
+        ends.
+        """
+        stack = self._stack()
+        frame = {'peak': 0}
+        if self.memory:
+            before, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            stack.pop()
+            event = {'name': name, 'category': category, 'start': start, 'duration': duration,
+                     'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args}
+            if self.memory:
+                after, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame['peak'])
+                event['allocated'] = after - before
+                event['peak'] = peak - before
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            self.events.append(event)
+
+    def summary(self) -> dict:
+        """
+        Returns the count, total, mean and longest milliseconds of every stage
+        (and the most it allocated if memory is traced), and book: stage:
+        milliseconds for the stages that were run for a book.
+        """
+        stages = {}
+        books = {}
+        for event in self.events:
+            milliseconds = event['duration'] / 1e6
+            totals = stages.setdefault(event['name'], {'count': 0, 'total_ms': 0.0,
+                                                       'max_ms': 0.0})
+            totals['count'] += 1
+            totals['total_ms'] += milliseconds
+            totals['max_ms'] = max(totals['max_ms'], milliseconds)
+            if 'peak' in event:
+                totals['max_allocated'] = max(totals.get('max_allocated', 0), event['allocated'])
+                totals['max_peak'] = max(totals.get('max_peak', 0), event['peak'])
+            book = event['args'].get('book')
+            if book is not None:
+                book_stages = books.setdefault(book, {})
+                book_stages[event['name']] = book_stages.get(event['name'], 0.0) + milliseconds
+        for totals in stages.values():
+            totals['mean_ms'] = totals['total_ms'] / totals['count']
+        return {'stages': stages, 'books': books}
+
+    def origin(self) -> int:
+        """
+        Returns the start of the first stage, which the times are counted from.
+        """
+        return min((event['start'] for event in self.events), default=0)
+
+    def to_json(self) -> dict:
+        """
+        Returns the summary and every stage with its start and duration in
+        milliseconds.
+        """
+        origin = self.origin()
+        events = []
+        for event in sorted(self.events, key=lambda event: event['start']):
+            event = dict(event)
+            event['start_ms'] = (event.pop('start') - origin) / 1e6
+            event['duration_ms'] = event.pop('duration') / 1e6
+            events.append(event)
+        return {**self.summary(), 'events': events}
+
+    def to_trace(self) -> dict:
+        """
+        Returns the stages as complete events of the Chrome trace event format,
+        with the times in microseconds.
+        """
+        origin = self.origin()
+        trace_events = []
+        for event in self.events:
+            args = dict(event['args'])
+            for key in ('allocated', 'peak'):
+                if key in event:
+                    args[key] = event[key]
+            trace_events.append({'name': event['name'], 'cat': event['category'], 'ph': 'X',
+                                 'ts': (event['start'] - origin) / 1e3,
+                                 'dur': event['duration'] / 1e3, 'pid': event['pid'],
+                                 'tid': event['tid'], 'args': args})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def write(self, directory) -> tuple[Path, Path]:
+        """
+        Writes the profile and trace files to the directory and returns their
+        paths.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        profile_path = directory / f"profile-{os.getpid()}.json"
+        trace_path = directory / f"trace-{os.getpid()}.json"
+        with open(profile_path, 'w') as profile_file:
+            json.dump(self.to_json(), profile_file, indent=1)
+        with open(trace_path, 'w') as trace_file:
+            json.dump(self.to_trace(), trace_file)
+        return profile_path, trace_path
+
+
+def enable(directory=None, memory=False) -> Profiler:
+    """
+    Starts profiling. Only the functions decorated after this are timed. If a
+    directory is given the files are written to it when this process exits.
+    """
+    global profiler
+    profiler = Profiler(memory)
+    if directory is not None:
+        pid = os.getpid()
+        current = profiler
+
+        def write_at_exit():
+            # Forked worker processes inherit this, but only the process that
+            # turned profiling on writes the files
+            if os.getpid() == pid and current.events:
+                current.write(directory)
+
+        atexit.register(write_at_exit)
+    return profiler
+
+
+def disable():
+    """
+    Stops profiling. Functions that were already decorated are still timed.
+    """
+    global profiler
+    profiler = None
+
+
+def stage(name: str, category='app', **args):
+    """
+    Returns a context manager that times the with block, or one that does
+    nothing when profiling is off.
+    """
+    if profiler is None:
+        return NULL_STAGE
+    return profiler.stage(name, category, **args)
+
+
+def profiled(name=None, category='app', args=None):
+    """
+    Decorates a function so every call is recorded as a stage, named after the
+    function unless a name is given. args is called with the function's
+    arguments and returns the dictionary saved with the stage, like
+    lambda self: {'book': self.book_name}. When profiling is off the function
+    is returned unchanged.
+    """
+    def decorate(function):
+        if profiler is None:
+            return function
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*call_args, **call_kwargs):
+            stage_args = args(*call_args, **call_kwargs) if args is not None else {}
+            with stage(stage_name, category, **stage_args):
+                return function(*call_args, **call_kwargs)
+
+        return wrapper
+    return decorate
+
+
+def collect(function, *args):
+    """
+    Calls the function and returns its result with the stages recorded while
+    it ran, which are taken out of this process's profile. Meant to be run in
+    a worker process.
+    """
+    if profiler is None:
+        return function(*args), []
+    first = len(profiler.events)
+    result = function(*args)
+    events = profiler.events[first:]
+    del profiler.events[first:]
+    return result, events
+
+
+def collected(outcome: tuple):
+    """
+    Adds the stages returned by collect to this process's profile and returns
+    the result.
+    """
+    result, events = outcome
+    if profiler is not None:
+        profiler.events.extend(events)
+    return result
+
+
+if os.environ.get(ENV_VARIABLE):
+    _directory = os.environ[ENV_VARIABLE]
+    enable(Path.cwd() if _directory.lower() in ('1', 'true', 'yes', 'on') else _directory,
+           os.environ.get(MEMORY_VARIABLE, '').lower() in ('1', 'true', 'yes', 'on'))
@@ -0,0 +1,303 @@
+"""
+This module is the query layer of the app. It holds the dictionaries and the
+search indexes and answers verse, range, word and query lookups with plain
+Python values, so the same lookups are used by the Tk GUI and by the http
+server without either one knowing about the other.
+
+Every index is only read once it is built, so one QueryService can be shared
+by any number of requests. The indexes that aren't in the corpus are built the
+first time they are used, or all at once by calling warm. The service can be
+made without the concordance so verses can be looked up while it loads, and
+it is given the concordance with set_concordance once it has.
+"""
+
+
+import re
+from pathlib import Path
+from Concordance.loader import load_dictionaries
+from Concordance.verse_texts import VerseTexts
+from Concordance.prefix import PrefixIndex
+from Concordance.phrase import PhraseSearch
+from Concordance.boolean import BooleanSearch, is_query
+from Concordance.fuzzy import FuzzyIndex
+from Concordance.stems import StemIndex
+from Concordance.trigram import TrigramIndex, parse_regex_query
+from Concordance.ranking import BM25Index, TOP_K
+from Concordance.references import ReferenceParser
+from Concordance.book_words import BookWords
+from Concordance.facets import Facets
+
+
+SUGGESTION_LIMIT = 8
+
+
+class SearchResult:
+    def __init__(self, query: str, label: str, results, message: str, scores=None,
+                 suggestions=(), error=False):
+        """
+        Holds the outcome of a search. results are the verse ordinals that were
+        found, scores their BM25 scores for a ranked search, and suggestions
+        the (word, count) pairs of close words when a word isn't found. label
+        and message are the text the GUI shows above the results. error is
+        true if the query couldn't be run, in which case message says why.
+        """
+        self.query = query
+        self.label = label
+        self.results = results
+        self.message = message
+        self.scores = scores
+        self.suggestions = list(suggestions)
+        self.error = error
+
+    def __len__(self):
+        return len(self.results)
+
+
+class QueryService:
+    def __init__(self, bible, summary, concordance, testaments, verse_table, indexes):
+        """
+        Takes the dictionaries, testaments, verse table and search indexes in
+        the order load_dictionaries returns them. concordance can be None, in
+        which case indexes only needs verse_texts and nothing can be searched
+        until set_concordance is called.
+        """
+        self.bible = bible
+        self.summary = summary
+        self.testaments = testaments
+        self.verse_table = verse_table
+        self.reference_parser = ReferenceParser(verse_table)
+        self.__verse_texts = indexes.get('verse_texts')
+        self.concordance = None
+        if concordance is not None:
+            self.set_concordance(concordance, indexes)
+
+    @property
+    def ready(self) -> bool:
+        """
+        Checks if the concordance has been given, so words can be searched.
+        """
+        return self.concordance is not None
+
+    def set_concordance(self, concordance, indexes):
+        """
+        Creates the search indexes over the concordance.
+        """
+        bible, verse_table = self.bible, self.verse_table
+        self.indexes = indexes
+        if self.__verse_texts is None:
+            self.__verse_texts = indexes.get('verse_texts')
+        self.prefix_index = indexes.get('prefixes') or PrefixIndex(concordance,
+                                                                   indexes.get('word_counts'))
+        self.fuzzy_index = FuzzyIndex(self.prefix_index, indexes['fuzzy'])
+        self.stem_index = StemIndex(concordance, *(indexes['stems'] or ()))
+        self.trigram_index = TrigramIndex(bible, verse_table, indexes['trigrams'],
+                                          self.__verse_texts)
+        self.phrase_search = indexes.get('phrases') or PhraseSearch(concordance,
+                                                                    indexes['positions'])
+        self.boolean_search = BooleanSearch(concordance, self.phrase_search, len(verse_table))
+        self.bm25_index = BM25Index(bible, concordance, indexes['verse_lengths'],
+                                    indexes['document_frequencies'])
+        self.__book_words = {}
+        self.concordance = concordance
+
+    @classmethod
+    def load(cls, directory=Path.cwd(), backend=None):
+        """
+        Loads the dictionaries from the corpus, database or json files in the
+        directory, see load_dictionaries.
+        """
+        return cls(*load_dictionaries(directory, backend))
+
+    def warm(self):
+        """
+        Builds every index that wasn't in the corpus now rather than on the
+        first search that needs it.
+        """
+        # Looking up any word builds the stem tables
+        self.fuzzy_index.table
+        self.stem_index.forms('')
+        self.trigram_index.table
+        self.bm25_index.average_length
+        self.bm25_index.document_frequencies
+        self.verse_texts
+
+    @property
+    def verse_texts(self):
+        if self.__verse_texts is None:
+            self.__verse_texts = VerseTexts.from_bible(self.bible)
+        return self.__verse_texts
+
+    def verse_text(self, ordinal: int) -> str:
+        """
+        Returns the text of the verse ordinal.
+        """
+        return self.verse_texts[ordinal]
+
+    def verses(self, first: int, end: int) -> list[dict]:
+        """
+        Returns the reference and text of the verses from ordinal first up to
+        end, taking the text as one slice.
+        """
+        return [{'reference': self.verse_table.reference(ordinal), 'text': verse_text}
+                for ordinal, verse_text in zip(range(first, end), self.verse_texts[first:end])]
+
+    def verse_dict(self, ordinal: int) -> dict:
+        """
+        Returns the reference and text of the verse ordinal.
+        """
+        return {'reference': self.verse_table.reference(ordinal), 'text': self.verse_text(ordinal)}
+
+    def ordinal(self, book: str, chapter: int, verse: int) -> int:
+        """
+        Returns the ordinal of the verse. Raises KeyError if the book doesn't
+        have that chapter and verse.
+        """
+        ordinal = self.verse_table.ordinal(book, chapter, verse)
+        if ordinal == -1:
+            raise KeyError(f"{book} {chapter}:{verse} is not in the Bible")
+        return ordinal
+
+    def verse(self, book: str, chapter: int, verse: int) -> dict:
+        """
+        Returns the reference and text of a verse. Raises KeyError if it isn't
+        in the Bible.
+        """
+        return self.verse_dict(self.ordinal(book, chapter, verse))
+
+    def verse_range(self, book: str, chapter: int, start: int, end: int,
+                    end_chapter=None) -> list[dict]:
+        """
+        Returns the reference and text of every verse from chapter:start to
+        end_chapter:end of the book, which is the same chapter if end_chapter
+        isn't given. Raises KeyError if either end isn't in the Bible and
+        ValueError if the range is backwards.
+        """
+        first = self.ordinal(book, chapter, start)
+        last = self.ordinal(book, chapter if end_chapter is None else end_chapter, end)
+        if last < first:
+            raise ValueError('The end of the range is before the start')
+        return self.verses(first, last + 1)
+
+    def passage(self, reference: str) -> list[dict]:
+        """
+        Returns the reference and text of every verse of a reference like
+        Gen 1:1-2:3 or Rom 8. Raises ValueError if the reference can't be read
+        and KeyError if it isn't in the Bible.
+        """
+        return self.verses(*self.reference_parser.parse(reference))
+
+    def complete(self, prefix: str, limit=SUGGESTION_LIMIT) -> list[tuple[str, int]]:
+        """
+        Returns the (word, count) pairs of the most common words starting with
+        the prefix.
+        """
+        return self.prefix_index.complete(prefix, limit=limit)
+
+    def book_words(self, book: str) -> BookWords:
+        """
+        Returns word: count for the words of a book, sliced from the
+        concordance. Raises KeyError if there is no such book.
+        """
+        if book not in self.__book_words:
+            self.__book_words[book] = BookWords(self.concordance, self.verse_table, book)
+        return self.__book_words[book]
+
+    def word(self, word: str, all_forms=False) -> SearchResult:
+        """
+        Looks up a single word, or every form of it when all_forms is true. If
+        it isn't found the closest words are suggested.
+        """
+        word = word.strip().lower()
+        label = f'"{word.upper()}"'
+        if all_forms and self.stem_index.forms(word):
+            results = self.stem_index.lookup(word)
+            label = ', '.join(form.upper() for form in self.stem_index.forms(word))
+            return SearchResult(word, label, results, f'{len(results)} occurrences.')
+        if word in self.concordance:
+            results = self.concordance[word]
+            return SearchResult(word, label, results, f'{len(results)} occurrences.')
+
+        suggestions = [(suggestion, count) for suggestion, _, count
+                       in self.fuzzy_index.suggest(word, limit=SUGGESTION_LIMIT)]
+        message = 'Not found. Did you mean one of these?' if suggestions else 'Not found. Try again.'
+        return SearchResult(word, label, [], message, suggestions=suggestions)
+
+    def regex(self, pattern: str, flags=0, query=None) -> SearchResult:
+        """
+        Returns the verses whose text matches the regex.
+        """
+        query = f'/{pattern}/' if query is None else query
+        try:
+            results = self.trigram_index.search(pattern, flags)
+        except re.error as error:
+            return SearchResult(query, query, [], f'Invalid regex: {error}.', error=True)
+        return SearchResult(query, query, results, self._verses_message(results))
+
+    def boolean(self, query: str) -> SearchResult:
+        """
+        Runs a boolean, phrase or NEAR query.
+        """
+        try:
+            results = self.boolean_search.search(query)
+        except ValueError as error:
+            return SearchResult(query, query, [], f'{error}.', error=True)
+        return SearchResult(query, query, results, self._verses_message(results))
+
+    def ranked(self, query: str, k=TOP_K) -> SearchResult:
+        """
+        Returns the best k verses for the words of the query, best first.
+        """
+        ranked = self.bm25_index.search(query, k)
+        results = [ordinal for ordinal, _ in ranked]
+        message = f'Top {len(results)} verses.' if results else 'Not found. Try again.'
+        return SearchResult(query, query, results, message,
+                            scores=[score for _, score in ranked])
+
+    def search(self, query: str, all_forms=False, ranked=False) -> SearchResult:
+        """
+        Runs whatever the user typed in the word search: a regex between
+        slashes, a ranked search, a query of more than one word or a single
+        word.
+        """
+        query = query.strip()
+        regex = parse_regex_query(query)
+        if regex is not None:
+            return self.regex(*regex, query=query)
+        if ranked:
+            return self.ranked(query)
+        if is_query(query):
+            return self.boolean(query)
+        return self.word(query, all_forms)
+
+    def facets(self, result: SearchResult) -> Facets:
+        """
+        Returns the counts of a search result by book and testament, which
+        can also filter the result to one of them.
+        """
+        return Facets(result.results, self.verse_table, self.testaments, result.scores)
+
+    def result_page(self, result: SearchResult, offset=0, limit=None, facets=False) -> dict:
+        """
+        Returns a search result as a dictionary with the references of the
+        results from offset to offset + limit, and their scores if it was
+        ranked. If facets is true the counts of all the results by testament
+        and book are included.
+        """
+        end = len(result) if limit is None else min(offset + limit, len(result))
+        page = {'query': result.query, 'count': len(result), 'message': result.message,
+                'offset': offset,
+                'references': [self.verse_table.reference(result.results[index])
+                               for index in range(offset, end)]}
+        if result.scores is not None:
+            page['scores'] = [round(result.scores[index], 4) for index in range(offset, end)]
+        if result.suggestions:
+            page['suggestions'] = [word for word, _ in result.suggestions]
+        if facets:
+            result_facets = self.facets(result)
+            page['facets'] = {'testaments': result_facets.testaments(),
+                              'books': dict(result_facets.books())}
+        return page
+
+    @staticmethod
+    def _verses_message(results) -> str:
+        return f'{len(results)} verses.' if len(results) else 'Not found. Try again.'
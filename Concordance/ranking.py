@@ -0,0 +1,129 @@
+"""
+This module ranks the verses for a search of several words with BM25. A verse
+scores more for each word the more times the word is in it, less for a word
+that is in a lot of verses, and less the longer the verse is compared to the
+average verse. Only the best k verses are wanted, so they are picked from the
+scores with a heap of size k instead of sorting every verse that matched.
+
+The number of words in every verse and the number of verses every word is in
+(its document frequency) are worked out when the dictionaries are created and
+stored in the corpus. For the json files they are worked out the first time a
+ranked search is made.
+
+Every word of a ranked search counts towards the score, as if they were joined
+by OR, so AND, OR, NOT and NEAR are left out and quotes are ignored.
+"""
+
+
+from array import array
+import heapq
+import math
+from Concordance.boolean import QUERY_TOKEN, OPERATORS, NEAR_TOKEN
+from ScrapeText.bible_summaries import WORD_PATTERN
+
+
+K1 = 1.2
+B = 0.75
+TOP_K = 100
+
+
+def query_words(query: str) -> list[str]:
+    """
+    Returns the lower case words of a search without the query operators.
+    """
+    return [word.lower() for token in QUERY_TOKEN.findall(query)
+            if token not in OPERATORS and NEAR_TOKEN.fullmatch(token) is None
+            for word in WORD_PATTERN.findall(token)]
+
+
+def build_verse_lengths(kjv_bible) -> array:
+    """
+    Returns the number of words in every verse in ordinal order.
+    """
+    return array('H', [len(WORD_PATTERN.findall(verse_text)) for book_dict in kjv_bible.values()
+                       for verse_text in book_dict.values()])
+
+
+def build_document_frequencies(concordance) -> dict:
+    """
+    Returns word: number of verses the word is in.
+    """
+    frequencies = {}
+    for word, verses in concordance.items():
+        count = 0
+        previous = -1
+        for ordinal in verses:
+            if ordinal != previous:
+                count += 1
+                previous = ordinal
+        frequencies[word] = count
+    return frequencies
+
+
+class BM25Index:
+    def __init__(self, bible, concordance, verse_lengths=None, document_frequencies=None):
+        """
+        Takes the bible dictionary, the concordance and the verse lengths and
+        document frequencies from the corpus, if it has them.
+        """
+        self.bible = bible
+        self.concordance = concordance
+        self.__verse_lengths = verse_lengths
+        self.__document_frequencies = document_frequencies
+        self.__average_length = None
+
+    @property
+    def verse_lengths(self):
+        if self.__verse_lengths is None:
+            self.__verse_lengths = build_verse_lengths(self.bible)
+        return self.__verse_lengths
+
+    @property
+    def document_frequencies(self):
+        if self.__document_frequencies is None:
+            self.__document_frequencies = build_document_frequencies(self.concordance)
+        return self.__document_frequencies
+
+    @property
+    def average_length(self) -> float:
+        if self.__average_length is None:
+            self.__average_length = sum(self.verse_lengths) / max(len(self.verse_lengths), 1)
+        return self.__average_length
+
+    def idf(self, word: str) -> float:
+        """
+        Returns the inverse document frequency of a word in the concordance.
+        """
+        total = len(self.verse_lengths)
+        frequency = self.document_frequencies[word]
+        return math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+
+    def scores(self, words: list[str]) -> dict:
+        """
+        Returns verse ordinal: BM25 score for every verse that holds any of the
+        words.
+        """
+        lengths = self.verse_lengths
+        length_factor = K1 * B / self.average_length
+        scores = {}
+        for word in dict.fromkeys(words):
+            if word not in self.concordance:
+                continue
+            # The postings hold one ordinal per occurrence, so counting them
+            # gives the number of times the word is in each verse
+            counts = {}
+            for ordinal in self.concordance[word]:
+                counts[ordinal] = counts.get(ordinal, 0) + 1
+            idf = self.idf(word)
+            for ordinal, count in counts.items():
+                norm = K1 * (1 - B) + length_factor * lengths[ordinal]
+                scores[ordinal] = scores.get(ordinal, 0.0) + idf * count * (K1 + 1) / (count + norm)
+        return scores
+
+    def search(self, query: str, k=TOP_K) -> list[tuple[int, float]]:
+        """
+        Returns the best k (verse ordinal, score) pairs for the words of the
+        query, highest score first and in verse order when the scores tie.
+        """
+        scores = self.scores(query_words(query))
+        return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
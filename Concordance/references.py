@@ -0,0 +1,198 @@
+"""
+This module reads references typed by a person, like Gen 1:1-2:3, Rom 8 or
+1 Cor 13:4-7, and turns them into a slice of verse ordinals. Since every verse
+of a passage is next to the one before it in ordinal order, a chapter or a
+range across chapters is always the ordinals from first up to end, and its
+text is one slice of the verse text rather than a lookup for every verse.
+
+A book can be written as its name from ShortenNames (1 Samuel, Song of
+Songs), one of the usual abbreviations (1 Sam, Ps, Mt), any start of its name
+that only one book has (Deut, Revelat) or its long name from the html
+(The First Book of Samuel). Case, dots and spaces don't matter, and 1, I and
+First all mean the same thing.
+
+The forms of a reference are:
+
+    Rom 8           the whole chapter
+    Rom 8-9         chapters 8 and 9
+    Gen 1:1         one verse
+    Gen 1:1-5       verses 1 to 5 of chapter 1
+    Gen 1:1-2:3     from 1:1 to 2:3
+    Jude 3          verse 3 of a book with only one chapter
+"""
+
+
+import re
+from ScrapeText.shorten_names import ShortenNames
+
+
+ABBREVIATIONS = {
+    'Genesis': ['gen', 'ge', 'gn'],
+    'Exodus': ['exod', 'exo', 'ex'],
+    'Leviticus': ['lev', 'le', 'lv'],
+    'Numbers': ['num', 'nu', 'nm', 'nb'],
+    'Deuteronomy': ['deut', 'dt', 'de'],
+    'Joshua': ['josh', 'jos', 'jsh'],
+    'Judges': ['judg', 'jdg', 'jg', 'jdgs'],
+    'Ruth': ['rth', 'ru'],
+    '1 Samuel': ['1sam', '1sa', '1sm', '1s'],
+    '2 Samuel': ['2sam', '2sa', '2sm', '2s'],
+    '1 Kings': ['1kgs', '1ki', '1kg', '1k'],
+    '2 Kings': ['2kgs', '2ki', '2kg', '2k'],
+    '1 Chronicles': ['1chron', '1chr', '1ch'],
+    '2 Chronicles': ['2chron', '2chr', '2ch'],
+    'Ezra': ['ezr'],
+    'Nehemiah': ['neh', 'ne'],
+    'Esther': ['esth', 'est', 'es'],
+    'Job': ['jb'],
+    'Psalms': ['ps', 'psa', 'psm', 'pss', 'psalm'],
+    'Proverbs': ['prov', 'pro', 'prv', 'pr'],
+    'Ecclesiastes': ['eccles', 'eccl', 'ecc', 'ec', 'qoh'],
+    'Song of Songs': ['song', 'sos', 'so', 'songofsolomon', 'canticles', 'cant'],
+    'Isaiah': ['isa', 'is'],
+    'Jeremiah': ['jer', 'je', 'jr'],
+    'Lamentations': ['lam', 'la'],
+    'Ezekiel': ['ezek', 'eze', 'ezk'],
+    'Daniel': ['dan', 'da', 'dn'],
+    'Hosea': ['hos', 'ho'],
+    'Joel': ['jl'],
+    'Amos': ['am'],
+    'Obadiah': ['obad', 'ob'],
+    'Jonah': ['jnh', 'jon'],
+    'Micah': ['mic', 'mc'],
+    'Nahum': ['nah', 'na'],
+    'Habakkuk': ['hab', 'hb'],
+    'Zephaniah': ['zeph', 'zep', 'zp'],
+    'Haggai': ['hag', 'hg'],
+    'Zechariah': ['zech', 'zec', 'zc'],
+    'Malachi': ['mal', 'ml'],
+    'Matthew': ['matt', 'mt'],
+    'Mark': ['mrk', 'mk', 'mr'],
+    'Luke': ['luk', 'lk'],
+    'John': ['joh', 'jhn', 'jn'],
+    'Acts': ['act', 'ac'],
+    'Romans': ['rom', 'ro', 'rm'],
+    '1 Corinthians': ['1cor', '1co'],
+    '2 Corinthians': ['2cor', '2co'],
+    'Galatians': ['gal', 'ga'],
+    'Ephesians': ['eph', 'ephes'],
+    'Philippians': ['phil', 'php'],
+    'Colossians': ['col', 'co'],
+    '1 Thessalonians': ['1thess', '1thes', '1th'],
+    '2 Thessalonians': ['2thess', '2thes', '2th'],
+    '1 Timothy': ['1tim', '1ti'],
+    '2 Timothy': ['2tim', '2ti'],
+    'Titus': ['tit', 'ti'],
+    'Philemon': ['philem', 'phlm', 'phm'],
+    'Hebrews': ['heb'],
+    'James': ['jas', 'jm'],
+    '1 Peter': ['1pet', '1pe', '1pt', '1p'],
+    '2 Peter': ['2pet', '2pe', '2pt', '2p'],
+    '1 John': ['1jn', '1jhn', '1jo', '1j'],
+    '2 John': ['2jn', '2jhn', '2jo', '2j'],
+    '3 John': ['3jn', '3jhn', '3jo', '3j'],
+    'Jude': ['jd'],
+    'Revelation': ['rev', 're', 'revelations', 'apocalypse'],
+}
+NUMBERS = {'1': '1', 'i': '1', 'first': '1', '2': '2', 'ii': '2', 'second': '2',
+           '3': '3', 'iii': '3', 'third': '3'}
+REFERENCE = re.compile(r'\s*(?P<book>.*?[^\W\d_].*?)\.?\s*(?P<chapter>\d+)'
+                       r'(?::(?P<verse>\d+))?'
+                       r'(?:\s*[-–—]\s*(?:(?P<end_chapter>\d+):)?(?P<end>\d+))?\s*')
+
+
+def normalize_book(name: str) -> str:
+    """
+    Returns the book name in lower case without dots or spaces and with the
+    number at the start written as a digit, so 'I Sam.' becomes '1sam'.
+    """
+    words = name.lower().replace('.', ' ').split()
+    if len(words) > 1 and words[0] in NUMBERS:
+        words[0] = NUMBERS[words[0]]
+    return ''.join(words)
+
+
+class ReferenceParser:
+    def __init__(self, verse_table):
+        """
+        Takes the verse table whose book names and ordinals the references are
+        turned into.
+        """
+        self.verse_table = verse_table
+        self.names = {}
+        for book in verse_table.books:
+            self.names[normalize_book(book)] = book
+        for book, abbreviations in ABBREVIATIONS.items():
+            if book in verse_table.books:
+                for abbreviation in abbreviations:
+                    self.names.setdefault(abbreviation, book)
+        self.sorted_names = sorted((normalize_book(book), book) for book in verse_table.books)
+
+    def book(self, name: str) -> str:
+        """
+        Returns the book a name refers to. Raises ValueError if no book or more
+        than one book has that name.
+        """
+        if name.strip().lower().startswith('the '):
+            name = ShortenNames(name.strip()).shorten_name()
+        key = normalize_book(name)
+        if key in self.names:
+            return self.names[key]
+        books = [book for normalized, book in self.sorted_names if normalized.startswith(key)]
+        if len(books) == 1 and key:
+            return books[0]
+        if books and key:
+            raise ValueError(f"{name.strip()} could be {', '.join(books)}")
+        raise ValueError(f"There is no book called {name.strip()}")
+
+    def _ordinal(self, book: str, chapter: int, verse: int) -> int:
+        ordinal = self.verse_table.ordinal(book, chapter, verse)
+        if ordinal == -1:
+            raise KeyError(f"{book} {chapter}:{verse} is not in the Bible")
+        return ordinal
+
+    def _chapter(self, book: str, chapter: int) -> tuple[int, int]:
+        first, end = self.verse_table.chapter_range(book, chapter)
+        if first == -1:
+            raise KeyError(f"{book} {chapter} is not in the Bible")
+        return first, end
+
+    def parse(self, reference: str) -> tuple[int, int]:
+        """
+        Returns the first ordinal of the passage and the first ordinal after
+        it. Raises ValueError if the reference can't be read, the book isn't
+        known or the passage ends before it starts, and KeyError if a chapter
+        or verse isn't in the book.
+        """
+        match = REFERENCE.fullmatch(reference)
+        if match is None:
+            raise ValueError(f"{reference.strip()} is not a reference like Gen 1:1-2:3")
+        book = self.book(match.group('book'))
+        chapter = int(match.group('chapter'))
+        verse, end_chapter, end = (None if match.group(name) is None else int(match.group(name))
+                                   for name in ('verse', 'end_chapter', 'end'))
+
+        # A book with one chapter is referred to by verse alone, like Jude 3
+        start, stop = self.verse_table.book_range(book)
+        if verse is None and self.verse_table.chapters[start] == self.verse_table.chapters[stop - 1]:
+            chapter, verse = self.verse_table.chapters[start], chapter
+            if end_chapter is None and end is not None:
+                end_chapter = chapter
+
+        if verse is None:
+            first = self._chapter(book, chapter)[0]
+        else:
+            first = self._ordinal(book, chapter, verse)
+
+        if end is None:
+            last = first if verse is not None else self._chapter(book, chapter)[1] - 1
+        elif end_chapter is not None:
+            last = self._ordinal(book, end_chapter, end)
+        elif verse is not None:
+            last = self._ordinal(book, chapter, end)
+        else:
+            last = self._chapter(book, end)[1] - 1
+
+        if last < first:
+            raise ValueError(f"{reference.strip()} ends before it starts")
+        return first, last + 1
@@ -0,0 +1,118 @@
+"""
+This module groups the archaic forms of a word under a shared stem, so that
+searching for say also finds saith, sayest and said, and believe finds
+believeth and believest. The -eth and -est endings are taken off a word and
+the result is only used as its stem if it is itself a word in the concordance,
+allowing for a dropped e (cometh, come), a doubled letter (runneth, run) or a
+y changed to i (carrieth, carry). Forms that can't be worked out that way, like
+saith, hath and doth, are looked up in a table.
+
+The stems are worked out when the dictionaries are created. Every stem with
+more than one form gets the merged postings of all its forms, so looking up a
+stem is a single postings fetch. The stem index is stored in the corpus as a
+keyed table of stem: [verse ordinals] and a keyed table of stem: [positions of
+its forms in the WORD keys].
+"""
+
+
+from array import array
+from itertools import chain
+
+
+IRREGULAR = {'saith': 'say', 'said': 'say',
+             'hath': 'have', 'hast': 'have', 'hadst': 'have',
+             'doth': 'do', 'dost': 'do', 'didst': 'do',
+             'shalt': 'shall', 'wilt': 'will', 'canst': 'can',
+             'couldst': 'could', 'wouldst': 'would', 'shouldst': 'should',
+             'spake': 'speak', 'spakest': 'speak'}
+
+# Words that end in -est but aren't a form of the word left without it
+NOT_INFLECTED = {'beast', 'digest', 'earnest', 'forest'}
+
+
+def stem(word: str, vocabulary) -> str:
+    """
+    Returns the stem of a word. vocabulary is anything that can be checked
+    with in, like the concordance.
+    """
+    if word in IRREGULAR:
+        return IRREGULAR[word]
+    if word in NOT_INFLECTED or word.endswith('tieth') or len(word) < 5 \
+            or not word.endswith(('eth', 'est')):
+        return word
+
+    base = word[:-3]
+    candidates = [base, f"{base}e"]
+    if len(base) > 2 and base[-1] == base[-2]:
+        candidates.append(base[:-1])
+    if base.endswith('i'):
+        candidates.append(f"{base[:-1]}y")
+    for candidate in candidates:
+        if candidate in vocabulary:
+            return candidate
+    return word
+
+
+def build_stem_index(concordance) -> tuple[dict, dict]:
+    """
+    Returns stem: array of verse ordinals and stem: [forms] for every stem that
+    has more than one form in the concordance, or whose only form isn't the
+    stem itself. The ordinals of a stem are the postings of its forms merged
+    in order, one for every occurrence.
+    """
+    groups = {}
+    for word in sorted(concordance):
+        groups.setdefault(stem(word, concordance), []).append(word)
+
+    postings = {}
+    forms = {}
+    for word_stem, words in groups.items():
+        if len(words) > 1 or words[0] != word_stem:
+            forms[word_stem] = words
+            postings[word_stem] = array('I', sorted(chain.from_iterable(
+                concordance[word] for word in words)))
+    return postings, forms
+
+
+class StemIndex:
+    def __init__(self, concordance, postings=None, forms=None):
+        """
+        Takes the concordance and the stem postings and forms from the corpus,
+        if it has them. Otherwise they are worked out the first time a stem is
+        looked up.
+        """
+        self.concordance = concordance
+        self.__postings = postings
+        self.__forms = forms
+
+    def _tables(self) -> tuple:
+        if self.__postings is None or self.__forms is None:
+            self.__postings, self.__forms = build_stem_index(self.concordance)
+        return self.__postings, self.__forms
+
+    def stem(self, word: str) -> str:
+        """
+        Returns the stem of a word in the concordance.
+        """
+        return stem(word.strip().lower(), self.concordance)
+
+    def forms(self, word: str) -> list[str]:
+        """
+        Returns every form in the concordance that shares the word's stem.
+        """
+        word_stem = self.stem(word)
+        forms = self._tables()[1].get(word_stem)
+        if forms is not None:
+            return list(forms)
+        return [word_stem] if word_stem in self.concordance else []
+
+    def lookup(self, word: str):
+        """
+        Returns the verse ordinals of every form of the word, one for each
+        occurrence, or an empty array if the word isn't in the concordance.
+        """
+        word_stem = self.stem(word)
+        postings = self._tables()[0].get(word_stem)
+        if postings is not None:
+            return postings
+        return self.concordance[word_stem] if word_stem in self.concordance else array('I')
@@ -0,0 +1,284 @@
+"""
+This module searches the verse text with regular expressions. Running a regex
+over all 31,102 verses is too slow to do as the user types, so a trigram index
+is used to narrow the verses down first: it maps every three letter string in
+the lower case verse text to the verses it occurs in.
+
+The regex is parsed with the re module's own parser and walked to find the
+strings that any match has to contain. \\bLord (God|of hosts)\\b has to contain
+"lord god" or "lord of hosts", so only the verses that hold every trigram of
+one of those strings are candidates, and only the candidates are checked with
+the real regex. Anything the walk can't reason about (., character classes,
+optional parts) just adds no requirement, so the candidates always include
+every verse that matches. A regex with no required strings at all, like .*,
+checks every verse.
+
+A repeat inside another repeat, like (\\w+\\s?)*, can make the re module try an
+exponential number of ways to match a verse, so those regexes are refused
+rather than left to run forever.
+
+In the word search a regex is written between slashes, like /Lord (God|of)/,
+with an i after the last slash to ignore case.
+
+The index is built when the dictionaries are created and stored in the corpus
+as a keyed table of trigram: [verse ordinals]. Otherwise it is built in memory
+the first time a regex is searched for.
+"""
+
+
+from array import array
+import re
+from Concordance.postings import intersect, union
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# The most strings a part of the regex can match before it is treated as
+# matching anything
+MAX_EXACT = 16
+REGEX_QUERY = re.compile(r'/(.+)/(i?)', re.DOTALL)
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+            getattr(sre_parse, 'POSSESSIVE_REPEAT', sre_parse.MAX_REPEAT)}
+_GROUPS = {sre_parse.SUBPATTERN, getattr(sre_parse, 'ATOMIC_GROUP', sre_parse.SUBPATTERN)}
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Returns the set of three letter strings in the lower case text.
+    """
+    text = text.lower()
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+def build_trigram_index(kjv_bible) -> dict:
+    """
+    Returns trigram: array of the sorted verse ordinals whose text holds it.
+    """
+    table = {}
+    ordinal = 0
+    for book_dict in kjv_bible.values():
+        for verse_text in book_dict.values():
+            for trigram in trigrams(verse_text):
+                if trigram not in table:
+                    table[trigram] = array('I')
+                table[trigram].append(ordinal)
+            ordinal += 1
+    return table
+
+
+def _and(queries: list):
+    """
+    Joins the queries that all have to match. None matches every verse.
+    """
+    queries = [query for query in queries if query is not None]
+    if not queries:
+        return None
+    return queries[0] if len(queries) == 1 else ('and', queries)
+
+
+def _or(queries: list):
+    """
+    Joins the queries where any one has to match.
+    """
+    if not queries or any(query is None for query in queries):
+        return None
+    return queries[0] if len(queries) == 1 else ('or', queries)
+
+
+def _exact_query(strings: set):
+    """
+    Returns the query for a match that is one of the strings: every trigram of
+    one of them.
+    """
+    return _or([_and(sorted(trigrams(string))) if len(string) >= 3 else None
+                for string in sorted(strings)])
+
+
+def _analyze(parsed) -> tuple:
+    """
+    Walks a parsed regex and returns (strings, query). strings is the set of
+    lower case strings the regex can match if there are only a few of them,
+    otherwise None. query is the trigrams every match has to contain as
+    nested ('and', [...]) and ('or', [...]) tuples of trigrams, or None if
+    anything can match.
+    """
+    exact = {''}
+    queries = []
+    for op, av in parsed:
+        if op == sre_parse.LITERAL:
+            exact = {string + chr(av).lower() for string in exact}
+            continue
+        if op == sre_parse.AT:
+            # \b, ^ and $ don't match any text
+            continue
+
+        if op in _GROUPS:
+            sub_exact, sub_query = _analyze(av[-1])
+        elif op == sre_parse.BRANCH:
+            branches = [_analyze(branch) for branch in av[1]]
+            sub_exact = None
+            if all(strings is not None for strings, _ in branches):
+                sub_exact = set().union(*(strings for strings, _ in branches))
+            sub_query = _or([query if strings is None else _exact_query(strings)
+                             for strings, query in branches])
+        elif op in _REPEATS:
+            low, high, item = av
+            item_exact, item_query = _analyze(item)
+            if low == high == 1:
+                sub_exact, sub_query = item_exact, item_query
+            else:
+                sub_exact = None
+                if low > 0:
+                    sub_query = item_query if item_exact is None else _exact_query(item_exact)
+                else:
+                    sub_query = None
+        elif op == sre_parse.IN and all(item_op == sre_parse.LITERAL for item_op, _ in av):
+            sub_exact, sub_query = {chr(item).lower() for _, item in av}, None
+        else:
+            sub_exact, sub_query = None, None
+
+        if sub_exact is not None and len(exact) * len(sub_exact) <= MAX_EXACT:
+            exact = {string + sub_string for string in exact for sub_string in sub_exact}
+            continue
+        queries.append(_exact_query(exact))
+        if sub_exact is not None and len(sub_exact) <= MAX_EXACT:
+            exact = sub_exact
+        else:
+            queries.append(sub_query if sub_exact is None else _exact_query(sub_exact))
+            exact = {''}
+
+    queries.append(_exact_query(exact))
+    if len(queries) > 1:
+        return None, _and(queries)
+    return exact, queries[0]
+
+
+def parse_regex_query(query: str):
+    """
+    Returns the (pattern, flags) of a search written as /pattern/ or
+    /pattern/i, or None if the search isn't a regex.
+    """
+    match = REGEX_QUERY.fullmatch(query.strip())
+    if match is None:
+        return None
+    return match.group(1), re.IGNORECASE if match.group(2) else 0
+
+
+def _children(op, av) -> list:
+    """
+    Returns the parts of the parsed regex inside one of its items.
+    """
+    if op in _REPEATS:
+        return [av[2]]
+    if op == sre_parse.SUBPATTERN:
+        return [av[-1]]
+    if op in _GROUPS:
+        return [av]
+    if op == sre_parse.BRANCH:
+        return av[1]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op == sre_parse.GROUPREF_EXISTS:
+        return [part for part in av[1:] if part is not None]
+    return []
+
+
+def nested_repeat(parsed, repeated=False) -> bool:
+    """
+    Checks if the parsed regex has a repeat of a varying count, like + or
+    {1,3}, inside a repeat that can match more than once, like * or {2,}.
+    An optional group like ( \\w+)? only matches once, so it can't backtrack
+    over its body again and again. repeated is true inside such a repeat.
+    """
+    for op, av in parsed:
+        if op in _REPEATS:
+            if repeated and av[0] != av[1]:
+                return True
+            if nested_repeat(av[2], repeated or av[1] > 1):
+                return True
+        elif any(nested_repeat(child, repeated) for child in _children(op, av)):
+            return True
+    return False
+
+
+def regex_query(pattern: str, flags=0):
+    """
+    Returns the trigram query that every match of the regex has to satisfy,
+    or None if the regex can match any verse. Raises re.error if the pattern
+    isn't a valid regex.
+    """
+    return _analyze(sre_parse.parse(pattern, flags))[1]
+
+
+class TrigramIndex:
+    def __init__(self, bible, verse_table, table=None, verse_texts=None):
+        """
+        Takes the bible dictionary, the verse table, the trigram table from
+        the corpus, if it has one, and the list of verse text in ordinal
+        order, if there is one, which the candidates are read from instead of
+        the bible dictionary.
+        """
+        self.bible = bible
+        self.verse_table = verse_table
+        self.__table = table
+        self.verse_texts = verse_texts
+
+    @property
+    def table(self):
+        if self.__table is None:
+            self.__table = build_trigram_index(self.bible)
+        return self.__table
+
+    def verse_text(self, ordinal: int) -> str:
+        """
+        Returns the text of the verse ordinal.
+        """
+        if self.verse_texts is not None:
+            return self.verse_texts[ordinal]
+        return self.bible[self.verse_table.book(ordinal)][self.verse_table.key(ordinal)]
+
+    def evaluate(self, query) -> array:
+        """
+        Returns the sorted verse ordinals that satisfy a trigram query.
+        """
+        if query is None:
+            return array('I', range(len(self.verse_table)))
+        if isinstance(query, str):
+            return array('I', self.table.get(query, ()))
+        operator, queries = query
+        results = [self.evaluate(sub_query) for sub_query in queries]
+        if operator == 'or':
+            result = results[0]
+            for other in results[1:]:
+                result = union(result, other)
+            return result
+
+        # Intersect the shortest first so the result shrinks as fast as it can
+        results.sort(key=len)
+        result = results[0]
+        for other in results[1:]:
+            if not result:
+                break
+            result = intersect(result, other)
+        return result
+
+    def candidates(self, pattern: str, flags=0) -> array:
+        """
+        Returns the sorted verse ordinals that could match the regex.
+        """
+        return self.evaluate(regex_query(pattern, flags))
+
+    def search(self, pattern: str, flags=0) -> array:
+        """
+        Returns the sorted verse ordinals whose text matches the regex. Raises
+        re.error if the pattern isn't a valid regex or repeats a repeat.
+        """
+        regex = re.compile(pattern, flags)
+        if nested_repeat(sre_parse.parse(pattern, flags)):
+            raise re.error('a repeat inside a repeat, like (a+)*, can take forever to match')
+        return array('I', [ordinal for ordinal in self.candidates(pattern, flags)
+                           if regex.search(self.verse_text(ordinal))])
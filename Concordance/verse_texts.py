@@ -0,0 +1,81 @@
+"""
+This module stores the text of every verse in one UTF-8 buffer, with an array
+of the byte offset where each verse ordinal starts (and the offset of the end).
+The bible dictionary holds each verse as its own str along with a
+'chapter:verse' key for it, which is about 62,000 objects. The buffer is two.
+
+The text of a verse, or of any run of verses like a chapter, is a memoryview
+slice of the buffer found from two offsets, so nothing is copied or decoded
+until the text is shown. The corpus file stores the buffer and offsets as they
+are here, so the corpus's VerseTexts are views of the mapped file, and the
+json files are packed into one when they are loaded.
+"""
+
+
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+
+class VerseTexts(Sequence):
+    """
+    A read-only list of the verse text in ordinal order. A slice of it is
+    decoded from one contiguous slice of the buffer, so a chapter or any other
+    run of verses is found with two offsets rather than a lookup per verse.
+    """
+    def __init__(self, offsets, text):
+        """
+        Takes the u32 offsets of every verse plus the end offset and the
+        buffer of all the verse text, as arrays, bytes or memoryviews.
+        """
+        self.offsets = offsets
+        self.text = memoryview(text)
+
+    @classmethod
+    def from_bible(cls, kjv_bible: dict):
+        """
+        Packs the verse text of the bible dictionary in the format
+        book_name: {'chapter:verse': verse_text} into one buffer.
+        """
+        encoded = [verse_text.encode('UTF-8') for book_dict in kjv_bible.values()
+                   for verse_text in book_dict.values()]
+        offsets = array('I', accumulate(map(len, encoded), initial=0))
+        return cls(offsets, b''.join(encoded))
+
+    def view(self, ordinal: int) -> memoryview:
+        """
+        Returns the UTF-8 bytes of the verse ordinal without copying them.
+        """
+        return self.text[self.offsets[ordinal]:self.offsets[ordinal + 1]]
+
+    def view_range(self, first: int, end: int) -> memoryview:
+        """
+        Returns the UTF-8 bytes of the verses from ordinal first up to end
+        without copying them. The verses aren't separated, the offsets of each
+        one are offsets[ordinal] - offsets[first].
+        """
+        return self.text[self.offsets[first]:self.offsets[end]]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return str(self.view(range(len(self))[index]), 'UTF-8')
+        first, end, step = index.indices(len(self))
+        if step != 1:
+            return [self[ordinal] for ordinal in range(first, end, step)]
+        if end <= first:
+            return []
+        offsets = self.offsets
+        base = offsets[first]
+        block = self.view_range(first, end)
+        return [str(block[offsets[ordinal] - base:offsets[ordinal + 1] - base], 'UTF-8')
+                for ordinal in range(first, end)]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the size of the buffer and the offsets in bytes.
+        """
+        return self.text.nbytes + len(self.offsets) * self.offsets.itemsize
@@ -0,0 +1,145 @@
+"""
+This module creates the verse table. Every verse in the Bible gets a verse
+ordinal, its position counting from 0 (Genesis 1:1) to 31101 (Revelation
+22:21). The table stores the book, chapter and verse number of every ordinal in
+arrays so a concordance can hold plain integers instead of "Book c:v" strings
+and turn them back into a reference in constant time.
+"""
+
+
+from array import array
+
+
+class VerseTable:
+    def __init__(self, books: list[str], book_starts, book_indexes, chapters, verses):
+        """
+        books is the list of book names in order. book_starts holds the first
+        ordinal of every book followed by the total number of verses. The other
+        three hold the book index, chapter number and verse number of each
+        ordinal. Any sequence of ints works (arrays, lists or memoryviews of
+        the corpus file).
+        """
+        self.books = books
+        self.book_starts = book_starts
+        self.book_indexes = book_indexes
+        self.chapters = chapters
+        self.verses = verses
+        self.__book_numbers = {book: index for index, book in enumerate(books)}
+
+    @classmethod
+    def from_bible(cls, kjv_bible: dict):
+        """
+        Creates the table from the bible dictionary in the format
+        book_name: {'chapter:verse': verse_text}.
+        """
+        book_starts = array('I')
+        book_indexes = array('B')
+        chapters = array('H')
+        verses = array('H')
+        for index, book_dict in enumerate(kjv_bible.values()):
+            book_starts.append(len(chapters))
+            for key in book_dict:
+                chapter, _, verse = key.partition(':')
+                book_indexes.append(index)
+                chapters.append(int(chapter))
+                verses.append(int(verse))
+        book_starts.append(len(chapters))
+        return cls(list(kjv_bible.keys()), book_starts, book_indexes, chapters, verses)
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def book_range(self, book: str) -> tuple[int, int]:
+        """
+        Returns the first ordinal of the book and the first ordinal after the
+        end of the book.
+        """
+        index = self.__book_numbers[book]
+        return self.book_starts[index], self.book_starts[index + 1]
+
+    def book(self, ordinal: int) -> str:
+        """
+        Returns the name of the book the ordinal is in.
+        """
+        return self.books[self.book_indexes[ordinal]]
+
+    def location(self, ordinal: int) -> tuple[str, int, int]:
+        """
+        Returns the book name, chapter number and verse number of the ordinal.
+        """
+        return self.books[self.book_indexes[ordinal]], self.chapters[ordinal], self.verses[ordinal]
+
+    def key(self, ordinal: int) -> str:
+        """
+        Returns the 'chapter:verse' key used in the bible dictionary.
+        """
+        return f"{self.chapters[ordinal]}:{self.verses[ordinal]}"
+
+    def reference(self, ordinal: int) -> str:
+        """
+        Returns the "Book chapter:verse" reference of the ordinal.
+        """
+        return f"{self.books[self.book_indexes[ordinal]]} {self.chapters[ordinal]}:{self.verses[ordinal]}"
+
+    def _chapter_start(self, start: int, end: int, chapter: int) -> int:
+        """
+        Binary searches the ordinals from start to end of a book for the first
+        verse of the chapter, or the first verse after it if it isn't there.
+        """
+        low, high = start, end
+        while low < high:
+            middle = (low + high) // 2
+            if self.chapters[middle] < chapter:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def chapter_range(self, book: str, chapter: int) -> tuple[int, int]:
+        """
+        Returns the first ordinal of the chapter and the first ordinal after
+        the end of it, or (-1, -1) if the book doesn't have that chapter.
+        """
+        if book not in self.__book_numbers:
+            return -1, -1
+        start, end = self.book_range(book)
+        first = self._chapter_start(start, end, chapter)
+        if first == end or self.chapters[first] != chapter:
+            return -1, -1
+        return first, self._chapter_start(first, end, chapter + 1)
+
+    def ordinal(self, book: str, chapter: int, verse: int) -> int:
+        """
+        Returns the ordinal of the verse or -1 if the book doesn't have that
+        chapter and verse.
+        """
+        if book not in self.__book_numbers:
+            return -1
+        start, end = self.book_range(book)
+        first = self._chapter_start(start, end, chapter)
+        if first == end or self.chapters[first] != chapter:
+            return -1
+
+        # Verses are nearly always numbered from 1 without gaps, so try the
+        # direct offset before walking the chapter.
+        ordinal = first + verse - self.verses[first]
+        if first <= ordinal < end and self.chapters[ordinal] == chapter \
+                and self.verses[ordinal] == verse:
+            return ordinal
+        for ordinal in range(first, end):
+            if self.chapters[ordinal] != chapter:
+                break
+            if self.verses[ordinal] == verse:
+                return ordinal
+        return -1
+
+    def parse_reference(self, reference: str) -> int:
+        """
+        Returns the ordinal of a "Book chapter:verse" reference or -1 if it
+        isn't a verse in the table.
+        """
+        book, _, key = reference.rpartition(' ')
+        chapter, _, verse = key.partition(':')
+        if not (chapter.isdigit() and verse.isdigit()):
+            return -1
+        return self.ordinal(book, int(chapter), int(verse))
@@ -0,0 +1,171 @@
+"""
+This module creates a virtual results table. Instead of inserting one treeview
+row for every result, the table only keeps enough rows to fill the visible part
+of the treeview and changes their values as the user scrolls. The values of a
+row are only worked out when it comes into view, so showing a word with tens of
+thousands of results takes as long as showing a word with ten.
+"""
+
+
+from tkinter import *
+from tkinter import ttk
+
+
+class ResultsTable:
+    def __init__(self, parent, columns, on_select, row=0, column=0):
+        """
+        Creates the treeview and scrollbar in the parent frame. on_select is
+        called with the index of the result when a row is selected.
+        """
+        self.on_select = on_select
+        self.total = 0
+        self.first = 0
+        self.visible = 1
+        self.selected = None
+        self.row_values = None
+
+        self.tree = ttk.Treeview(parent, selectmode='browse', show='headings',
+                                 columns=columns)
+        self.tree.grid(row=row, column=column, sticky='NEWS')
+        self.scrollbar = ttk.Scrollbar(parent, orient='vertical', command=self.yview)
+        self.scrollbar.grid(row=row, column=column + 1, sticky='NEWS')
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+
+        self.tree.bind('<<TreeviewSelect>>', self.select_row)
+        self.tree.bind('<Configure>', self.resize)
+        self.tree.bind('<MouseWheel>', self.mouse_wheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3))
+        self.tree.bind('<Up>', lambda event: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda event: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda event: self.move_selection(-self.visible))
+        self.tree.bind('<Next>', lambda event: self.move_selection(self.visible))
+        self.tree.bind('<Home>', lambda event: self.move_selection(-self.total))
+        self.tree.bind('<End>', lambda event: self.move_selection(self.total))
+
+    def set_rows(self, total, row_values):
+        """
+        Shows a new set of results. row_values is called with the index of a
+        result and returns the tuple of values for its row.
+        """
+        self.total = total
+        self.row_values = row_values
+        self.first = 0
+        self.selected = None
+        self.refresh()
+
+    def clear(self):
+        """
+        Removes all the results.
+        """
+        self.set_rows(0, None)
+
+    def row_height(self) -> int:
+        """
+        Returns the height of a treeview row in pixels.
+        """
+        height = ttk.Style(self.tree).lookup('Treeview', 'rowheight')
+        try:
+            return max(int(height), 1)
+        except (TypeError, ValueError):
+            return 20
+
+    def resize(self, *args):
+        """
+        Works out how many rows fit in the treeview when its size changes. The
+        headings take up about one row.
+        """
+        visible = max(self.tree.winfo_height() // self.row_height() - 1, 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+
+    def refresh(self):
+        """
+        Puts the values of the results from first to first + visible into the
+        rows of the treeview, adding or removing rows so there are only as many
+        as are needed, and updates the scrollbar.
+        """
+        self.first = max(min(self.first, self.total - self.visible), 0)
+        count = min(self.visible, self.total - self.first)
+
+        rows = self.tree.get_children()
+        if len(rows) > count:
+            self.tree.delete(*rows[count:])
+        for position in range(count):
+            values = self.row_values(self.first + position)
+            if position < len(rows):
+                self.tree.item(rows[position], values=values)
+            else:
+                self.tree.insert('', 'end', iid=f"row{position}", values=values)
+
+        if self.selected is not None and self.first <= self.selected < self.first + count:
+            self.tree.selection_set(f"row{self.selected - self.first}")
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if self.total:
+            self.scrollbar.set(self.first / self.total, (self.first + count) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        """
+        Scrolls the results when the scrollbar is dragged or its arrows are
+        clicked.
+        """
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * self.total)
+            self.refresh()
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.scroll(amount * self.visible if args[2] == 'pages' else amount)
+
+    def scroll(self, amount):
+        """
+        Scrolls the results by a number of rows.
+        """
+        self.first += amount
+        self.refresh()
+
+    def mouse_wheel(self, event):
+        """
+        Scrolls three rows for every notch of the mouse wheel. Windows reports
+        multiples of 120 and macOS reports small numbers.
+        """
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-3 * notches)
+
+    def move_selection(self, amount):
+        """
+        Moves the selection with the keyboard and scrolls so it stays in view.
+        """
+        if not self.total:
+            return 'break'
+        index = 0 if self.selected is None else self.selected + amount
+        index = max(min(index, self.total - 1), 0)
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible:
+            self.first = index - self.visible + 1
+        self._select(index)
+        self.refresh()
+        return 'break'
+
+    def select_row(self, *args):
+        """
+        Called when a row of the treeview is clicked. The selection is also
+        set again when the table scrolls, so the callback is only made when the
+        selected result actually changes.
+        """
+        selection = self.tree.selection()
+        if selection:
+            self._select(self.first + self.tree.index(selection[0]))
+
+    def _select(self, index):
+        """
+        Remembers the selected result and calls on_select if it changed.
+        """
+        if index != self.selected:
+            self.selected = index
+            self.on_select(index)
@@ -0,0 +1,159 @@
+"""
+This module starts the app without making the user wait for the concordance.
+The Bible text is quick to load, so the window and the verse lookup are shown
+straight away, and the concordance and search indexes are loaded in a worker
+thread. If the dictionaries haven't been created yet the whole build runs in
+the worker thread too and the frames are shown as soon as the text is ready.
+
+Tkinter can only be used from the thread that runs the mainloop, so the worker
+never touches the window. It puts (kind, value) messages on a queue and the
+window polls the queue with after(), showing progress in the status bar and
+turning on the word search once the concordance has arrived.
+
+The time from starting the program until the window can be used, and until the
+word search can be used, is shown in the status bar.
+
+The build runs with one worker. Forking the process to build the books in
+parallel while the mainloop and this thread are running could copy a lock
+that another thread is holding into the children, which then hang.
+"""
+
+
+import queue
+import threading
+import time
+from pathlib import Path
+from GUI.verse_lookup import VerseLookup
+from GUI.word_lookup import WordLookup
+from ScrapeText.create_dictionaries import create_dictionaries
+from Concordance.loader import dictionaries_exist, open_storage, load_bible, load_concordance
+from Concordance.profiling import stage
+
+
+POLL_INTERVAL = 50
+
+
+class Startup:
+    def __init__(self, root, directory=Path.cwd(), started=None, backend=None):
+        """
+        Takes the root window, the directory of the dictionaries, the
+        perf_counter time the program started at, to measure from, and the
+        backend to load the dictionaries from (see Concordance.loader).
+        """
+        self.root = root
+        self.directory = directory
+        self.backend = backend
+        self.started = time.perf_counter() if started is None else started
+        self.messages = queue.Queue()
+        self.storage = None
+        self.verse_lookup = None
+        self.word_lookup = None
+        self.timings = {}
+
+    def start(self):
+        """
+        Shows the frames now if the dictionaries exist, and starts the worker
+        thread to load the rest.
+        """
+        bible = None
+        if dictionaries_exist(self.directory):
+            try:
+                with stage('load_bible', 'load'):
+                    self.storage = open_storage(self.directory, self.backend)
+                    bible = load_bible(self.directory, self.storage)
+            except Exception as error:
+                self.root.set_status(f"Couldn't load the Bible: {error}")
+                return
+            self.show_bible(bible)
+        else:
+            self.root.set_status('Creating the dictionaries...')
+        worker = threading.Thread(target=self.work, args=(bible,), daemon=True)
+        worker.start()
+        self.root.after(POLL_INTERVAL, self.poll)
+
+    def work(self, bible):
+        """
+        Runs in the worker thread. Creates the dictionaries if they don't
+        exist, then loads the concordance.
+        """
+        try:
+            if bible is None:
+                with stage('create_dictionaries', 'build'):
+                    create_dictionaries(self.directory, workers=1,
+                                        database=self.backend == 'sqlite',
+                                        progress=lambda message: self.messages.put(('progress',
+                                                                                    message)))
+                with stage('load_bible', 'load'):
+                    self.storage = open_storage(self.directory, self.backend)
+                    bible = load_bible(self.directory, self.storage)
+                self.messages.put(('bible', bible))
+            self.messages.put(('progress', 'Loading the concordance'))
+            with stage('load_concordance', 'load'):
+                concordance = load_concordance(self.directory, bible[0], bible[3], self.storage)
+            self.messages.put(('concordance', concordance))
+        except Exception as error:
+            self.messages.put(('error', error))
+
+    def poll(self):
+        """
+        Handles the messages from the worker thread and checks again after the
+        poll interval until the concordance has been loaded.
+        """
+        while True:
+            try:
+                kind, value = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.root.set_status(f"{value}...")
+            elif kind == 'bible':
+                self.show_bible(value)
+            elif kind == 'concordance':
+                self.show_concordance(*value)
+                return
+            elif kind == 'error':
+                self.root.set_status(f"Couldn't load the concordance: {value}")
+                return
+        self.root.after(POLL_INTERVAL, self.poll)
+
+    def show_bible(self, bible):
+        """
+        Creates the verse and word lookup frames with the word search turned
+        off, and records the time to interactive once they have been drawn.
+        The frames are drawn straight away rather than when the window is next
+        idle, so the time is recorded before any later message from the
+        worker is handled.
+        """
+        bible_dict, books_dict, testaments, verse_table, verse_texts = bible
+        with stage('show_bible', 'gui'):
+            self.root.set_dictionaries(bible_dict, books_dict, testaments, verse_table,
+                                       verse_texts)
+            self.verse_lookup = VerseLookup(self.root)
+            self.verse_lookup.initialize()
+            self.word_lookup = WordLookup(self.root, self.verse_lookup)
+            self.word_lookup.initialize()
+            self.word_lookup.set_ready(False)
+            self.root.update_idletasks()
+        self.record('interactive')
+
+    def show_concordance(self, concordance, indexes):
+        """
+        Gives the concordance to the window and turns on the word search.
+        """
+        with stage('set_concordance', 'load'):
+            self.root.set_concordance(concordance, indexes)
+        self.word_lookup.set_ready(True)
+        self.record('search')
+
+    def record(self, name):
+        """
+        Records how long after the start something happened and reports it.
+        Once the word search is ready its report is left in the status bar.
+        """
+        self.timings[name] = time.perf_counter() - self.started
+        if name == 'search':
+            report = (f"Interactive in {self.timings.get('interactive', 0):.2f}s, "
+                      f"word search ready in {self.timings['search']:.2f}s")
+            self.root.set_status(report)
+        elif 'search' not in self.timings:
+            self.root.set_status('Loading the concordance...')
@@ -1,13 +1,14 @@
 """
 This module creates the class that serves as the verse lookup. It encompasses
 the left side of the window with a top frame for the search options and a
-bottom frame that displays those options.
+bottom frame that displays those options. A reference like Gen 1:1-2:3 or
+Rom 8 can also be typed in to show a whole passage.
 """
 
 
 from tkinter import ttk
 from tkinter import *
-import textwrap
+from Concordance.profiling import profiled
 
 
 class VerseLookup:
@@ -18,8 +19,8 @@ class VerseLookup:
         self.root = root
         self.bible_dict = self.root.bible_dict
         self.books_dict = self.root.books_dict
-        self.concordance = self.root.concordance
         self.testaments = self.root.testaments
+        self.query_service = self.root.query_service
 
     def create_search_frame(self):
         """
@@ -37,6 +38,7 @@ class VerseLookup:
         self.create_books_box()
         self.create_chapter_box()
         self.create_verse_boxes()
+        self.create_reference_entry()
 
     def create_testament_box(self):
         """
@@ -99,6 +101,17 @@ class VerseLookup:
         start_verse_label.grid(row=4, column=0)
         self.verses.grid(row=4, column=1)
 
+    def create_reference_entry(self):
+        """
+        Creates the entry to type a reference in. Pressing Enter/Return shows
+        every verse of the passage.
+        """
+        reference_label = Label(self.search_frame, text='Reference')
+        self.reference_entry = Entry(self.search_frame)
+        self.reference_entry.bind('<Return>', func=self.choose_reference)
+        reference_label.grid(row=5, column=0)
+        self.reference_entry.grid(row=5, column=1, sticky='EW')
+
     def choose_testament(self, *args):
         """
         This method is called when the testament string variable is changed. It
@@ -128,6 +141,7 @@ class VerseLookup:
         self.verses.config(values=verses)
         self.verses.current(0)
 
+    @profiled('choose_verse', 'gui')
     def choose_verse(self, *args):
         """
         Displays the verse text in the bottom-left frame based on the values in
@@ -136,19 +150,48 @@ class VerseLookup:
         book = self.book_name.get()
         chapter = self.chapter.get()
         start_verse = self.start_verse.get()
-        formatted_start = f"{chapter}:{start_verse}"
-        text = textwrap.fill(f"{formatted_start} {self.bible_dict[book][formatted_start]}", 90)
-        self.text_label.configure(text=text)
+        verse = self.query_service.verse(book, int(chapter), int(start_verse))
+        self.show_text(f"{chapter}:{start_verse} {verse['text']}")
+
+    @profiled('choose_reference', 'gui')
+    def choose_reference(self, *args):
+        """
+        Displays every verse of the reference in the entry, one per line, or
+        why it couldn't be found.
+        """
+        try:
+            verses = self.query_service.passage(self.reference_entry.get())
+        except (ValueError, KeyError) as error:
+            self.show_text(error.args[0])
+            return
+        self.show_text('\n'.join(f"{verse['reference']} {verse['text']}" for verse in verses))
+
+    def show_text(self, text):
+        """
+        Replaces the text in the bottom-left frame.
+        """
+        self.text_box.configure(state='normal')
+        self.text_box.delete('1.0', END)
+        self.text_box.insert('1.0', text)
+        self.text_box.configure(state='disabled')
 
     def create_verse_frame(self):
         """
-        Creates the bottom-left frame that will display the selected text.
+        Creates the bottom-left frame that will display the selected text. It
+        scrolls so that a long passage can be read.
         """
         self.verse_frame = Frame(self.root, borderwidth=2, relief='sunken')
         self.verse_frame.grid(row=1, column=0, padx=5, pady=5, sticky='NEWS')
-
-        self.text_label = Label(self.verse_frame, text="", justify=LEFT)
-        self.text_label.grid(row=0, column=0, sticky='NEWS')
+        self.verse_frame.rowconfigure(0, weight=1)
+        self.verse_frame.columnconfigure(0, weight=1)
+
+        self.text_box = Text(self.verse_frame, wrap='word', borderwidth=0, state='disabled',
+                             background=self.verse_frame.cget('background'))
+        self.text_box.grid(row=0, column=0, sticky='NEWS')
+        scrollbar = ttk.Scrollbar(self.verse_frame, orient='vertical',
+                                  command=self.text_box.yview)
+        scrollbar.grid(row=0, column=1, sticky='NS')
+        self.text_box.configure(yscrollcommand=scrollbar.set)
 
     def initialize(self):
         """
@@ -5,22 +5,66 @@ passed as root to the word_lookup and verse_lookup classes.
 
 from tkinter import *
 from tkinter import ttk
+from Concordance.query import QueryService
 
 
 class Window(Tk):
-    def __init__(self, bible_dict, books_dict, concordance, testaments):
+    def __init__(self, bible_dict=None, books_dict=None, concordance=None, testaments=None,
+                 verse_table=None, indexes=None):
         super().__init__()
         """
         The window class is an instance of the main Tkinter window class and
-        takes the dictionaries and testament list created in the main module
-        so that they can be accessed by the other classes that take this class
-        as a parameter. 
+        takes the dictionaries, testament list, verse table and search indexes
+        created in the main module so that they can be accessed by the other
+        classes that take this class as a parameter. The lookups themselves are
+        made through the query service, which is shared by both frames.
+
+        The window can be created before any of these are loaded, so it shows
+        up as soon as possible, and be given the dictionaries with
+        set_dictionaries and the concordance with set_concordance once they
+        have been loaded. Progress is shown in the status bar along the bottom.
+        """
+        self.bible_dict = None
+        self.books_dict = None
+        self.concordance = None
+        self.testaments = None
+        self.verse_table = None
+        self.indexes = indexes or {}
+        self.query_service = None
+        self.title('KJV Bible')
+        self.status_label = ttk.Label(self, text='', anchor='w')
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky='ew', padx=5)
+        if bible_dict is not None:
+            self.set_dictionaries(bible_dict, books_dict, testaments, verse_table,
+                                  self.indexes.get('verse_texts'))
+        if concordance is not None:
+            self.set_concordance(concordance, self.indexes)
+
+    def set_dictionaries(self, bible_dict, books_dict, testaments, verse_table, verse_texts):
+        """
+        Takes what is needed to look up verses and creates the query service,
+        which can't search for words until it has the concordance.
         """
         self.bible_dict = bible_dict
         self.books_dict = books_dict
-        self.concordance = concordance
         self.testaments = testaments
-        self.title('KJV Bible')
+        self.verse_table = verse_table
+        self.query_service = QueryService(bible_dict, books_dict, None, testaments,
+                                          verse_table, {'verse_texts': verse_texts})
+
+    def set_concordance(self, concordance, indexes):
+        """
+        Gives the concordance and search indexes to the query service.
+        """
+        self.concordance = concordance
+        self.indexes = indexes
+        self.query_service.set_concordance(concordance, indexes)
+
+    def set_status(self, text):
+        """
+        Shows a message in the status bar.
+        """
+        self.status_label.configure(text=text)
 
     def set_geometry(self, window_width=700, window_height=500):
         """
@@ -43,6 +87,7 @@ class Window(Tk):
         """
         self.rowconfigure(0, weight=0)
         self.rowconfigure(1, weight=1)
+        self.rowconfigure(2, weight=0)
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=0, minsize=200)
 
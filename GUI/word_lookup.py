@@ -3,13 +3,28 @@ This module serves as the concordance (word search) for the app. It will create
 two frames on the right side of the window. The top frame will be the word
 search entry and the bottom frame will display the results in a treeview. When
 a result verse is selected in the treeview, it will automatically populate the
-verse in verse lookup frames on the right side of the window.
+verse in verse lookup frames on the right side of the window. The treeview is a
+virtual results table, so only the rows in view are ever created. While the
+user types, a list under the word entry shows the words that start with what
+has been typed so far along with how many times each one occurs. More than one
+word is run as a query: words can be joined with AND, OR and NOT, phrases put
+in double quotes, and two words joined by NEAR to find them close together.
+When a word isn't found, the closest words that are are suggested in the same
+list. With "All forms" ticked a word also finds its archaic forms, so say finds
+saith and sayest as well. A regular expression between slashes, like
+/Lord (God|of hosts)/, searches the verse text. With "Rank by relevance" ticked
+the best verses for the words come first, with their rank and BM25 score.
 """
 
 
 from tkinter import *
 from tkinter import ttk
-import re
+from GUI.results_table import ResultsTable
+from Concordance.query import SUGGESTION_LIMIT
+from Concordance.profiling import profiled
+
+
+COMPLETION_LIMIT = SUGGESTION_LIMIT
 
 
 class WordLookup:
@@ -23,8 +38,15 @@ class WordLookup:
         self.verse_lookup = verse_lookup
         self.bible_dict = self.root.bible_dict
         self.books_dict = self.root.books_dict
-        self.concordance = self.root.concordance
         self.testaments = self.root.testaments
+        self.verse_table = self.root.verse_table
+        self.results = []
+        self.scores = None
+        self.facets = None
+        self.facet_names = []
+        self.message = ''
+        self.query_service = self.root.query_service
+        self.completions = []
         self.testament = self.verse_lookup.testament
         self.chapter = self.verse_lookup.chapter
         self.book_name = self.verse_lookup.book_name
@@ -45,10 +67,104 @@ class WordLookup:
         self.word_entry = Entry(self.word_frame)
         self.word_entry.grid(row=1, column=0, padx=5, pady=5, sticky='NEWS')
         self.word_entry.bind('<Return>', func=self.choose_word)
+        self.word_entry.bind('<KeyRelease>', func=self.update_completions)
+        self.word_entry.bind('<Down>', func=self.focus_completions)
+        self.word_entry.bind('<Escape>', func=self.hide_completions)
+
+        self.completion_list = Listbox(self.word_frame, height=COMPLETION_LIMIT,
+                                       activestyle='dotbox', exportselection=False)
+        self.completion_list.grid(row=2, column=0, padx=5, sticky='NEWS')
+        self.completion_list.grid_remove()
+        self.completion_list.bind('<Return>', func=self.choose_completion)
+        self.completion_list.bind('<Double-Button-1>', func=self.choose_completion)
+        self.completion_list.bind('<Escape>', func=self.hide_completions)
+
+        self.all_forms = BooleanVar(self.word_frame, value=False)
+        self.forms_button = Checkbutton(self.word_frame, text="All forms (saith, sayest)",
+                                        variable=self.all_forms)
+        self.forms_button.grid(row=3, column=0, padx=5, sticky='W')
+
+        self.ranked = BooleanVar(self.word_frame, value=False)
+        self.ranked_button = Checkbutton(self.word_frame, text="Rank by relevance",
+                                         variable=self.ranked)
+        self.ranked_button.grid(row=4, column=0, padx=5, sticky='W')
+
+        self.search_button = Button(self.word_frame, text="Search",
+                                    command=self.choose_word)
+        self.search_button.grid(row=5, column=0, padx=5, pady=5)
+
+    def set_ready(self, ready):
+        """
+        Turns the word search on or off. It is off while the concordance is
+        loaded in the background, and a message says so under the results.
+        """
+        state = NORMAL if ready else DISABLED
+        for widget in (self.word_entry, self.forms_button, self.ranked_button,
+                       self.search_button):
+            widget.configure(state=state)
+        self.results_label.configure(text="" if ready else "Loading the concordance...")
+        if ready:
+            self.word_entry.focus_set()
+
+    def update_completions(self, event=None):
+        """
+        Called every time a key is released in the word entry. It looks up the
+        words that start with the text in the entry and shows them with their
+        occurrence counts in the list under the entry.
+        """
+        if event is not None and event.keysym in ('Return', 'Down', 'Up', 'Escape', 'Tab'):
+            return
+        self.show_completions(self.query_service.complete(self.word_entry.get(),
+                                                          limit=COMPLETION_LIMIT))
+
+    def show_completions(self, completions):
+        """
+        Shows a list of (word, count) pairs in the list under the entry, or
+        hides the list if there are none.
+        """
+        self.completions = completions
+        self.completion_list.delete(0, END)
+        if not self.completions:
+            self.completion_list.grid_remove()
+            return
+        for word, count in self.completions:
+            self.completion_list.insert(END, f"{word} ({count})")
+        self.completion_list.configure(height=len(self.completions))
+        self.completion_list.grid()
+
+    def focus_completions(self, *args):
+        """
+        Moves the focus from the word entry to the first completion when the
+        down arrow is pressed.
+        """
+        if self.completions:
+            self.completion_list.focus_set()
+            self.completion_list.selection_clear(0, END)
+            self.completion_list.selection_set(0)
+            self.completion_list.activate(0)
+        return 'break'
+
+    def choose_completion(self, *args):
+        """
+        Puts the chosen completion in the word entry and searches for it.
+        """
+        selection = self.completion_list.curselection()
+        if not selection:
+            return 'break'
+        word = self.completions[selection[0]][0]
+        self.word_entry.delete(0, END)
+        self.word_entry.insert(0, word)
+        self.choose_word()
+        return 'break'
 
-        button = Button(self.word_frame, text="Search",
-                        command=self.choose_word)
-        button.grid(row=2, column=0, padx=5, pady=5)
+    def hide_completions(self, *args):
+        """
+        Hides the completion list and gives the focus back to the word entry.
+        """
+        self.completions = []
+        self.completion_list.delete(0, END)
+        self.completion_list.grid_remove()
+        self.word_entry.focus_set()
 
     def create_results_frame(self):
         """
@@ -62,6 +178,7 @@ class WordLookup:
         self.results_frame.rowconfigure(0, weight=0)
         self.results_frame.rowconfigure(1, weight=0)
         self.results_frame.rowconfigure(2, weight=1)
+        self.results_frame.rowconfigure(3, weight=0)
 
         self.word_label = Label(self.results_frame, text="")
         self.word_label.grid(row=0, columnspan=2)
@@ -71,76 +188,139 @@ class WordLookup:
 
     def create_results_table(self):
         """
-        Creates the table to display the word search results using treeview and
-        creates a scrollbar for viewing the results in the table.
+        Creates the virtual table to display the word search results using
+        treeview and a scrollbar for viewing the results in the table. The rank
+        and score columns are only shown for a ranked search.
         """
-        self.results_table = ttk.Treeview(self.results_frame,
-                                          selectmode='browse', show='headings')
-        self.results_table['columns'] = ['Verse']
-        self.results_table.grid(row=2, column=0, sticky='NEWS')
-        self.results_table.heading(0, text='Verse')
-        self.results_table.column(column='Verse', width=95)
-        self.results_table.bind('<<TreeviewSelect>>', self.select_row)
+        self.results_table = ResultsTable(self.results_frame, ['Rank', 'Score', 'Verse'],
+                                          self.select_row, row=2, column=0)
+        for column, width in (('Rank', 45), ('Score', 60), ('Verse', 95)):
+            self.results_table.tree.heading(column, text=column)
+            self.results_table.tree.column(column=column, width=width)
+        self.results_table.tree.configure(displaycolumns=['Verse'])
 
-        scrollbar = ttk.Scrollbar(self.results_frame, orient='vertical',
-                                  command=self.results_table.yview)
-        self.results_table.configure(yscrollcommand=scrollbar.set)
-        scrollbar.grid(row=2, column=1, sticky='NEWS')
+    def create_facet_list(self):
+        """
+        Creates the list under the results table that shows how many of the
+        results are in each testament and book. Clicking one shows only its
+        results in the table.
+        """
+        self.facet_list = Listbox(self.results_frame, height=6, activestyle='dotbox',
+                                  exportselection=False)
+        self.facet_list.grid(row=3, column=0, sticky='NEWS')
+        facet_scrollbar = ttk.Scrollbar(self.results_frame, orient='vertical',
+                                        command=self.facet_list.yview)
+        facet_scrollbar.grid(row=3, column=1, sticky='NEWS')
+        self.facet_list.configure(yscrollcommand=facet_scrollbar.set)
+        self.facet_list.bind('<<ListboxSelect>>', func=self.choose_facet)
 
+    def show_facets(self, result):
+        """
+        Fills the facet list with the number of results in all, in each
+        testament and in each book that has any.
+        """
+        self.facet_list.delete(0, END)
+        self.facets = self.query_service.facets(result) if len(result) else None
+        self.facet_names = []
+        if self.facets is None:
+            return
+        self.facet_names = [None]
+        self.facet_list.insert(END, f"All ({len(result)})")
+        for name, count in [*self.facets.testaments().items(), *self.facets.books()]:
+            if count:
+                self.facet_names.append(name)
+                self.facet_list.insert(END, f"{name} ({count})")
+        self.facet_list.selection_set(0)
+
+    @profiled('choose_facet', 'gui')
+    def choose_facet(self, *args):
+        """
+        This method is called when a testament or book is clicked in the
+        facet list. The results are sliced to the ones in it, so the table
+        only has to be told about the new rows.
+        """
+        selection = self.facet_list.curselection()
+        if self.facets is None or not selection:
+            return
+        name = self.facet_names[selection[0]]
+        results, scores = self.facets.filter(name)
+        self.fill_table(results, scores)
+        if name is not None:
+            self.results_label.configure(text=f"{len(results)} in {name}.")
+        else:
+            self.results_label.configure(text=self.message)
+
+    @profiled('choose_word', 'gui')
     def choose_word(self, *args):
         """
         This method is called when the search button is clicked or the user
-        pressed Enter/Return while the cursor is in the word entry. It gets the
-        word from the entry and displays the number of verses that word occurs
-        and then calls the fill table method.
+        pressed Enter/Return while the cursor is in the word entry. It searches
+        for the text in the entry with the query service and displays the
+        number of verses that word occurs and then calls the fill table method.
+        Queries display the number of verses that match. If a single word isn't
+        found the closest words are suggested in the list under the entry. When
+        all forms is ticked a single word is looked up by its stem. A regex is
+        run over the verse text. When rank by relevance is ticked the best
+        verses for the words are shown with their scores. How many results
+        are in each testament and book is shown in the facet list.
         """
-        word = self.word_entry.get().strip().lower()
-        if word not in self.concordance.keys():
-            results_text = f'Not found. Try again.'
+        result = self.query_service.search(self.word_entry.get(), self.all_forms.get(),
+                                           self.ranked.get())
+        if not len(result):
             self.clear_table()
         else:
-            occurrences = len(self.concordance[word])
-            results_text = f'{occurrences} occurrences.'
-            self.fill_table(word)
+            self.fill_table(result.results, result.scores)
 
-        self.word_label.configure(text=f'"{word.upper()}"')
-        self.results_label.configure(text=results_text)
+        self.show_facets(result)
+
+        self.word_label.configure(text=result.label)
+        self.message = result.message
+        self.results_label.configure(text=result.message)
         self.word_entry.delete(0, END)
-        self.word_entry.focus_set()
+        self.hide_completions()
+        self.show_completions(result.suggestions)
 
     def clear_table(self):
         """
         Clears the results table.
         """
-        for row in self.results_table.get_children():
-            self.results_table.delete(row)
+        self.results = []
+        self.scores = None
+        self.results_table.clear()
 
-    def fill_table(self, word):
+    @profiled('fill_table', 'gui')
+    def fill_table(self, results, scores=None):
         """
-        If the word is found in the Bible this method is called to get all
-        the verse references from the concordance dictionary and insert them
-        into the table.
+        If the search found anything this method is called with the verse
+        ordinals of the results to give them to the results table. The table
+        only asks for the references of the rows that are in view. A ranked
+        search also passes the scores of the results, best first, which shows
+        the rank and score columns.
         """
-        self.clear_table()
+        self.results = results
+        self.scores = scores
+        columns = ['Verse'] if scores is None else ['Rank', 'Score', 'Verse']
+        self.results_table.tree.configure(displaycolumns=columns)
+        self.results_table.set_rows(len(self.results), self.row_values)
 
-        verses = self.concordance[word]
-        for verse in verses:
-            self.results_table.insert("", 'end', values=(verse,),
-                                      text="")
+    def row_values(self, index):
+        """
+        Returns the values of a row of the results table.
+        """
+        reference = self.verse_table.reference(self.results[index])
+        if self.scores is None:
+            return ('', '', reference)
+        return (index + 1, f'{self.scores[index]:.2f}', reference)
 
-    def select_row(self, *args):
+    def select_row(self, index):
         """
-        This method is called when the user selects a row in the treeview
-        table. It gets the values and then changes the string variables so that
-        the verse automatically populates in the bottom left display frame.
+        This method is called when the user selects a row in the results
+        table. It changes the string variables so that the verse automatically
+        populates in the bottom left display frame.
         """
-        # Get the book name, chapter number, and verse number from the table.
-        row = self.results_table.selection()[0]
-        verse = self.results_table.item(row)['values']
-        location = re.search(r'(.*?)\s(\d+):(\d+)', verse[0])
-        book = location.group(1)
-        chapter = location.group(2)
-        verse = location.group(3)
+        # Get the book name, chapter number, and verse number from the verse
+        # table using the ordinal of the selected row.
+        book, chapter, verse = self.verse_table.location(self.results[index])
 
         # Reset the string variables to populate the verse
         if book in self.testaments['Old Testament']:
@@ -149,8 +329,8 @@ class WordLookup:
             self.testament.set('New Testament')
 
         self.book_name.set(book)
-        self.chapter.set(chapter)
-        self.start_verse.set(verse)
+        self.chapter.set(str(chapter))
+        self.start_verse.set(str(verse))
 
     def initialize(self):
         """
@@ -159,3 +339,4 @@ class WordLookup:
         self.create_word_search()
         self.create_results_frame()
         self.create_results_table()
+        self.create_facet_list()
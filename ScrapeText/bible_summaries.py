@@ -1,9 +1,18 @@
 """
 This module gathers summaries about a book and returns a dictionary that can be
-used in searching for specific chapters and verses.
+used in searching for specific chapters and verses. The build only keeps the
+words and their positions for the concordance; the chapters and verses of a
+book are read from the verse table when it is loaded, and the words of a book
+are worked out from the concordance when they are needed (see
+Concordance/book_words.py).
 """
 
 import re
+from Concordance.profiling import profiled
+
+
+# Words are runs of letters, digits, underscores and hyphens
+WORD_PATTERN = re.compile(r'[\w-]+')
 
 
 class BookSummary:
@@ -14,58 +23,49 @@ class BookSummary:
         self.chapters_verses_dict = {}
         self.words = {}
         self.words_count = {}
+        self.positions = {}
         self.summary = {}
 
-    def get_chapters(self):
-        """
-        Returns a dictionary in the format chapter: number_verses
-        """
-        last_string = list(self.book_dict.keys())[-1]
-        self.number_chapters = int(re.search(r'(\d+):\d+', last_string).group(1))
-
-    def get_chapters_verses(self):
+    def scan_book(self):
         """
-        Returns a dictionary with the format chapter: number_verses:
-        """
-        for i in range(1, self.number_chapters + 1):
-            max_verse = 0
-            for key in list(self.book_dict.keys()):
-                if int(re.search(r'(\d+):\d+', key).group(1)) == i:
-                    verse = int(re.search(f"{i}:(\\d+)", key).group(1))
-                    if verse > max_verse:
-                        max_verse = verse
-                self.chapters_verses_dict[i] = max_verse
-
-    def get_words(self):
-        """
-        Returns a dictionary of the words in the book in the format:
-        word: [verses where occurs]
+        Makes a single pass over the verses of the book and gathers the number
+        of chapters, the number of verses in each chapter, the verses each word
+        occurs in and the count of each word all at once. The position of every
+        occurrence within its verse is kept in the same order as the verses so
+        that phrases can be searched for.
         """
+        max_verses = {}
+        chapter = 0
         for key, value in self.book_dict.items():
-            words_list = re.findall(r'[\w-]+', value)
-            for word in words_list:
-                if word.lower() not in self.words.keys():
-                    self.words[word.lower()] = [key]
+            chapter_string, _, verse_string = key.partition(':')
+            chapter, verse = int(chapter_string), int(verse_string)
+            if verse > max_verses.get(chapter, 0):
+                max_verses[chapter] = verse
+
+            for position, word in enumerate(WORD_PATTERN.findall(value)):
+                word = word.lower()
+                verses = self.words.get(word)
+                if verses is None:
+                    self.words[word] = [key]
+                    self.words_count[word] = 1
+                    self.positions[word] = [position]
                 else:
-                    self.words[word.lower()].append(key)
+                    verses.append(key)
+                    self.words_count[word] += 1
+                    self.positions[word].append(position)
 
-    def calculate_words_count(self):
-        """
-        Returns a dictionary with the count of words and each word's count in
-        the book.
-        """
-        for key, value in self.words.items():
-            self.words_count[key] = len(value)
+        # The last verse holds the number of chapters and every chapter up to
+        # it gets an entry even if none of its verses were found.
+        self.number_chapters = chapter
+        self.chapters_verses_dict = {i: max_verses.get(i, 0)
+                                     for i in range(1, self.number_chapters + 1)}
 
+    @profiled('summarize', 'build', lambda self: {'book': self.book_name})
     def summarize(self):
         """
-        Calls all the methods that gather the information and then returns
-        a dictionary of all the values.
+        Scans the book and then returns a dictionary of all the values.
         """
-        self.get_chapters()
-        self.get_chapters_verses()
-        self.get_words()
-        self.calculate_words_count()
+        self.scan_book()
         self.summary.update({'number_chapters': self.number_chapters,
                              'chapter_verses': self.chapters_verses_dict,
                              'words_count': self.words_count,
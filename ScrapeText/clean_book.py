@@ -5,6 +5,7 @@ because the strings in the <p> html elements are not grouped by single verses.
 """
 
 import re
+from Concordance.profiling import profiled
 
 
 class CleanBook:
@@ -48,6 +49,7 @@ class CleanBook:
             self.__dictionary[self.__tuples_list[number_index]] = self.__tuples_list[verse_index].strip()
             number_index += 2
 
+    @profiled('clean_book', 'build')
     def return_dict(self) -> dict:
         """
         Calls all the methods and returns the dictionary.
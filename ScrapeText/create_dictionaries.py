@@ -1,55 +1,281 @@
 """
 This module calls all the necessary classes and functions to scrape the text
-and create the concordance. The result is a dictionary of the text, a
-dictionary summarizing the text, and a dictionary summarizing each book.
-Each dict will then be saved to a separate
-json file.
+and create the concordance. The result is a dictionary of the text and the
+concordance of every word, which are each saved to a json file. The chapters
+and verses of each book aren't saved, since the loader reads them from the
+verse table of the text. The text and the concordance, along with the
+position of every word within its verse, are also written to the binary
+corpus file that the app opens with mmap, and can be written to a SQLite
+database with a full text index.
+
+Builds are incremental: each book's cleaned verses, postings and word
+positions are kept in the build_cache directory under a hash of the book's
+scraped text and the source code of format_book, CleanBook and BookSummary.
+Only books without a cached file for their hash are cleaned and summarized
+again, so editing any of those steps rebuilds every book; the rest are read
+back from the cache before the concordance is merged.
 """
 
 
-from ScrapeText.scraper import ScrapeHTMLBible
+from ScrapeText.scraper import ScrapeHTMLBible, format_book
 from ScrapeText.bible_summaries import BookSummary
+from ScrapeText import bible_summaries, clean_book
+from Concordance.corpus import write_corpus, CORPUS_NAME
+from Concordance.database import write_database, DATABASE_NAME
+from Concordance.verses import VerseTable
+from Concordance.stems import build_stem_index
+from Concordance.trigram import build_trigram_index
+from Concordance.profiling import profiled, stage, collect, collected
+from concurrent.futures import ProcessPoolExecutor
+from array import array
 from pathlib import Path
+import argparse
+import hashlib
+import inspect
 import json
+import os
+import pickle
+
+
+BUILD_CACHE_NAME = 'build_cache'
+
+# The steps that build a book. Their modules are hashed whole so that the
+# constants and patterns CleanBook and BookSummary use are included.
+PIPELINE_SOURCES = (format_book, clean_book, bible_summaries)
+
+
+def pipeline_hash() -> str:
+    """
+    Returns a hash of the source code of the steps that build a book, so that
+    any change to them gives every book a new hash.
+    """
+    digest = hashlib.sha256()
+    for step in PIPELINE_SOURCES:
+        digest.update(inspect.getsource(step).encode('UTF-8'))
+    return digest.hexdigest()
+
+
+@profiled('build_book', 'build', lambda name, paragraphs: {'book': name})
+def build_book(name: str, paragraphs: list[str]) -> tuple:
+    """
+    Cleans and summarizes one book. This runs in the worker processes so it
+    only returns picklable values: the verses dictionary, the book's postings
+    of word: array of verse positions within the book and the word: array of
+    the position of each occurrence within its verse.
+    """
+    verses = format_book(name, paragraphs)
+    book_summary = BookSummary(verses, name)
+    summary = book_summary.summarize()
+    verse_positions = {key: index for index, key in enumerate(verses)}
+    postings = {word: array('I', [verse_positions[verse] for verse in verse_list])
+                for word, verse_list in summary['words_list'].items()}
+    positions = {word: array('H', word_positions)
+                 for word, word_positions in book_summary.positions.items()}
+    return verses, postings, positions
+
+
+def build_books(scraped_text: dict, workers=None) -> dict:
+    """
+    Builds every book and returns book_name: (verses, postings, positions) in
+    the same order as the scraped text. With more than one
+    worker the books are built in a process pool, longest first so a big book
+    doesn't start last, but the results are always put back in book order.
+    When profiling, the stages recorded in the workers are added to the
+    profile of this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return {name: build_book(name, paragraphs) for name, paragraphs in scraped_text.items()}
+
+    order = sorted(scraped_text, key=lambda name: sum(map(len, scraped_text[name])), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(collect, build_book, name, scraped_text[name])
+                   for name in order}
+        return {name: collected(futures[name].result()) for name in scraped_text}
+
+
+def book_hash(name: str, paragraphs: list[str], pipeline: str) -> str:
+    """
+    Returns a hash of the pipeline hash, the book name and its scraped
+    paragraphs. Building two books with the same hash gives the same result.
+    """
+    digest = hashlib.sha256(json.dumps([pipeline, name]).encode('UTF-8'))
+    for paragraph in paragraphs:
+        digest.update(paragraph.encode('UTF-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
 
 
-def create_dictionaries(directory=Path.cwd().parent):
+def build_books_incremental(scraped_text: dict, cache_dir, workers=None) -> tuple[dict, list]:
     """
-    Creates the bible dictionary, summary dictionary, and concordance
-    dictionaries. If called directly, uses the default directory path. If
-    called from the main module, will use the passed directory path.
+    Returns book_name: (verses, postings, positions) like build_books and the
+    list of books that had to be built. Books whose hash is in the
+    cache directory are read back from it and the rest are built and saved to
+    it. Cached books that are no longer used are deleted.
     """
-    kjv_bible = ScrapeHTMLBible().convert_to_dict()
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    pipeline = pipeline_hash()
+    hashes = {name: book_hash(name, paragraphs, pipeline)
+              for name, paragraphs in scraped_text.items()}
 
-    # Create the books concordance
-    book_summary_dict = {}
-    for key, value in kjv_bible.items():
-        book_summary_dict[key] = BookSummary(value, key).summarize()
+    books = {}
+    for name, digest in hashes.items():
+        book_path = Path.joinpath(cache_dir, f"{digest}.pickle")
+        try:
+            with open(book_path, 'rb') as book_file:
+                books[name] = pickle.load(book_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
 
-    # Combine the books concordance into a single entire bible concordance
+    rebuilt = [name for name in scraped_text if name not in books]
+    built = build_books({name: scraped_text[name] for name in rebuilt}, workers)
+    for name, book in built.items():
+        book_path = Path.joinpath(cache_dir, f"{hashes[name]}.pickle")
+        temp_path = Path(f"{book_path}.tmp")
+        with open(temp_path, 'wb') as book_file:
+            pickle.dump(book, book_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, book_path)
+    books.update(built)
+
+    for book_path in cache_dir.glob('*.pickle'):
+        if book_path.stem not in hashes.values():
+            book_path.unlink()
+
+    return {name: books[name] for name in scraped_text}, rebuilt
+
+
+def merge_postings(books: dict, verse_table: VerseTable) -> dict:
+    """
+    Combines the postings of each book into a single entire bible concordance
+    of word: array of verse ordinals. The books are merged in order so the
+    words and ordinals always come out in the same order.
+    """
     concordance = {}
-    for key, value in book_summary_dict.items():
-        for word, verse_list in value['words_list'].items():
+    for name, book in books.items():
+        start = verse_table.book_range(name)[0]
+        for word, positions in book[1].items():
             if word not in concordance:
-                concordance[word] = [f"{key} {verse}" for verse in verse_list]
-            else:
-                concordance[word].extend([f"{key} {verse}" for verse in verse_list])
+                concordance[word] = array('I')
+            concordance[word].extend([start + position for position in positions])
+    return concordance
+
+
+def merge_positions(books: dict) -> dict:
+    """
+    Combines the word positions of each book in the same order as
+    merge_postings, so the positions of a word line up with its verse
+    ordinals in the concordance.
+    """
+    positions = {}
+    for book in books.values():
+        for word, word_positions in book[2].items():
+            if word not in positions:
+                positions[word] = array('H')
+            positions[word].extend(word_positions)
+    return positions
+
+
+def create_dictionaries(directory=Path.cwd().parent, corpus=True, parser="stream",
+                        workers=None, incremental=True, stems=True, trigrams=True,
+                        progress=None, html_file=None, database=False):
+    """
+    Creates the bible dictionary and the concordance. If called directly, uses the default directory path. If
+    called from the main module, will use the passed directory path. If corpus
+    is True the binary corpus file is written as well as the json files. The
+    parser is passed to ScrapeHTMLBible ("stream" or "soup"). The books are
+    cleaned and summarized by that many worker processes (all the cores if
+    None, in this process if 1); the files are the same either way. If
+    incremental is False every book is built and the build cache isn't used.
+    If stems is True the index of archaic forms is written to the corpus, and
+    if trigrams is True the trigram index used for regex searches is too.
+    progress is called with a message as each step starts, if it is given.
+    If html_file is given that downloaded html is scraped instead of the url,
+    so nothing is downloaded. If database is True the SQLite database is
+    written too. Returns the names of the books that were built.
+    """
+    if progress is None:
+        def progress(message):
+            pass
+
+    progress('Scraping the html')
+    if html_file is None:
+        scraper = ScrapeHTMLBible(parser=parser)
+    else:
+        scraper = ScrapeHTMLBible(source='file', file_path=Path(html_file), parser=parser,
+                                  cache_dir=None)
+    scraped_text = scraper.scrape()
+    progress(f"Building {len(scraped_text)} books")
+    with stage('build_books', 'build', incremental=incremental):
+        if incremental:
+            cache_dir = Path.joinpath(directory, BUILD_CACHE_NAME)
+            books, rebuilt = build_books_incremental(scraped_text, cache_dir, workers)
+        else:
+            books, rebuilt = build_books(scraped_text, workers), list(scraped_text)
+
+    # Create the bible dictionary
+    kjv_bible = {name: book[0] for name, book in books.items()}
+
+    # Combine the books concordance into a single entire bible concordance of
+    # word: array of verse ordinals
+    with stage('merge_concordance', 'build'):
+        verse_table = VerseTable.from_bible(kjv_bible)
+        concordance = merge_postings(books, verse_table)
+        positions = merge_positions(books)
 
     # Save the bible dict to a json file
+    progress('Writing the json files')
     bible_path = Path.joinpath(directory, 'kjv_bible.json')
-    with open(bible_path, 'w') as bible_file:
+    with stage('write_json', 'build', file='kjv_bible.json'), open(bible_path, 'w') as bible_file:
         json.dump(kjv_bible, bible_file)
 
-    # Save the summary dict to a file
-    summary_path = Path.joinpath(directory, 'book_summary.json')
-    with open(summary_path, 'w') as summary_file:
-        json.dump(book_summary_dict, summary_file)
-
     # Save the concordance to a file:
     concordance_path = Path.joinpath(directory, 'concordance.json')
-    with open(concordance_path, 'w') as concordance_file:
-        json.dump(concordance, concordance_file)
+    with stage('write_json', 'build', file='concordance.json'), \
+            open(concordance_path, 'w') as concordance_file:
+        json.dump({word: verses.tolist() for word, verses in concordance.items()},
+                  concordance_file)
+
+    # Save the text, concordance and search indexes to the binary corpus file
+    # and the database
+    if (corpus or database) and stems:
+        with stage('build_stem_index', 'build'):
+            stem_index = build_stem_index(concordance)
+    else:
+        stem_index = None
+    if corpus:
+        progress('Writing the corpus')
+        with stage('build_trigram_index', 'build'):
+            trigram_index = build_trigram_index(kjv_bible) if trigrams else None
+        with stage('write_corpus', 'build'):
+            write_corpus(Path.joinpath(directory, CORPUS_NAME), kjv_bible, concordance,
+                         positions, stem_index, trigram_index)
+    if database:
+        progress('Writing the database')
+        with stage('write_database', 'build'):
+            write_database(Path.joinpath(directory, DATABASE_NAME), kjv_bible, concordance,
+                           stem_index)
+
+    return rebuilt
 
 
 if __name__ == '__main__':
-    create_dictionaries()
+    arguments = argparse.ArgumentParser(description='Scrape the KJV html and create the dictionaries.')
+    arguments.add_argument('--workers', type=int, default=None,
+                           help='number of processes used to build the books (default: all cores)')
+    arguments.add_argument('--full', action='store_true',
+                           help='build every book instead of only the changed ones')
+    arguments.add_argument('--no-stems', action='store_true',
+                           help="don't write the index of archaic word forms")
+    arguments.add_argument('--no-trigrams', action='store_true',
+                           help="don't write the trigram index used for regex searches")
+    arguments.add_argument('--html', default=None,
+                           help='scrape this downloaded html file instead of the url')
+    arguments.add_argument('--database', action='store_true',
+                           help='write the SQLite database as well as the corpus')
+    options = arguments.parse_args()
+    rebuilt = create_dictionaries(workers=options.workers, incremental=not options.full,
+                                  stems=not options.no_stems, trigrams=not options.no_trigrams,
+                                  html_file=options.html, database=options.database)
+    print(f"Built {len(rebuilt)} books: {', '.join(rebuilt)}")
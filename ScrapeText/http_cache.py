@@ -0,0 +1,153 @@
+"""
+This module creates a small on-disk cache for the html downloaded with
+requests. Each url's body is stored gzip compressed next to a json file with
+its ETag and Last-Modified headers. When the url is requested again the cached
+copy is revalidated with If-None-Match/If-Modified-Since, so the html is only
+downloaded again if it has changed on the server. If the server can't be
+reached, or the cache is created with offline=True, the cached copy is used
+without asking the server at all.
+"""
+
+
+from pathlib import Path
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+import requests
+
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache'),
+                         'bible_concordance')
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the requests session shared by every cache so connections to the
+    server are pooled and reused.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+class HTTPCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, offline=False, timeout=30):
+        self.cache_dir = Path(cache_dir)
+        self.offline = offline
+        self.timeout = timeout
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        """
+        Returns the paths of the compressed body and the headers json for the
+        url.
+        """
+        name = hashlib.sha256(url.encode('UTF-8')).hexdigest()[:32]
+        return (Path.joinpath(self.cache_dir, f"{name}.gz"),
+                Path.joinpath(self.cache_dir, f"{name}.json"))
+
+    def _read_headers(self, url: str):
+        """
+        Returns the cached headers for the url or None if the url hasn't been
+        cached.
+        """
+        body_path, headers_path = self._paths(url)
+        if not (Path.exists(body_path) and Path.exists(headers_path)):
+            return None
+        with open(headers_path, 'r') as headers_file:
+            return json.load(headers_file)
+
+    def _write(self, url: str, response: requests.Response):
+        """
+        Streams the response body into the compressed cache file and then
+        saves its headers. Both files are written to temporary paths first so
+        an interrupted download never leaves a partial body in the cache.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path, headers_path = self._paths(url)
+        temp_body = Path(f"{body_path}.tmp")
+        with gzip.open(temp_body, 'wb') as body_file:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                body_file.write(chunk)
+        os.replace(temp_body, body_path)
+        self._write_headers(url, {'url': url,
+                                  'etag': response.headers.get('ETag'),
+                                  'last_modified': response.headers.get('Last-Modified')})
+
+    def _write_headers(self, url: str, headers: dict):
+        """
+        Saves the headers json with the time the copy was last validated.
+        """
+        headers_path = self._paths(url)[1]
+        headers['validated'] = time.time()
+        temp_headers = Path(f"{headers_path}.tmp")
+        with open(temp_headers, 'w') as headers_file:
+            json.dump(headers, headers_file)
+        os.replace(temp_headers, headers_path)
+
+    def refresh(self, url: str) -> str:
+        """
+        Makes sure the cache holds a current copy of the url and returns how it
+        was got: 'downloaded', 'revalidated' (the server answered 304 Not
+        Modified), or 'offline' (the cached copy was used without the server).
+        A 304 when there is no cached copy to revalidate raises an HTTPError
+        rather than caching its empty body.
+        """
+        headers = self._read_headers(url)
+        if headers is not None and self.offline:
+            return 'offline'
+        if headers is None and self.offline:
+            raise FileNotFoundError(f"{url} is not in the cache at {self.cache_dir}")
+
+        request_headers = {}
+        if headers is not None:
+            if headers.get('etag'):
+                request_headers['If-None-Match'] = headers['etag']
+            if headers.get('last_modified'):
+                request_headers['If-Modified-Since'] = headers['last_modified']
+
+        try:
+            response = get_session().get(url, headers=request_headers,
+                                         timeout=self.timeout, stream=True)
+        except (requests.ConnectionError, requests.Timeout):
+            if headers is None:
+                raise
+            return 'offline'
+
+        with response:
+            if response.status_code == 304:
+                if headers is None:
+                    raise requests.HTTPError(f"{url} answered 304 Not Modified but isn't in "
+                                             f"the cache at {self.cache_dir}", response=response)
+                self._write_headers(url, headers)
+                return 'revalidated'
+            response.raise_for_status()
+            self._write(url, response)
+        return 'downloaded'
+
+    def open(self, url: str):
+        """
+        Refreshes the url and returns the cached body as a binary file object
+        that can be read a chunk at a time.
+        """
+        self.refresh(url)
+        return gzip.open(self._paths(url)[0], 'rb')
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Refreshes the url and returns the whole cached body.
+        """
+        with self.open(url) as body_file:
+            return body_file.read()
+
+    def clear(self):
+        """
+        Deletes everything in the cache directory.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
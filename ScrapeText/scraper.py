@@ -5,28 +5,114 @@ like this:
 kjv_bible = {"Genesis": {"1:1": "text...", "1:2": "text", ...},
             "Exodus": {...}, ...}
 The html can be read either by downloading the document and providing the path
-or by using requests for the link from the website.
+or by using requests for the link from the website. The html is parsed either
+with beautiful soup (parser="soup") or with the streaming parser
+(parser="stream"), which reads the html in chunks instead of building a tree
+of the whole document and gives exactly the same scraped text. Downloads from
+the url are kept in an on-disk cache (see ScrapeText.http_cache) unless
+cache_dir is None.
 """
 
 
 from bs4 import BeautifulSoup
 from ScrapeText.shorten_names import ShortenNames
 from ScrapeText.clean_book import CleanBook
+from ScrapeText.stream_parser import BibleStreamParser, read_text_chunks, decode_chunks, CHUNK_SIZE
+from ScrapeText.http_cache import HTTPCache, DEFAULT_CACHE_DIR, get_session
+from Concordance.profiling import profiled
 from pathlib import Path
-import requests
+
+
+# I don't want to include the testament headers that are also h2 elements
+TESTAMENTS = ['The New Testament of the King James Bible',
+              'The Old Testament of the King James Version of the Bible']
+
+
+@profiled('format_book', 'build', lambda name, verses: {'book': name})
+def format_book(name: str, verses: list[str]) -> dict:
+    """
+    Converts the p element strings of one book to a dictionary in the format
+    verse_number: verse_text.
+    Note: Several books included an extra p element before the first verse
+    with extended name details that has to be cut out.
+    """
+    if name in ('1 Kings', "2 Kings", "1 Samuel", "2 Samuel",
+                "Ecclesiastes"):
+        verses = verses[2:]
+    return CleanBook(verses).return_dict()
 
 
 class ScrapeHTMLBible:
     def __init__(self, source="url",
                  file_path=Path.joinpath(Path.cwd(), 'bible.html'),
-                 url=r"https://www.gutenberg.org/cache/epub/10/pg10-images.html"):
+                 url=r"https://www.gutenberg.org/cache/epub/10/pg10-images.html",
+                 parser="soup", cache_dir=DEFAULT_CACHE_DIR, offline=False):
         self.source = source
         self.bible_file = file_path
         self.url = url
+        self.parser = parser
+        self.cache = None if cache_dir is None else HTTPCache(cache_dir, offline=offline)
         self.scraped_text = {}
         self.kjv_bible = {}
 
+    @profiled('scrape_document', 'build')
     def _scrape_document(self):
+        """
+        Scrapes the text with the parser chosen when the class was created.
+        """
+        if self.parser == 'stream':
+            self._stream_document()
+        elif self.parser == 'soup':
+            self._soup_document()
+        else:
+            print("The 'parser' parameter must be 'soup' or 'stream'")
+            exit()
+
+    def _stream_document(self):
+        """
+        This method uses the streaming parser to scrape the text from either
+        the document or the url. The parser emits each book name when its h2
+        element is read and then each of its p elements as they end. The url is
+        parsed like beautiful soup's html.parser and the file like html5lib.
+        """
+        if self.source == 'file':
+            with open(self.bible_file, encoding='UTF-8') as bible_file:
+                self._add_pairs(BibleStreamParser().parse(read_text_chunks(bible_file)))
+        elif self.source == 'url':
+            with self._open_url() as page:
+                chunks = decode_chunks(iter(lambda: page.read(CHUNK_SIZE), b''))
+                self._add_pairs(BibleStreamParser(collapse_whitespace=True).parse(chunks))
+        else:
+            print("The 'source' parameter must be 'file' or 'url'")
+            exit()
+
+    def _open_url(self):
+        """
+        Returns a binary file object of the html at the url, either from the
+        cache or straight from the response when there is no cache.
+        """
+        if self.cache is not None:
+            return self.cache.open(self.url)
+        page = get_session().get(self.url, stream=True)
+        page.raise_for_status()
+        page.raw.decode_content = True
+        return page.raw
+
+    def _add_pairs(self, pairs):
+        """
+        Adds the (book_name, paragraph_text) pairs from the streaming parser to
+        the scraped text. A paragraph of None starts the book.
+        """
+        for book_name, text in pairs:
+            if book_name in TESTAMENTS:
+                continue
+            book_name = ShortenNames(book_name).shorten_name()
+            if text is None:
+                self.scraped_text[book_name] = []
+            else:
+                self.scraped_text[book_name].append(text)
+
+    def _soup_document(self):
         """
         This method uses beautiful soup to scrape the text from either the
         document or the url. All books are under the div element with the name
@@ -35,21 +121,17 @@ class ScrapeHTMLBible:
         if self.source == 'file':
             soup_obj = BeautifulSoup(open(self.bible_file, encoding='UTF-8'), 'html5lib')
         elif self.source == 'url':
-            page = requests.get(self.url)
-            soup_obj = BeautifulSoup(page.content, 'html.parser')
+            with self._open_url() as page:
+                soup_obj = BeautifulSoup(page.read(), 'html.parser')
         else:
             print("The 'source' parameter must be 'file' or 'url'")
             exit()
 
         books = soup_obj.find_all('div', attrs={'class': 'chapter'})
 
-        # I don't want to include the testament headers that are also h2 elements
-        testaments = ['The New Testament of the King James Bible',
-                      'The Old Testament of the King James Version of the Bible']
-
         for book in books:
             book_name = book.find('h2').text
-            if book_name not in testaments:
+            if book_name not in TESTAMENTS:
                 book_name = ShortenNames(book_name).shorten_name()
                 self.scraped_text[book_name] = [p.text for p in book.find_all('p')]
 
@@ -57,15 +139,18 @@ class ScrapeHTMLBible:
         """
         Convert to a dictionary in the format:
         book_name: {verse_number: verse_text}
-        Note: Several books included an extra p element before the first verse
-        with extended name details that has to be cut out.
         """
         for name, verses in self.scraped_text.items():
-            if name in ('1 Kings', "2 Kings", "1 Samuel", "2 Samuel",
-                        "Ecclesiastes"):
-                verses = verses[2:]
-            verses_dict = CleanBook(verses).return_dict()
-            self.kjv_bible[name] = verses_dict
+            self.kjv_bible[name] = format_book(name, verses)
+
+    def scrape(self):
+        """
+        Scrapes the document and returns the dictionary of book_name: [p
+        element strings] without cleaning the books, so they can be cleaned
+        separately (see format_book).
+        """
+        self._scrape_document()
+        return self.scraped_text
 
     def convert_to_dict(self):
         """
@@ -0,0 +1,181 @@
+"""
+This module creates an event based parser for the Gutenberg html of the Bible.
+Instead of building a tree of the whole document like beautiful soup, it reads
+the html a chunk at a time and emits (book_name, paragraph_text) pairs as soon
+as each p element ends, so memory stays bounded by the size of a chunk. The
+pairs hold the same text that beautiful soup's find_all('div', class='chapter'),
+find('h2') and find_all('p') return for the same document.
+
+Beautiful soup's html.parser builder replaces strings made only of ASCII
+whitespace with a single newline or space, while the html5lib builder keeps
+them, so the parser does the same when collapse_whitespace is True.
+
+A p element doesn't need an end tag. Like html5lib (and browsers), the parser
+ends an open p when another p or a block element like h3 or div starts, or
+when the element around it ends, and a </p> with no open p is an empty
+paragraph. The html.parser builder nests unclosed paragraphs instead, so the
+two beautiful soup builders only agree on html where every p is closed.
+"""
+
+
+from html.parser import HTMLParser
+import codecs
+
+
+CHUNK_SIZE = 64 * 1024
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+# The start tags that end an open p element
+P_CLOSING_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'center', 'details', 'dialog', 'dir', 'div',
+    'dl', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5',
+    'h6', 'header', 'hgroup', 'hr', 'listing', 'main', 'menu', 'nav', 'ol', 'p', 'pre',
+    'section', 'summary', 'table', 'ul'])
+# The end tags of elements a p can be in, which end it too
+P_PARENT_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'body', 'center', 'dd', 'details', 'dialog',
+    'dir', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'header',
+    'hgroup', 'html', 'li', 'main', 'menu', 'nav', 'section', 'summary', 'td', 'th'])
+
+
+class BibleStreamParser(HTMLParser):
+    def __init__(self, collapse_whitespace=False):
+        """
+        The parser keeps a stack of the chapter divs that are open. Each entry
+        holds the div depth it was opened at, the book name once its first h2
+        has been read, and any paragraphs that came before the h2.
+        """
+        super().__init__(convert_charrefs=True)
+        self.collapse_whitespace = collapse_whitespace
+        self.__pairs = []
+        self.__data = []
+        self.__preserve_depth = 0
+        self.__div_depth = 0
+        self.__chapters = []
+        self.__h2_text = None
+        self.__p_text = None
+
+    def _end_data(self):
+        """
+        Adds the text read since the last tag to the open h2 and p elements.
+        The text can arrive in several pieces when it is split across chunks,
+        so it is only added once the next tag is reached.
+        """
+        if not self.__data:
+            return
+        data = ''.join(self.__data)
+        self.__data = []
+        if self.collapse_whitespace and not self.__preserve_depth \
+                and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if self.__h2_text is not None:
+            self.__h2_text.append(data)
+        if self.__p_text is not None:
+            self.__p_text.append(data)
+
+    def _end_paragraph(self):
+        """
+        Ends the open p element and adds its text to the chapters it is in.
+        """
+        text = ''.join(self.__p_text)
+        self.__p_text = None
+        for chapter in self.__chapters:
+            if chapter[1] is None:
+                chapter[2].append(text)
+            else:
+                self.__pairs.append((chapter[1], text))
+
+    def handle_starttag(self, tag, attrs):
+        self._end_data()
+        if tag in P_CLOSING_TAGS and self.__p_text is not None:
+            self._end_paragraph()
+        if tag in ('pre', 'textarea'):
+            self.__preserve_depth += 1
+        if tag == 'div':
+            self.__div_depth += 1
+            classes = dict(attrs).get('class') or ''
+            if 'chapter' in classes.split():
+                self.__chapters.append([self.__div_depth, None, []])
+        elif not self.__chapters:
+            return
+        elif tag == 'h2' and self.__h2_text is None \
+                and any(chapter[1] is None for chapter in self.__chapters):
+            self.__h2_text = []
+        elif tag == 'p':
+            self.__p_text = []
+
+    def handle_endtag(self, tag):
+        self._end_data()
+        if tag in P_PARENT_TAGS and self.__p_text is not None:
+            self._end_paragraph()
+        if tag in ('pre', 'textarea') and self.__preserve_depth:
+            self.__preserve_depth -= 1
+        if tag == 'div' and self.__div_depth:
+            if self.__chapters and self.__chapters[-1][0] == self.__div_depth:
+                self.__chapters.pop()
+            self.__div_depth -= 1
+        elif tag == 'h2' and self.__h2_text is not None:
+            book_name = ''.join(self.__h2_text)
+            self.__h2_text = None
+            for chapter in self.__chapters:
+                if chapter[1] is None:
+                    chapter[1] = book_name
+                    self.__pairs.append((book_name, None))
+                    self.__pairs.extend((book_name, text) for text in chapter[2])
+                    chapter[2] = []
+        elif tag == 'p' and self.__chapters:
+            # A </p> without a start tag is an empty paragraph
+            if self.__p_text is None:
+                self.__p_text = []
+            self._end_paragraph()
+
+    def handle_data(self, data):
+        self.__data.append(data)
+
+    def handle_comment(self, data):
+        self._end_data()
+
+    def handle_decl(self, decl):
+        self._end_data()
+
+    def handle_pi(self, data):
+        self._end_data()
+
+    def parse(self, chunks):
+        """
+        Feeds the parser one chunk of text at a time and yields the pairs found
+        in each chunk. A (book_name, None) pair is yielded when a book's h2 is
+        read, before any of its paragraphs.
+        """
+        for chunk in chunks:
+            self.feed(chunk)
+            yield from self.__pairs
+            self.__pairs = []
+        self.close()
+        self._end_data()
+        if self.__p_text is not None:
+            self._end_paragraph()
+        yield from self.__pairs
+        self.__pairs = []
+
+
+def read_text_chunks(text_file, chunk_size=CHUNK_SIZE):
+    """
+    Yields the text of an open file a chunk at a time.
+    """
+    while chunk := text_file.read(chunk_size):
+        yield chunk
+
+
+def decode_chunks(byte_chunks, encoding='UTF-8'):
+    """
+    Decodes chunks of bytes into chunks of text without splitting a multibyte
+    character across two chunks.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
@@ -0,0 +1,334 @@
+"""
+This module benchmarks the whole pipeline offline on the downloaded html so
+that slowdowns can be caught. It times scraping the html, cleaning and
+summarizing the books, creating the dictionaries (a full build and an
+incremental one with nothing changed), loading them the way the app does, and
+a fixed mix of word, query and verse lookups. Loading is timed cold, in a new
+process so the imports are counted, and warm, again in this process. It is
+timed for the corpus file and for the json files.
+
+The settings, the query mix and the thresholds are in benchmark.ini. The
+results are printed as JSON (or written to --output). The benchmark fails,
+with exit status 1, if the peak RSS of any step goes over its threshold. Given
+the JSON of an earlier run with --baseline, it also fails if any time is more
+than max_slowdown times what it was. Run it from the main directory:
+
+    python -m Testing.benchmark --output benchmark.json
+    python -m Testing.benchmark --baseline benchmark.json
+"""
+
+
+import argparse
+import configparser
+import json
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from ScrapeText.scraper import ScrapeHTMLBible, format_book
+from ScrapeText.bible_summaries import BookSummary
+from ScrapeText.create_dictionaries import create_dictionaries
+from Concordance.loader import open_corpus, load_bible, load_concordance
+from Concordance.query import QueryService
+
+
+MAIN_DIRECTORY = Path(__file__).resolve().parent.parent
+CONFIG_PATH = Path(__file__).resolve().parent / 'benchmark.ini'
+
+# Times under this many seconds are too short to compare with a baseline
+NOISE_FLOOR = 0.0005
+
+# Loads the dictionaries like the app does in a new process and prints the
+# times since it started and its peak RSS. ru_maxrss is kept across exec, so a
+# child process would report this process's peak, and VmHWM is read instead
+# where there is /proc.
+LOAD_SCRIPT = """
+import time
+start = time.perf_counter()
+import json, re, resource, sys
+from pathlib import Path
+from Concordance.loader import open_corpus, load_bible, load_concordance
+from Concordance.query import QueryService
+imported = time.perf_counter()
+directory = Path(sys.argv[1])
+corpus = open_corpus(directory)
+bible = load_bible(directory, corpus)
+service = QueryService(bible[0], bible[1], None, bible[2], bible[3], {'verse_texts': bible[4]})
+service.verse_dict(0)
+shown = time.perf_counter()
+service.set_concordance(*load_concordance(directory, bible[0], bible[3], corpus))
+service.search('god')
+ready = time.perf_counter()
+try:
+    with open('/proc/self/status') as status:
+        rss_mb = int(re.search(r'VmHWM:\\s+(\\d+)', status.read()).group(1)) / 1024
+except OSError:
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({'import_s': imported - start, 'verses_s': shown - start,
+                  'search_s': ready - start, 'rss_mb': rss_mb}))
+"""
+
+
+def read_config(path=CONFIG_PATH) -> configparser.ConfigParser:
+    """
+    Reads the benchmark settings.
+    """
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise FileNotFoundError(f"There is no benchmark config at {path}")
+    return config
+
+
+def config_lines(config: configparser.ConfigParser, option: str) -> list[str]:
+    """
+    Returns the lines of a query option, without the blank ones.
+    """
+    return [line.strip() for line in config.get('queries', option, fallback='').splitlines()
+            if line.strip()]
+
+
+def best_time(function, repeats: int):
+    """
+    Returns the best time in seconds out of the repeats and the last result.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """
+    Returns the peak resident set size of this process (or its largest child
+    process) so far in MB. Linux reports it in KB.
+    """
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def time_pipeline(html: Path, parser: str, repeats: int) -> dict:
+    """
+    Times scraping the html, cleaning every book and summarizing every book.
+    """
+    def scraper():
+        return ScrapeHTMLBible(source='file', file_path=html, parser=parser, cache_dir=None)
+
+    timings = {}
+    timings['scrape'], scraped_text = best_time(lambda: scraper().scrape(), repeats)
+    timings['convert_to_dict'], kjv_bible = best_time(lambda: scraper().convert_to_dict(),
+                                                      repeats)
+    timings['clean_books'], _ = best_time(
+        lambda: [format_book(name, paragraphs) for name, paragraphs in scraped_text.items()],
+        repeats)
+    timings['summarize_books'], _ = best_time(
+        lambda: [BookSummary(verses, name).summarize() for name, verses in kjv_bible.items()],
+        repeats)
+    return timings
+
+
+def time_build(html: Path, directory: Path, parser: str, workers: int) -> dict:
+    """
+    Times creating every dictionary from the html, and then creating them
+    again from the build cache with nothing changed.
+    """
+    timings = {}
+    timings['create_dictionaries'], _ = best_time(
+        lambda: create_dictionaries(directory, parser=parser, workers=workers,
+                                    incremental=False, html_file=html), 1)
+    create_dictionaries(directory, parser=parser, workers=workers, html_file=html)
+    timings['create_dictionaries_cached'], _ = best_time(
+        lambda: create_dictionaries(directory, parser=parser, workers=workers, html_file=html),
+        1)
+    return timings
+
+
+def load_service(directory: Path) -> QueryService:
+    """
+    Loads the dictionaries into a query service the way the app does.
+    """
+    corpus = open_corpus(directory)
+    bible = load_bible(directory, corpus)
+    concordance, indexes = load_concordance(directory, bible[0], bible[3], corpus)
+    return QueryService(bible[0], bible[1], concordance, bible[2], bible[3], indexes)
+
+
+def time_loading(directory: Path, repeats: int) -> tuple[dict, dict]:
+    """
+    Returns the cold load times, measured in a new process, and the warm load
+    time, measured in this process once the files have been read before.
+    """
+    result = subprocess.run([sys.executable, '-c', LOAD_SCRIPT, str(directory)],
+                            cwd=MAIN_DIRECTORY, capture_output=True, text=True, check=True)
+    cold = json.loads(result.stdout)
+    warm, _ = best_time(lambda: load_service(directory).search('god'), repeats)
+    return cold, warm
+
+
+def time_queries(service: QueryService, config: configparser.ConfigParser,
+                 repeats: int) -> dict:
+    """
+    Times every lookup of the query mix. The first time of each is kept apart
+    from the median of the rest, since it builds any index it needs.
+    """
+    lookups = [(f"word: {query}", lambda query=query: service.search(query))
+               for query in config_lines(config, 'words')]
+    lookups += [(f"query: {query}", lambda query=query: service.search(query))
+                for query in config_lines(config, 'queries')]
+    lookups += [(f"ranked: {query}", lambda query=query: service.search(query, ranked=True))
+                for query in config_lines(config, 'ranked')]
+    lookups += [(f"verses: {reference}", lambda reference=reference: service.passage(reference))
+                for reference in config_lines(config, 'verses')]
+
+    timings = {}
+    for name, lookup in lookups:
+        try:
+            first, result = best_time(lookup, 1)
+        except (KeyError, ValueError) as error:
+            timings[name] = {'error': str(error)}
+            continue
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            lookup()
+            times.append(time.perf_counter() - start)
+        timings[name] = {'count': len(result), 'first_s': first,
+                         'median_s': statistics.median(times)}
+    return timings
+
+
+def compare(report: dict, baseline: dict, max_slowdown: float) -> list[str]:
+    """
+    Returns a message for every time that is more than max_slowdown times the
+    same time in the baseline.
+    """
+    times = {}
+    for name, seconds in report['timings'].items():
+        times[name] = (seconds, baseline.get('timings', {}).get(name))
+    for name, query in report['queries'].items():
+        old = baseline.get('queries', {}).get(name, {})
+        if 'median_s' in query:
+            times[name] = (query['median_s'], old.get('median_s'))
+
+    failures = []
+    for name, (seconds, old) in times.items():
+        if old is not None and old >= NOISE_FLOOR and seconds > old * max_slowdown:
+            failures.append(f"{name} took {seconds * 1000:.2f}ms, "
+                            f"{seconds / old:.2f} times the baseline {old * 1000:.2f}ms")
+    return failures
+
+
+def run(config: configparser.ConfigParser, html: Path, directory: Path, baseline=None) -> dict:
+    """
+    Runs every benchmark with the dictionaries created in the directory and
+    returns the report.
+    """
+    repeats = config.getint('run', 'repeats', fallback=3)
+    parser = config.get('run', 'parser', fallback='stream')
+    workers = config.getint('run', 'workers', fallback=1)
+
+    timings = time_pipeline(html, parser, repeats)
+    timings.update(time_build(html, directory, parser, workers))
+
+    # Copy the json files to their own directory so they are loaded without
+    # the corpus file
+    json_directory = directory / 'json'
+    json_directory.mkdir(exist_ok=True)
+    for name in ('kjv_bible.json', 'concordance.json'):
+        shutil.copy(directory / name, json_directory / name)
+
+    loads = {}
+    for kind, load_directory in (('corpus', directory), ('json', json_directory)):
+        cold, warm = time_loading(load_directory, repeats)
+        loads[kind] = cold
+        timings[f"load_{kind}_cold"] = cold['search_s']
+        timings[f"load_{kind}_warm"] = warm
+
+    service = load_service(directory)
+    queries = time_queries(service, config, config.getint('run', 'query_repeats', fallback=200))
+
+    rss = {'peak_mb': max(peak_rss_mb(), peak_rss_mb(resource.RUSAGE_CHILDREN)),
+           'load_peak_mb': max(load['rss_mb'] for load in loads.values())}
+    failures = []
+    max_rss = config.getfloat('thresholds', 'max_rss_mb', fallback=None)
+    if max_rss is not None and rss['peak_mb'] > max_rss:
+        failures.append(f"The peak RSS was {rss['peak_mb']:.0f}MB, over {max_rss:.0f}MB")
+    max_load_rss = config.getfloat('thresholds', 'max_load_rss_mb', fallback=None)
+    if max_load_rss is not None and rss['load_peak_mb'] > max_load_rss:
+        failures.append(f"The peak RSS loading the dictionaries was "
+                        f"{rss['load_peak_mb']:.0f}MB, over {max_load_rss:.0f}MB")
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(),
+              'html': str(html), 'timings': timings, 'loads': loads, 'queries': queries,
+              'rss': rss}
+    if baseline is not None:
+        failures += compare(report, baseline,
+                            config.getfloat('thresholds', 'max_slowdown', fallback=1.5))
+    report['failures'] = failures
+    report['passed'] = not failures
+    return report
+
+
+def print_summary(report: dict):
+    """
+    Prints the times and any failures for people to read, to stderr so the
+    JSON on stdout can be piped.
+    """
+    for name, seconds in report['timings'].items():
+        print(f"{name:<32}{seconds * 1000:>12.2f}ms", file=sys.stderr)
+    for name, query in report['queries'].items():
+        if 'error' in query:
+            print(f"{name:<32}{query['error']:>14}", file=sys.stderr)
+        else:
+            print(f"{name:<32}{query['median_s'] * 1e6:>12.1f}us{query['count']:>8} found",
+                  file=sys.stderr)
+    print(f"{'peak RSS':<32}{report['rss']['peak_mb']:>12.0f}MB", file=sys.stderr)
+    print(f"{'peak RSS loading':<32}{report['rss']['load_peak_mb']:>12.0f}MB", file=sys.stderr)
+    for failure in report['failures']:
+        print(f"FAILED: {failure}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Benchmark the pipeline offline.')
+    arguments.add_argument('--config', default=CONFIG_PATH,
+                           help='the settings to use (default: Testing/benchmark.ini)')
+    arguments.add_argument('--html', default=None,
+                           help='the downloaded html, instead of the one in the config')
+    arguments.add_argument('--baseline', default=None,
+                           help='the JSON of an earlier run to compare the times with')
+    arguments.add_argument('--output', default=None,
+                           help='write the JSON to this file instead of stdout')
+    arguments.add_argument('--keep', default=None,
+                           help='create the dictionaries in this directory and keep them')
+    options = arguments.parse_args()
+
+    benchmark_config = read_config(options.config)
+    html_path = Path(options.html or MAIN_DIRECTORY / benchmark_config.get('paths', 'html'))
+    if not html_path.exists():
+        sys.exit(f"There is no html at {html_path}. Download it or pass --html.")
+    baseline_report = None
+    if options.baseline is not None:
+        with open(options.baseline) as baseline_file:
+            baseline_report = json.load(baseline_file)
+
+    if options.keep is not None:
+        Path(options.keep).mkdir(parents=True, exist_ok=True)
+        benchmark_report = run(benchmark_config, html_path, Path(options.keep), baseline_report)
+    else:
+        with tempfile.TemporaryDirectory() as temp_directory:
+            benchmark_report = run(benchmark_config, html_path, Path(temp_directory),
+                                   baseline_report)
+
+    print_summary(benchmark_report)
+    if options.output is not None:
+        with open(options.output, 'w') as output_file:
+            json.dump(benchmark_report, output_file, indent=1)
+    else:
+        print(json.dumps(benchmark_report, indent=1))
+    sys.exit(0 if benchmark_report['passed'] else 1)
@@ -0,0 +1,99 @@
+"""
+This module times BookSummary.summarize on every book of the Bible against the
+original implementation, which scanned every verse of the book with two regex
+searches for each chapter. It checks that both produce the same summaries and
+prints the time for each and the speedup. It needs kjv_bible.json in the main
+directory, so run create_dictionaries first and run this from the Testing
+directory.
+"""
+
+
+import json
+import re
+import time
+from pathlib import Path
+
+from ScrapeText.bible_summaries import BookSummary
+
+
+class LegacyBookSummary:
+    """
+    The original multi-pass BookSummary kept for comparison.
+    """
+    def __init__(self, book_dict, book_name):
+        self.book_dict = book_dict
+        self.book_name = book_name
+        self.number_chapters = 0
+        self.chapters_verses_dict = {}
+        self.words = {}
+        self.words_count = {}
+        self.summary = {}
+
+    def get_chapters(self):
+        last_string = list(self.book_dict.keys())[-1]
+        self.number_chapters = int(re.search(r'(\d+):\d+', last_string).group(1))
+
+    def get_chapters_verses(self):
+        for i in range(1, self.number_chapters + 1):
+            max_verse = 0
+            for key in list(self.book_dict.keys()):
+                if int(re.search(r'(\d+):\d+', key).group(1)) == i:
+                    verse = int(re.search(f"{i}:(\\d+)", key).group(1))
+                    if verse > max_verse:
+                        max_verse = verse
+                self.chapters_verses_dict[i] = max_verse
+
+    def get_words(self):
+        for key, value in self.book_dict.items():
+            words_list = re.findall(r'[\w-]+', value)
+            for word in words_list:
+                if word.lower() not in self.words.keys():
+                    self.words[word.lower()] = [key]
+                else:
+                    self.words[word.lower()].append(key)
+
+    def calculate_words_count(self):
+        for key, value in self.words.items():
+            self.words_count[key] = len(value)
+
+    def summarize(self):
+        self.get_chapters()
+        self.get_chapters_verses()
+        self.get_words()
+        self.calculate_words_count()
+        self.summary.update({'number_chapters': self.number_chapters,
+                             'chapter_verses': self.chapters_verses_dict,
+                             'words_count': self.words_count,
+                             'words_list': self.words})
+        return self.summary
+
+
+def time_summaries(summary_class, bible, repeats):
+    """
+    Returns the best time out of the repeats to summarize every book and the
+    summaries from the last run.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        summaries = {name: summary_class(book, name).summarize() for name, book in bible.items()}
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, summaries
+
+
+if __name__ == '__main__':
+    bible_path = Path.joinpath(Path.cwd().parent, 'kjv_bible.json')
+    with open(bible_path, 'r') as bible_file:
+        kjv_bible = json.load(bible_file)
+
+    legacy_time, legacy_summaries = time_summaries(LegacyBookSummary, kjv_bible, 1)
+    new_time, new_summaries = time_summaries(BookSummary, kjv_bible, 3)
+    assert json.dumps(legacy_summaries) == json.dumps(new_summaries)
+
+    psalms_legacy, _ = time_summaries(LegacyBookSummary, {'Psalms': kjv_bible['Psalms']}, 1)
+    psalms_new, _ = time_summaries(BookSummary, {'Psalms': kjv_bible['Psalms']}, 3)
+
+    print(f"{'':<12}{'legacy':>10}{'single pass':>14}{'speedup':>10}")
+    print(f"{'Psalms':<12}{psalms_legacy:>9.3f}s{psalms_new:>13.3f}s{psalms_legacy / psalms_new:>9.1f}x")
+    print(f"{'Bible':<12}{legacy_time:>9.3f}s{new_time:>13.3f}s{legacy_time / new_time:>9.1f}x")
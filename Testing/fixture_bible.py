@@ -0,0 +1,63 @@
+"""
+This module holds the small made up Bible that the tests share so they don't
+need the html document, along with its summaries and concordance, worked out
+the same way create_dictionaries does. Tests that need verses it doesn't have
+add books to a copy of it, or use their own, and build them with
+build_dictionaries.
+"""
+
+
+from Concordance.loader import convert_concordance, create_testaments
+from Concordance.phrase import LazyPositions
+from Concordance.query import QueryService
+from Concordance.verses import VerseTable
+from ScrapeText.bible_summaries import BookSummary
+
+
+bible_dict = {
+    'Genesis': {'1:1': 'In the beginning God created the heaven and the earth.',
+                '1:2': 'And the earth was without form, and void; and darkness was upon '
+                       'the face of the deep.',
+                '2:1': 'Thus the heavens and the earth were finished.'},
+    'Matthew': {'1:1': 'The book of the generation of Jesus Christ, the son of David.',
+                '1:2': 'Abraham begat Isaac; and Isaac begat Jacob.'},
+    'Song of Songs': {'1:1': 'The song of songs, which is Solomon’s.'},
+}
+
+
+def build_dictionaries(bible: dict) -> tuple[dict, VerseTable, dict]:
+    """
+    Returns the book summaries, the verse table and the concordance of word:
+    [verse ordinals] of the bible dictionary.
+    """
+    verse_table = VerseTable.from_bible(bible)
+    summaries = {}
+    concordance = {}
+    for book_name, book_dict in bible.items():
+        summary = summaries[book_name] = BookSummary(book_dict, book_name).summarize()
+        for word, verse_list in summary['words_list'].items():
+            concordance.setdefault(word, []).extend(
+                verse_table.ordinal(book_name, *map(int, verse.split(':'))) for verse in verse_list)
+    return summaries, verse_table, concordance
+
+
+def json_indexes(bible: dict) -> dict:
+    """
+    Returns the search indexes the loader gives the json files, where nothing
+    is stored and every index is built when it is first needed.
+    """
+    return {'positions': LazyPositions(bible), 'fuzzy': None, 'stems': None,
+            'trigrams': None, 'verse_lengths': None, 'document_frequencies': None}
+
+
+def build_service(bible: dict) -> QueryService:
+    """
+    Returns a query service over the bible dictionary, like one loaded from
+    the json files.
+    """
+    summaries, verse_table, concordance = build_dictionaries(bible)
+    return QueryService(bible, summaries, convert_concordance(concordance, verse_table),
+                        create_testaments(bible), verse_table, json_indexes(bible))
+
+
+summary_dict, verse_table, concordance = build_dictionaries(bible_dict)
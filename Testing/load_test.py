@@ -0,0 +1,116 @@
+"""
+This module load tests the http server in server.py. It opens a number of
+connections to the server at once and has each of them make requests one
+after another over its kept-alive connection, cycling through a mix of verse,
+range, word and query lookups. When every request has been answered it prints
+the requests per second, the latency percentiles and how many requests
+failed. Start the server first and run this from the main directory:
+
+    python server.py
+    python -m Testing.load_test --connections 2000 --requests 50000
+"""
+
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlencode
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+
+REQUESTS = [
+    ('/verse', {'book': 'John', 'chapter': 3, 'verse': 16}),
+    ('/verse', {'book': 'Genesis', 'chapter': 1, 'verse': 1}),
+    ('/range', {'book': 'Psalms', 'chapter': 23, 'start': 1, 'end': 6}),
+    ('/range', {'book': 'Matthew', 'chapter': 5, 'start': 3, 'end': 12}),
+    ('/range', {'ref': 'Gen 1:1-2:3'}),
+    ('/word', {'word': 'faith'}),
+    ('/word', {'word': 'say', 'all_forms': 1}),
+    ('/word', {'word': 'beleive'}),
+    ('/query', {'q': 'faith AND works'}),
+    ('/query', {'q': '"grace of God"'}),
+    ('/query', {'q': 'love NEAR/3 neighbour'}),
+    ('/query', {'q': 'mercy truth', 'ranked': 1}),
+]
+TARGETS = [f"{path}?{urlencode(params)}" for path, params in REQUESTS]
+
+
+async def client(host: str, port: int, targets: list[str], latencies: list[float],
+                 failures: list[str]):
+    """
+    Makes the requests one after another over one connection, recording the
+    time each one took or why it failed.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as error:
+        failures.extend(f"connect: {error}" for _ in targets)
+        return
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = head.split(b' ', 2)[1]
+            length = 0
+            for line in head.split(b'\r\n'):
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status != b'200':
+                failures.append(f"{target}: {status.decode()}")
+    except (OSError, asyncio.IncompleteReadError) as error:
+        failures.append(f"connection: {error!r}")
+    finally:
+        writer.close()
+
+
+async def load_test(host: str, port: int, connections: int, requests: int):
+    """
+    Shares the requests between the connections, runs them all at once and
+    returns the total time, the latencies and the failures.
+    """
+    latencies = []
+    failures = []
+    clients = []
+    for number in range(connections):
+        count = requests // connections + (number < requests % connections)
+        targets = [TARGETS[(number + index) % len(TARGETS)] for index in range(count)]
+        clients.append(client(host, port, targets, latencies, failures))
+    start = time.perf_counter()
+    await asyncio.gather(*clients)
+    return time.perf_counter() - start, latencies, failures
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Returns the value that fraction of the sorted values are at or below.
+    """
+    return values[min(int(fraction * len(values)), len(values) - 1)] if values else 0.0
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Load test the concordance http server.')
+    arguments.add_argument('--host', default=DEFAULT_HOST)
+    arguments.add_argument('--port', type=int, default=DEFAULT_PORT)
+    arguments.add_argument('--connections', type=int, default=1000,
+                           help='number of connections open at once (default: 1000)')
+    arguments.add_argument('--requests', type=int, default=20000,
+                           help='total number of requests (default: 20000)')
+    options = arguments.parse_args()
+
+    elapsed, latencies, failures = asyncio.run(
+        load_test(options.host, options.port, options.connections, options.requests))
+    latencies.sort()
+    print(f"{len(latencies)} requests over {options.connections} connections "
+          f"in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} requests/s")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, "
+          f"max {percentile(latencies, 1.0) * 1000:.1f}ms")
+    print(f"{len(failures)} failed")
+    for failure in failures[:10]:
+        print(f"    {failure}")
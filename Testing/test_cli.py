@@ -0,0 +1,79 @@
+"""
+This module uses pytest to check the batch lookups of the command line tool.
+The made up Bible in fixture_bible is used so the tests don't need the html
+document.
+"""
+
+
+import csv
+import io
+import json
+
+from Testing.fixture_bible import bible_dict, build_service
+from cli import read_batches, lookup, run
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+service = build_service(bible_dict)
+lines = ['Genesis 1:2\n', 'earth\n', '\n', '"the earth"\n', 'selah\n', '(God\n']
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestCli:
+    """
+    This class tests the batch lookups.
+    """
+
+    def test_cli_batches_shouldpass(self):
+        """
+        Checks that the lines are split into batches without the blank lines.
+        """
+        assert list(read_batches(iter(lines), 2)) == [['Genesis 1:2', 'earth'],
+                                                      ['"the earth"', 'selah'], ['(God']]
+
+    def test_cli_lookup_shouldpass(self):
+        """
+        Checks that references give the verse and words give their counts.
+        """
+        assert lookup(service, 'Genesis 1:2') == {'input': 'Genesis 1:2', 'type': 'verse',
+                                                  'reference': 'Genesis 1:2',
+                                                  'text': bible_dict['Genesis']['1:2']}
+        assert lookup(service, 'earth', references=True) == \
+            {'input': 'earth', 'type': 'search', 'count': 3,
+             'references': ['Genesis 1:1', 'Genesis 1:2', 'Genesis 2:1']}
+        assert lookup(service, 'selah')['count'] == 0
+        passage = lookup(service, 'Gen 1:1-2')
+        assert passage['type'] == 'passage' and passage['count'] == 2
+
+    def test_cli_jsonl_shouldpass(self):
+        """
+        Checks that there is one line of JSON for every line of input.
+        """
+        output = io.StringIO()
+        assert run(service, iter(lines), output, batch_size=2) == 5
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [record['input'] for record in records] == \
+            ['Genesis 1:2', 'earth', '"the earth"', 'selah', '(God']
+        assert records[2]['count'] == 3
+
+    def test_cli_csv_shouldpass(self):
+        """
+        Checks that the CSV has a header and one row for every line of input.
+        """
+        output = io.StringIO()
+        run(service, iter(lines), output, 'csv', references=True)
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        assert len(rows) == 5
+        assert rows[1]['references'] == 'Genesis 1:1;Genesis 1:2;Genesis 2:1'
+
+    def test_cli_error_shouldfail(self):
+        """
+        Checks that a query that can't be run is reported in its result.
+        """
+        assert lookup(service, '(God')['error'] == 'A parenthesis in the query is not closed.'
@@ -0,0 +1,233 @@
+"""
+This module uses pytest to check that the binary corpus file returns the same
+text, summaries and concordance as the dictionaries it was written from. The
+made up Bible in fixture_bible is used so the tests don't need the html
+document.
+"""
+
+
+import json
+import pytest
+
+from Concordance.corpus import Corpus, BibleView, write_corpus
+from Concordance.verse_texts import VerseTexts
+from Concordance.phrase import build_positions
+from Concordance.fuzzy import build_fuzzy_table
+from Concordance.stems import build_stem_index
+from Concordance.ranking import build_verse_lengths, build_document_frequencies
+from Concordance.loader import open_corpus, load_bible, load_concordance
+from Testing.fixture_bible import bible_dict, summary_dict, verse_table, concordance
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+@pytest.fixture
+def corpus(tmp_path):
+    """
+    Writes the corpus to a temporary directory and opens it.
+    """
+    path = tmp_path / 'kjv_corpus.bin'
+    write_corpus(path, bible_dict, concordance)
+    with Corpus(path) as corpus:
+        yield corpus
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestCorpus:
+    """
+    This class tests that the views of the corpus match the dictionaries.
+    """
+
+    def test_corpus_books_shouldpass(self, corpus):
+        """
+        Checks that the books are in the same order as the bible dictionary.
+        """
+        assert list(corpus.bible.keys()) == list(bible_dict.keys())
+
+    def test_corpus_text_shouldpass(self, corpus):
+        """
+        Checks that every verse decodes to the original text.
+        """
+        for book_name, book_dict in bible_dict.items():
+            assert dict(corpus.bible[book_name]) == book_dict
+
+    def test_corpus_verse_texts_shouldpass(self, corpus):
+        """
+        Checks that the verse text can be read by ordinal and by slice.
+        """
+        verse_texts = [verse_text for book_dict in bible_dict.values()
+                       for verse_text in book_dict.values()]
+        assert corpus.verse_texts[1:4] == verse_texts[1:4]
+        assert corpus.verse_texts[-1] == verse_texts[-1]
+        assert list(corpus.verse_texts) == verse_texts
+        assert corpus.verse_texts[4:2] == []
+
+    def test_corpus_summary_shouldpass(self, corpus):
+        """
+        Checks that the chapters and verses match the book summaries once the
+        chapter keys are strings like they are in the json file.
+        """
+        for book_name, summary in summary_dict.items():
+            chapter_verses = {str(key): value for key, value in summary['chapter_verses'].items()}
+            assert corpus.summary[book_name]['number_chapters'] == summary['number_chapters']
+            assert corpus.summary[book_name]['chapter_verses'] == chapter_verses
+
+    def test_corpus_concordance_shouldpass(self, corpus):
+        """
+        Checks that every word returns the same verse ordinals in the same
+        order.
+        """
+        assert sorted(corpus.concordance.keys()) == sorted(concordance.keys())
+        for word, verses in concordance.items():
+            assert corpus.concordance[word].tolist() == verses
+
+    def test_corpus_positions_shouldpass(self, tmp_path, corpus):
+        """
+        Checks that the word positions are read back in the same order as the
+        concordance, and that a corpus written without them has none.
+        """
+        assert corpus.positions is None
+        positions = build_positions(bible_dict)
+        path = tmp_path / 'positions.bin'
+        write_corpus(path, bible_dict, concordance, positions)
+        with Corpus(path) as positions_corpus:
+            for word, word_positions in positions.items():
+                assert positions_corpus.positions[word].tolist() == word_positions.tolist()
+
+    def test_corpus_fuzzy_shouldpass(self, corpus):
+        """
+        Checks that the fuzzy index in the corpus matches the one built in
+        memory.
+        """
+        fuzzy_table = build_fuzzy_table(sorted(concordance))
+        assert len(corpus.fuzzy) == len(fuzzy_table)
+        for string, words in fuzzy_table.items():
+            assert corpus.fuzzy[string].tolist() == words.tolist()
+
+    def test_corpus_stems_shouldpass(self, tmp_path):
+        """
+        Checks that the stem postings and forms are read back from the corpus.
+        """
+        stem_concordance = dict(concordance, make=[2], maketh=[0, 3], makest=[3], saith=[4])
+        stem_postings, stem_forms = build_stem_index(stem_concordance)
+        path = tmp_path / 'stems.bin'
+        write_corpus(path, bible_dict, stem_concordance, stems=(stem_postings, stem_forms))
+        with Corpus(path) as stems_corpus:
+            assert dict(stems_corpus.stem_forms) == {'make': ['make', 'makest', 'maketh'],
+                                                     'say': ['saith']}
+            for word_stem, postings in stem_postings.items():
+                assert stems_corpus.stem_postings[word_stem].tolist() == postings.tolist()
+
+    def test_corpus_ranking_shouldpass(self, corpus):
+        """
+        Checks that the verse lengths and document frequencies in the corpus
+        match the ones worked out in memory.
+        """
+        assert corpus.verse_lengths.tolist() == build_verse_lengths(bible_dict).tolist()
+        assert dict(corpus.document_frequencies) == build_document_frequencies(concordance)
+
+    @pytest.mark.parametrize('json_files', [False, True])
+    def test_corpus_loader_shouldpass(self, tmp_path, json_files):
+        """
+        Checks that the Bible can be loaded on its own before the concordance,
+        from the corpus or from the json files.
+        """
+        if json_files:
+            with open(tmp_path / 'kjv_bible.json', 'w') as bible_file:
+                json.dump(bible_dict, bible_file)
+            with open(tmp_path / 'concordance.json', 'w') as concordance_file:
+                json.dump(concordance, concordance_file)
+        else:
+            write_corpus(tmp_path / 'kjv_corpus.bin', bible_dict, concordance)
+        corpus = open_corpus(tmp_path)
+        assert (corpus is None) == json_files
+        bible, summary, testaments, table, verse_texts = load_bible(tmp_path, corpus)
+        assert bible['Genesis']['1:2'] == bible_dict['Genesis']['1:2']
+        assert summary['Genesis']['number_chapters'] == 2
+        assert testaments['New Testament'] == ['Matthew', 'Song of Songs']
+        loaded, indexes = load_concordance(tmp_path, bible, table, corpus)
+        assert list(loaded['earth']) == concordance['earth']
+        assert 'positions' in indexes
+
+    def test_corpus_missing_shouldfail(self, corpus):
+        """
+        Checks that missing words and verses aren't found.
+        """
+        assert 'selah' not in corpus.concordance
+        with pytest.raises(KeyError):
+            corpus.bible['Genesis']['3:1']
+
+
+class TestVerseTable:
+    """
+    This class tests that verse ordinals and references convert both ways.
+    """
+
+    def test_verse_table_ordinals_shouldpass(self):
+        """
+        Checks that the ordinals count the verses in order through the books.
+        """
+        assert verse_table.ordinal('Genesis', 1, 1) == 0
+        assert verse_table.ordinal('Genesis', 2, 1) == 2
+        assert verse_table.ordinal('Song of Songs', 1, 1) == 5
+        assert len(verse_table) == 6
+        assert verse_table.chapter_range('Genesis', 1) == (0, 2)
+        assert verse_table.chapter_range('Genesis', 2) == (2, 3)
+
+    def test_verse_table_references_shouldpass(self):
+        """
+        Checks that every ordinal turns back into the same reference.
+        """
+        for ordinal in range(len(verse_table)):
+            reference = verse_table.reference(ordinal)
+            assert verse_table.parse_reference(reference) == ordinal
+        assert verse_table.location(5) == ('Song of Songs', 1, 1)
+
+    def test_verse_table_missing_shouldfail(self):
+        """
+        Checks that verses that don't exist return -1.
+        """
+        assert verse_table.ordinal('Genesis', 1, 3) == -1
+        assert verse_table.ordinal('Exodus', 1, 1) == -1
+        assert verse_table.chapter_range('Genesis', 4) == (-1, -1)
+        assert verse_table.parse_reference('Genesis one') == -1
+
+
+class TestVerseTexts:
+    """
+    This class tests the buffer of verse text packed from the bible
+    dictionary.
+    """
+
+    def test_verse_texts_views_shouldpass(self):
+        """
+        Checks that single verses and runs of verses are slices of the buffer
+        that decode to the original text.
+        """
+        verse_texts = VerseTexts.from_bible(bible_dict)
+        view = verse_texts.view(5)
+        assert isinstance(view, memoryview) and view.obj is verse_texts.text.obj
+        assert str(view, 'UTF-8') == bible_dict['Song of Songs']['1:1']
+        assert bytes(verse_texts.view_range(0, 2)) == (bible_dict['Genesis']['1:1'] +
+                                                       bible_dict['Genesis']['1:2']).encode('UTF-8')
+        assert verse_texts[3:5] == list(bible_dict['Matthew'].values())
+        assert verse_texts.nbytes == len(verse_texts.text) + 4 * 7
+
+    def test_verse_texts_bible_shouldpass(self):
+        """
+        Checks that the bible view over the buffer can be used in place of the
+        bible dictionary.
+        """
+        bible = BibleView(verse_table, VerseTexts.from_bible(bible_dict))
+        assert bible == bible_dict
+        assert bible['Matthew']['1:2'] == bible_dict['Matthew']['1:2']
+        assert bible['Genesis'].items() == list(bible_dict['Genesis'].items())
+        with pytest.raises(KeyError):
+            bible['Genesis']['1:3']
+        with pytest.raises(IndexError):
+            VerseTexts.from_bible(bible_dict)[6]
@@ -0,0 +1,159 @@
+"""
+This module uses pytest to check the build pipeline in create_dictionaries. It
+uses a few made up books of scraped paragraphs, and the small html document
+stream_parser.html in this directory, so the tests don't need the html
+document of the whole Bible.
+"""
+
+
+from pathlib import Path
+from ScrapeText import create_dictionaries
+from Concordance.corpus import CORPUS_NAME
+from ScrapeText.create_dictionaries import build_books, build_books_incremental, merge_postings, \
+    merge_positions, pipeline_hash
+from Concordance.phrase import build_positions
+from Concordance.verses import VerseTable
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+paragraphs = ['\r\n1:1 Paul, an apostle, (not of men, neither by man, but by Jesus Christ, and God\r\n'
+              'the Father, who raised him from the dead;) 1:2 And all the brethren\r\n',
+              '\r\n1:3 Grace be to you and peace from God the Father, and from our Lord Jesus Christ,\r\n',
+              '\r\n2:1 Then fourteen years after I went up again to Jerusalem with Barnabas\r\n',
+              '\r\n3:6 Even as Abraham believed God, and it was accounted to him for righteousness.\r\n'
+              '3:7 Know ye therefore that they which are of faith, the same are the children\r\n'
+              'of Abraham.\r\n',
+              '\r\n3:8 And the scripture, foreseeing that God would justify the heathen through\r\n'
+              'faith, preached before the gospel unto Abraham\r\n']
+
+# Each book gets a different slice of the paragraphs so the postings differ
+scraped_text = {'Genesis': paragraphs[:3],
+                '1 Samuel': ['OTHERWISE CALLED', 'THE FIRST BOOK'] + paragraphs[1:],
+                'Matthew': paragraphs[3:],
+                'Galatians': paragraphs}
+html_path = Path(__file__).with_name('stream_parser.html')
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestBuildBooks:
+    """
+    This class tests that building the books in worker processes gives the same
+    result as building them one after the other.
+    """
+    serial = build_books(scraped_text, workers=1)
+
+    def test_build_order_shouldpass(self):
+        """
+        Checks that the books come back in the scraped order.
+        """
+        parallel = build_books(scraped_text, workers=2)
+        assert list(parallel.keys()) == list(scraped_text.keys())
+
+    def test_build_parallel_shouldpass(self):
+        """
+        Checks that the verses, word positions and merged concordance are the
+        same with one worker and with several.
+        """
+        parallel = build_books(scraped_text, workers=3)
+        for name in scraped_text:
+            assert parallel[name][0] == self.serial[name][0]
+            assert parallel[name][2] == self.serial[name][2]
+
+        verse_table = VerseTable.from_bible({name: book[0] for name, book in self.serial.items()})
+        serial_concordance = merge_postings(self.serial, verse_table)
+        parallel_concordance = merge_postings(parallel, verse_table)
+        assert list(parallel_concordance.keys()) == list(serial_concordance.keys())
+        assert parallel_concordance == serial_concordance
+
+    def test_build_ordinals_shouldpass(self):
+        """
+        Checks that the merged ordinals point at verses that hold the word.
+        """
+        kjv_bible = {name: book[0] for name, book in self.serial.items()}
+        verse_table = VerseTable.from_bible(kjv_bible)
+        concordance = merge_postings(self.serial, verse_table)
+        for ordinal in concordance['abraham']:
+            book, chapter, verse = verse_table.location(ordinal)
+            assert 'abraham' in kjv_bible[book][f"{chapter}:{verse}"].lower()
+
+    def test_build_positions_shouldpass(self):
+        """
+        Checks that the merged word positions match the positions read from
+        the verses and line up with the merged ordinals.
+        """
+        kjv_bible = {name: book[0] for name, book in self.serial.items()}
+        concordance = merge_postings(self.serial, VerseTable.from_bible(kjv_bible))
+        positions = merge_positions(self.serial)
+        assert positions == build_positions(kjv_bible)
+        for word, verses in concordance.items():
+            assert len(positions[word]) == len(verses)
+
+    def test_build_files_shouldpass(self, tmp_path):
+        """
+        Creates the dictionaries from the html document with one worker and
+        with two, and checks that every file written is the same byte for
+        byte.
+        """
+        for workers in (1, 2):
+            directory = tmp_path / f"workers_{workers}"
+            directory.mkdir()
+            create_dictionaries.create_dictionaries(directory, html_file=html_path,
+                                                    workers=workers)
+        for file_name in ('kjv_bible.json', 'concordance.json', CORPUS_NAME):
+            serial_bytes = (tmp_path / 'workers_1' / file_name).read_bytes()
+            assert serial_bytes
+            assert (tmp_path / 'workers_2' / file_name).read_bytes() == serial_bytes
+
+
+class TestIncrementalBuild:
+    """
+    This class tests that the build cache only rebuilds the books that changed
+    and gives the same result as building every book.
+    """
+
+    def test_incremental_unchanged_shouldpass(self, tmp_path):
+        """
+        Checks that every book is built the first time and none the second.
+        """
+        _, rebuilt = build_books_incremental(scraped_text, tmp_path, workers=1)
+        assert rebuilt == list(scraped_text.keys())
+        books, rebuilt = build_books_incremental(scraped_text, tmp_path, workers=1)
+        assert rebuilt == []
+        assert books == build_books(scraped_text, workers=1)
+
+    def test_incremental_changed_shouldpass(self, tmp_path):
+        """
+        Checks that changing one book only rebuilds that book and that the
+        merged concordance matches a full build.
+        """
+        build_books_incremental(scraped_text, tmp_path, workers=1)
+        changed_text = dict(scraped_text)
+        changed_text['Matthew'] = paragraphs[3:] + ['\r\n3:9 So then they which be of faith\r\n']
+        books, rebuilt = build_books_incremental(changed_text, tmp_path, workers=1)
+        assert rebuilt == ['Matthew']
+
+        full = build_books(changed_text, workers=1)
+        verse_table = VerseTable.from_bible({name: book[0] for name, book in full.items()})
+        assert merge_postings(books, verse_table) == merge_postings(full, verse_table)
+        assert len(list(tmp_path.glob('*.pickle'))) == len(changed_text)
+
+    def test_incremental_pipeline_shouldpass(self, tmp_path, monkeypatch):
+        """
+        Checks that the pipeline hash comes from the source code of the build
+        steps and that changing it rebuilds every book.
+        """
+        build_books_incremental(scraped_text, tmp_path, workers=1)
+        original = pipeline_hash()
+        monkeypatch.setattr(create_dictionaries, 'PIPELINE_SOURCES',
+                            create_dictionaries.PIPELINE_SOURCES[:2])
+        assert pipeline_hash() != original
+        books, rebuilt = build_books_incremental(scraped_text, tmp_path, workers=1)
+        assert rebuilt == list(scraped_text.keys())
+        assert books == build_books(scraped_text, workers=1)
+        assert len(list(tmp_path.glob('*.pickle'))) == len(scraped_text)
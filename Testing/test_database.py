@@ -0,0 +1,188 @@
+"""
+This module uses pytest to check that the SQLite database returns the same
+text, summaries and concordance as the dictionaries it was written from, that
+its full text index finds the same phrases as the word positions, and that the
+loader reads it the same way as the other backends. The made up Bible in
+fixture_bible is used so the tests don't need the html document.
+"""
+
+
+import json
+import sqlite3
+import pytest
+
+from Concordance.database import Database, WordPrefixes, write_database, DATABASE_NAME
+from Concordance.corpus import Corpus, write_corpus
+from Concordance.phrase import PhraseSearch, build_positions
+from Concordance.prefix import PrefixIndex
+from Concordance.stems import build_stem_index
+from Concordance.ranking import build_verse_lengths, build_document_frequencies
+from Concordance.loader import open_storage, load_dictionaries
+from Concordance.query import QueryService
+from Testing.fixture_bible import bible_dict, verse_table, concordance
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+phrase_search = PhraseSearch(concordance, build_positions(bible_dict))
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Writes the database to a temporary directory and opens it.
+    """
+    path = tmp_path / DATABASE_NAME
+    write_database(path, bible_dict, concordance, build_stem_index(concordance))
+    with Database(path) as database:
+        yield database
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestDatabase:
+    """
+    This class tests that the views of the database match the dictionaries.
+    """
+
+    def test_database_bible_shouldpass(self, database):
+        """
+        Checks that every verse, the verse table and the summaries match.
+        """
+        assert database.bible == bible_dict
+        assert list(database.table.chapters) == list(verse_table.chapters)
+        assert database.verse_texts[1:4] == [bible_dict['Genesis']['1:2'],
+                                             bible_dict['Genesis']['2:1'],
+                                             bible_dict['Matthew']['1:1']]
+        assert database.summary['Genesis']['chapter_verses'] == {'1': 2, '2': 1}
+
+    def test_database_concordance_shouldpass(self, database):
+        """
+        Checks that the postings, counts and ranking numbers match the ones
+        worked out in memory, and that the stem index is stored.
+        """
+        assert {word: postings.tolist() for word, postings in
+                database.concordance.items()} == concordance
+        assert database.word_counts['the'] == len(concordance['the'])
+        assert database.verse_lengths.tolist() == build_verse_lengths(bible_dict).tolist()
+        assert dict(database.document_frequencies) == build_document_frequencies(concordance)
+        stem_postings, stem_forms = build_stem_index(concordance)
+        for word_stem, forms in stem_forms.items():
+            assert database.stem_forms[word_stem] == forms
+            assert database.stem_postings[word_stem].tolist() == stem_postings[word_stem].tolist()
+
+    @pytest.mark.parametrize('query', ['"the earth"', '"the son of David"', '"Isaac begat"',
+                                       '"song of songs"', '"earth the"', 'the NEAR/1 earth',
+                                       'god NEAR/3 earth', 'and NEAR/2 and', 'the NEAR the',
+                                       'begat NEAR/0 isaac'])
+    def test_database_phrases_shouldpass(self, database, query):
+        """
+        Checks that the full text index finds the same verses as searching
+        the word positions.
+        """
+        assert database.phrases.search(query).tolist() == phrase_search.search(query).tolist()
+
+    @pytest.mark.parametrize('prefix', ['t', 'the', 'be', 'ISAAC ', 'so', 'x', 'solomon’s'])
+    def test_database_complete_shouldpass(self, database, prefix):
+        """
+        Checks that the range query over the words table completes a prefix
+        the same way as the sorted vocabulary, and that the vocabulary is only
+        read for the fuzzy index.
+        """
+        prefix_index = PrefixIndex(concordance)
+        assert database.prefixes.complete(prefix, limit=3) == \
+            prefix_index.complete(prefix, limit=3)
+        assert database.prefixes.count(prefix) == prefix_index.count(prefix)
+        assert database.prefixes.words == prefix_index.words
+        assert database.prefixes.counts == prefix_index.counts
+
+    def test_database_missing_shouldfail(self, database, tmp_path):
+        """
+        Checks that missing words and verses aren't found and that a file
+        that isn't the database can't be opened.
+        """
+        assert 'selah' not in database.concordance
+        with pytest.raises(KeyError):
+            database.concordance['selah']
+        with pytest.raises(KeyError):
+            database.bible['Genesis']['3:1']
+        with pytest.raises(IndexError):
+            database.verse_texts[len(verse_table)]
+        other_path = tmp_path / 'other.sqlite'
+        sqlite3.connect(other_path).close()
+        with pytest.raises(ValueError):
+            Database(other_path)
+
+
+class TestBackends:
+    """
+    This class tests that the loader reads every backend the same way.
+    """
+
+    @pytest.fixture
+    def directory(self, tmp_path):
+        """
+        Writes the json files, the corpus and the database to a temporary
+        directory.
+        """
+        with open(tmp_path / 'kjv_bible.json', 'w') as bible_file:
+            json.dump(bible_dict, bible_file)
+        with open(tmp_path / 'concordance.json', 'w') as concordance_file:
+            json.dump(concordance, concordance_file)
+        write_corpus(tmp_path / 'kjv_corpus.bin', bible_dict, concordance)
+        write_database(tmp_path / DATABASE_NAME, bible_dict, concordance)
+        return tmp_path
+
+    @pytest.mark.parametrize('query', ['earth', '"the earth"', 'god NEAR/3 earth',
+                                       'earth AND NOT god', '/^And the/'])
+    def test_backends_search_shouldpass(self, directory, query):
+        """
+        Checks that searches over the database find the same verses as over
+        the corpus and the json files.
+        """
+        results = [QueryService.load(directory, backend).search(query).results
+                   for backend in ('corpus', 'sqlite', 'json')]
+        assert list(results[0]) == list(results[1]) == list(results[2])
+
+    @pytest.mark.parametrize('prefix', ['th', 'be', 'son'])
+    def test_backends_complete_shouldpass(self, directory, prefix):
+        """
+        Checks that completions and suggestions from the database match the
+        corpus and the json files.
+        """
+        services = [QueryService.load(directory, backend) for backend in ('corpus', 'sqlite',
+                                                                          'json')]
+        assert isinstance(services[1].prefix_index, WordPrefixes)
+        completions = [service.complete(prefix) for service in services]
+        assert completions[0] == completions[1] == completions[2]
+        suggestions = [service.word('eart').suggestions for service in services]
+        assert suggestions[0] == suggestions[1] == suggestions[2] != []
+
+    def test_backends_choice_shouldpass(self, directory):
+        """
+        Checks that the corpus is used before the database when no backend
+        is given, and that the database is opened when it is asked for.
+        """
+        assert isinstance(open_storage(directory), Corpus)
+        assert isinstance(open_storage(directory, 'sqlite'), Database)
+        assert open_storage(directory, 'json') is None
+        (directory / 'kjv_corpus.bin').unlink()
+        assert isinstance(open_storage(directory), Database)
+        bible, summary, loaded, testaments, table, indexes = load_dictionaries(directory)
+        assert indexes['phrases'] is not None and indexes['positions'] is None
+        assert isinstance(indexes['prefixes'], WordPrefixes)
+        assert list(loaded['earth']) == concordance['earth']
+
+    def test_backends_missing_shouldfail(self, tmp_path):
+        """
+        Checks that an unknown backend, or one that isn't in the directory,
+        raises an error.
+        """
+        with pytest.raises(ValueError):
+            open_storage(tmp_path, 'xml')
+        with pytest.raises(FileNotFoundError):
+            open_storage(tmp_path, 'sqlite')
@@ -0,0 +1,157 @@
+"""
+This module uses pytest to check the on-disk cache used for the url source. A
+local http server stands in for the Gutenberg website so the tests don't need
+the internet. It counts the requests it gets and answers 304 Not Modified when
+the cache sends back the right ETag or Last-Modified date.
+"""
+
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+import requests
+
+from ScrapeText.http_cache import HTTPCache
+from ScrapeText.scraper import ScrapeHTMLBible
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+html = ('<html><body><div class="chapter"><h2>The Epistle of Paul the Apostle '
+        'to the Galatians</h2>\r\n<p>\r\n1:1 Paul, an apostle, 1:2 And all the '
+        'brethren\r\n</p>\r\n<p>1:3 Grace be to you &amp; peace</p></div>'
+        '</body></html>').encode('UTF-8')
+last_modified = 'Tue, 11 Jun 2024 00:00:00 GMT'
+
+
+class BibleHandler(BaseHTTPRequestHandler):
+    """
+    Serves the html with an ETag and a Last-Modified date. If use_etag is
+    False on the server only the Last-Modified date is sent, and if
+    always_not_modified is True every request gets a 304.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        etag = '"v1"' if self.server.use_etag else None
+        not_modified = (etag is not None and self.headers.get('If-None-Match') == etag) or \
+            (etag is None and self.headers.get('If-Modified-Since') == last_modified)
+        if not_modified or self.server.always_not_modified:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Length', str(len(html)))
+        self.end_headers()
+        self.wfile.write(html)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """
+    Starts the local server in a thread and shuts it down after the test.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BibleHandler)
+    server.requests = []
+    server.not_modified = 0
+    server.use_etag = True
+    server.always_not_modified = False
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/pg10-images.html"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestHTTPCache:
+    """
+    This class tests downloading, revalidating and reading the cache offline.
+    """
+
+    def test_cache_download_shouldpass(self, server, tmp_path):
+        """
+        Checks that the first fetch downloads the html and stores it.
+        """
+        cache = HTTPCache(tmp_path)
+        assert cache.refresh(server.url) == 'downloaded'
+        assert cache.fetch(server.url) == html
+
+    def test_cache_etag_shouldpass(self, server, tmp_path):
+        """
+        Checks that fetching again sends the ETag and gets a 304.
+        """
+        cache = HTTPCache(tmp_path)
+        cache.fetch(server.url)
+        assert cache.refresh(server.url) == 'revalidated'
+        assert cache.fetch(server.url) == html
+        assert server.not_modified == 2
+
+    def test_cache_last_modified_shouldpass(self, server, tmp_path):
+        """
+        Checks that the Last-Modified date is used when there is no ETag.
+        """
+        server.use_etag = False
+        cache = HTTPCache(tmp_path)
+        cache.fetch(server.url)
+        assert cache.refresh(server.url) == 'revalidated'
+
+    def test_cache_offline_shouldpass(self, server, tmp_path):
+        """
+        Checks that a warm cache works with offline=True and when the server
+        has gone away.
+        """
+        HTTPCache(tmp_path).fetch(server.url)
+        requests_made = len(server.requests)
+        assert HTTPCache(tmp_path, offline=True).fetch(server.url) == html
+        assert len(server.requests) == requests_made
+
+        server.shutdown()
+        server.server_close()
+        assert HTTPCache(tmp_path).fetch(server.url) == html
+
+    def test_cache_offline_cold_shouldfail(self, tmp_path):
+        """
+        Checks that an empty cache can't be used offline.
+        """
+        with pytest.raises(FileNotFoundError):
+            HTTPCache(tmp_path, offline=True).fetch('http://127.0.0.1:9/bible.html')
+
+    def test_cache_not_modified_cold_shouldfail(self, server, tmp_path):
+        """
+        Checks that a 304 for a url that isn't cached is an error and that
+        nothing is stored for it.
+        """
+        server.always_not_modified = True
+        cache = HTTPCache(tmp_path)
+        with pytest.raises(requests.HTTPError):
+            cache.refresh(server.url)
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize("parser", ['soup', 'stream'])
+    def test_cache_scraper_shouldpass(self, server, tmp_path, parser):
+        """
+        Checks that the scraper gets the same text with and without the cache
+        and that the second scrape doesn't download the html again.
+        """
+        uncached = ScrapeHTMLBible(url=server.url, parser=parser, cache_dir=None)
+        expected = uncached.convert_to_dict()
+        for _ in range(2):
+            cached = ScrapeHTMLBible(url=server.url, parser=parser, cache_dir=tmp_path)
+            assert cached.convert_to_dict() == expected
+            assert cached.scraped_text == uncached.scraped_text
+        assert server.not_modified == 1
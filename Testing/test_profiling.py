@@ -0,0 +1,90 @@
+"""
+This module uses pytest to check the stages recorded by the profiling module
+and the files it writes.
+"""
+
+
+import json
+
+from Concordance import profiling
+from Concordance.profiling import Profiler
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+def count_words(book_name, text):
+    return len(text.split())
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestProfiler:
+    """
+    This class tests recording stages and exporting them.
+    """
+
+    def test_profiler_stages_shouldpass(self):
+        """
+        Checks that nested stages are recorded with their args and added up
+        by name and by book.
+        """
+        profiler = Profiler()
+        with profiler.stage('build_books', 'build'):
+            for book in ('Genesis', 'Exodus'):
+                with profiler.stage('summarize', 'build', book=book):
+                    sum(range(1000))
+        summary = profiler.summary()
+        assert summary['stages']['summarize']['count'] == 2
+        assert summary['stages']['build_books']['total_ms'] >= \
+            summary['stages']['summarize']['total_ms']
+        assert list(summary['books']) == ['Genesis', 'Exodus']
+
+    def test_profiler_memory_shouldpass(self):
+        """
+        Checks that the peak of an inner stage counts towards the stage
+        around it.
+        """
+        profiler = Profiler(memory=True)
+        with profiler.stage('outer'):
+            with profiler.stage('inner'):
+                data = bytearray(1 << 20)
+                del data
+        events = {event['name']: event for event in profiler.events}
+        assert events['inner']['peak'] >= 1 << 20
+        assert events['outer']['peak'] >= events['inner']['peak']
+
+    def test_profiler_files_shouldpass(self, tmp_path):
+        """
+        Checks that the profile and the Chrome trace are written as JSON.
+        """
+        profiler = Profiler()
+        with profiler.stage('write_json', 'build', file='kjv_bible.json'):
+            pass
+        profile_path, trace_path = profiler.write(tmp_path)
+        with open(profile_path) as profile_file:
+            assert json.load(profile_file)['events'][0]['args'] == {'file': 'kjv_bible.json'}
+        with open(trace_path) as trace_file:
+            event = json.load(trace_file)['traceEvents'][0]
+        assert event['ph'] == 'X' and event['name'] == 'write_json' and event['ts'] == 0
+
+    def test_profiled_shouldpass(self):
+        """
+        Checks that the decorator only wraps functions while profiling is on
+        and that collected stages are added to the profile.
+        """
+        assert profiling.profiled()(count_words) is count_words
+        profiler = profiling.enable()
+        try:
+            timed = profiling.profiled('count', args=lambda book, text: {'book': book})(count_words)
+            assert timed('Jude', 'the grace of God') == 4
+            result, events = profiling.collect(timed, 'John', 'Jesus wept')
+            assert result == 2 and len(profiler.events) == 1
+            assert profiling.collected((result, events)) == 2
+            assert [event['args']['book'] for event in profiler.events] == ['Jude', 'John']
+        finally:
+            profiling.disable()
+        assert profiling.stage('off') is profiling.NULL_STAGE
@@ -0,0 +1,241 @@
+"""
+This module uses pytest to check the query service and the http server that
+serves it. The made up Bible in fixture_bible is used, with two more books,
+so the tests don't need the html document.
+"""
+
+
+import asyncio
+import json
+import time
+import pytest
+from http import HTTPStatus
+
+from Concordance.query import QueryService
+from Concordance.loader import create_testaments, convert_concordance
+from Testing import fixture_bible
+from server import ConcordanceServer
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+# John and Jude are added to the shared Bible for the references
+bible_dict = {
+    **fixture_bible.bible_dict,
+    'John': {'3:16': 'For God so loved the world, that he gave his only begotten Son.'},
+    'Jude': {'1:3': 'Beloved, when I gave all diligence to write unto you.',
+             '1:4': 'For there are certain men crept in unawares.'},
+}
+summary_dict, verse_table, concordance = fixture_bible.build_dictionaries(bible_dict)
+concordance = convert_concordance(concordance, verse_table)
+indexes = fixture_bible.json_indexes(bible_dict)
+service = QueryService(bible_dict, summary_dict, concordance, create_testaments(bible_dict),
+                       verse_table, indexes)
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestQueryService:
+    """
+    This class tests the lookups of the query service.
+    """
+
+    def test_query_verse_shouldpass(self):
+        """
+        Checks that a verse is returned with its reference.
+        """
+        assert service.verse('John', 3, 16) == {'reference': 'John 3:16',
+                                                'text': bible_dict['John']['3:16']}
+
+    def test_query_range_shouldpass(self):
+        """
+        Checks that a range can run into the next chapter.
+        """
+        verses = service.verse_range('Genesis', 1, 2, 1, end_chapter=2)
+        assert [verse['reference'] for verse in verses] == ['Genesis 1:2', 'Genesis 2:1']
+
+    def test_query_search_shouldpass(self):
+        """
+        Checks that each kind of search gives the same verses as the index it
+        uses.
+        """
+        assert service.search('earth').results.tolist() == [0, 1, 2]
+        assert service.search('earth').message == '3 occurrences.'
+        assert service.search('God AND NOT earth').results.tolist() == [6]
+        assert service.search('/^The/').results.tolist() == [3, 5]
+        ranked = service.search('God heaven', ranked=True)
+        assert ranked.results[0] == 0 and len(ranked.scores) == 2
+
+    def test_query_page_shouldpass(self):
+        """
+        Checks that a page of a result holds the references from the offset.
+        """
+        page = service.result_page(service.search('the'), offset=1, limit=2)
+        assert page['count'] == len(concordance['the'])
+        assert page['references'] == ['Genesis 1:1', 'Genesis 1:1']
+
+    def test_query_suggestions_shouldpass(self):
+        """
+        Checks that a missing word suggests close words.
+        """
+        result = service.search('erth')
+        assert not len(result) and ('earth', 3) in result.suggestions
+
+    def test_query_loading_shouldpass(self):
+        """
+        Checks that verses can be looked up before the concordance is given,
+        and words can be searched after.
+        """
+        loading = QueryService(bible_dict, summary_dict, None, create_testaments(bible_dict),
+                               verse_table, {'verse_texts': None})
+        assert not loading.ready
+        assert loading.passage('Gen 1:2-2:1')[0]['reference'] == 'Genesis 1:2'
+        loading.set_concordance(concordance, indexes)
+        assert loading.ready and loading.search('earth').results.tolist() == [0, 1, 2]
+
+    def test_query_missing_shouldfail(self):
+        """
+        Checks that missing verses raise KeyError and bad queries are errors.
+        """
+        with pytest.raises(KeyError):
+            service.verse('John', 3, 17)
+        with pytest.raises(ValueError):
+            service.verse_range('Genesis', 2, 1, 1, end_chapter=1)
+        assert service.search('(God').error
+        assert service.search('/(God/').error
+
+
+class TestReferences:
+    """
+    This class tests reading references into slices of verse ordinals.
+    """
+    parser = service.reference_parser
+
+    @pytest.mark.parametrize('name, book', [('Gen', 'Genesis'), ('gn.', 'Genesis'),
+                                            ('MATT', 'Matthew'), ('Jn', 'John'),
+                                            ('The Gospel According to Saint John', 'John'),
+                                            ('Jud', 'Jude'), ('genesi', 'Genesis')])
+    def test_references_books_shouldpass(self, name, book):
+        """
+        Checks that names, abbreviations and unique starts of names are known.
+        """
+        assert self.parser.book(name) == book
+
+    @pytest.mark.parametrize('reference, passage', [('Gen 1:1-2:1', (0, 3)), ('Gen 1', (0, 2)),
+                                                    ('Genesis 1:2', (1, 2)), ('Gen 1-2', (0, 3)),
+                                                    ('Gen 1:2 - 2:1', (1, 3)),
+                                                    ('Gen 1-2:1', (0, 3)), ('Jude 4', (8, 9)),
+                                                    ('Jude 3-4', (7, 9)), ('Jude 1:4', (8, 9))])
+    def test_references_passages_shouldpass(self, reference, passage):
+        """
+        Checks that chapters, verses and ranges across chapters give the
+        ordinals from the first verse up to the one after the last.
+        """
+        assert self.parser.parse(reference) == passage
+
+    def test_references_text_shouldpass(self):
+        """
+        Checks that the verses of a passage come back with their text.
+        """
+        assert service.passage('Gen 1:2-2:1') == [
+            {'reference': 'Genesis 1:2', 'text': bible_dict['Genesis']['1:2']},
+            {'reference': 'Genesis 2:1', 'text': bible_dict['Genesis']['2:1']}]
+
+    @pytest.mark.parametrize('reference, error', [('J 3:16', ValueError), ('Gen', ValueError),
+                                                  ('Exodus 1:1', ValueError),
+                                                  ('Gen 2:1-1:1', ValueError),
+                                                  ('Gen 3', KeyError), ('Gen 1:9', KeyError)])
+    def test_references_invalid_shouldfail(self, reference, error):
+        """
+        Checks that references that can't be read or aren't in the Bible
+        raise errors.
+        """
+        with pytest.raises(error):
+            self.parser.parse(reference)
+
+
+class TestServer:
+    """
+    This class tests the endpoints of the http server.
+    """
+    server = ConcordanceServer(service)
+
+    def test_server_endpoints_shouldpass(self):
+        """
+        Checks that every endpoint answers with the query service's values.
+        """
+        status, body = self.server.respond('GET', '/verse?book=John&chapter=3&verse=16')
+        assert status == HTTPStatus.OK and body['reference'] == 'John 3:16'
+        status, body = self.server.respond('GET', '/range?book=Genesis&chapter=1&start=1&end=2')
+        assert status == HTTPStatus.OK and body['count'] == 2
+        status, body = self.server.respond('GET', '/range?ref=Gen+1:2-2:1')
+        assert status == HTTPStatus.OK and body['count'] == 2
+        status, body = self.server.respond('GET', '/word?word=God')
+        assert body['references'] == ['Genesis 1:1', 'John 3:16']
+        status, body = self.server.respond('GET', '/query?q=God+OR+earth&limit=2')
+        assert body['count'] == 4 and len(body['references']) == 2
+        status, body = self.server.respond('GET', '/word?word=God&facets=1')
+        assert body['facets'] == {'testaments': {'Old Testament': 1, 'New Testament': 1},
+                                  'books': {'Genesis': 1, 'John': 1}}
+
+    def test_server_errors_shouldfail(self):
+        """
+        Checks the status of requests that can't be answered.
+        """
+        assert self.server.respond('GET', '/verse?book=John&chapter=3&verse=17')[0] == \
+            HTTPStatus.NOT_FOUND
+        assert self.server.respond('GET', '/verse?book=John&chapter=x&verse=1')[0] == \
+            HTTPStatus.BAD_REQUEST
+        assert self.server.respond('GET', '/query?q=%28God')[0] == HTTPStatus.BAD_REQUEST
+        assert self.server.respond('GET', '/psalm')[0] == HTTPStatus.NOT_FOUND
+        assert self.server.respond('POST', '/word?word=God')[0] == HTTPStatus.METHOD_NOT_ALLOWED
+        assert self.server.respond('GET', '/verse?book=John&chapter=3&verse=\u00b2')[0] == \
+            HTTPStatus.BAD_REQUEST
+        assert self.server.respond('GET', r'/query?q=/(\w+\s?)*\d/')[0] == HTTPStatus.BAD_REQUEST
+
+    def test_server_slow_searches_shouldfail(self, monkeypatch):
+        """
+        Checks that regex and ranked searches run off the event loop and are
+        answered with 503 when they take too long, and that an unexpected
+        error is answered with 500.
+        """
+        server = ConcordanceServer(service)
+        assert server.slow('/query?q=/^And/') and server.slow('/query?q=God&ranked=1')
+        assert not server.slow('/query?q=God') and not server.slow('/word?word=/God/')
+        assert asyncio.run(server.answer('GET', '/query?q=/God/'))[0] == HTTPStatus.OK
+
+        monkeypatch.setattr('server.SEARCH_TIMEOUT', 0.05)
+        server.routes['/query'] = lambda params: time.sleep(0.5)
+        assert asyncio.run(server.answer('GET', '/query?q=/God/'))[0] == \
+            HTTPStatus.SERVICE_UNAVAILABLE
+        server.routes['/word'] = lambda params: 1 / 0
+        assert server.respond('GET', '/word?word=God')[0] == HTTPStatus.INTERNAL_SERVER_ERROR
+
+    def test_server_connections_shouldpass(self):
+        """
+        Checks that many connections at once each get their own answers over
+        kept-alive connections.
+        """
+        async def fetch(port, words):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            counts = []
+            for word in words:
+                writer.write(f"GET /word?word={word} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+                counts.append(json.loads(await reader.readexactly(length))['count'])
+            writer.close()
+            return counts
+
+        async def run():
+            server = ConcordanceServer(service, port=0)
+            await server.start()
+            async with server.server:
+                return await asyncio.gather(*(fetch(server.port, ['earth', 'god', 'selah'])
+                                              for _ in range(200)))
+
+        assert asyncio.run(run()) == [[3, 2, 0]] * 200
@@ -37,7 +37,8 @@ book_verse_list = config.get('book', 'verse_list')
 
 # Get the scraper dictionary results
 html_path = Path.joinpath(Path.cwd().parent, 'ScrapeText', 'bible.html')
-bible_dict = ScrapeHTMLBible(source, file_path=html_path).convert_to_dict()
+scraper = ScrapeHTMLBible(source, file_path=html_path)
+bible_dict = scraper.convert_to_dict()
 
 # Get the verified number of verses dictionary from the Excel file
 filepath = Path.joinpath(Path.cwd(), "bible verses.xlsx")
@@ -142,3 +143,20 @@ class TestBibleDict:
         were copied.
         """
         assert input == expected
+
+
+class TestStreamParser:
+    """
+    This class tests that the streaming parser scrapes exactly the same text as
+    beautiful soup.
+    """
+
+    def test_stream_scraped_text_shouldpass(self):
+        """
+        Scrapes the same source with the streaming parser and compares the
+        books, their order and every paragraph.
+        """
+        stream_scraper = ScrapeHTMLBible(source, file_path=html_path, parser='stream')
+        stream_scraper.convert_to_dict()
+        assert list(stream_scraper.scraped_text.keys()) == list(scraper.scraped_text.keys())
+        assert stream_scraper.scraped_text == scraper.scraped_text
@@ -0,0 +1,518 @@
+"""
+This module uses pytest to check the search indexes in the Concordance package
+that sit on top of the concordance. The made up Bible in fixture_bible is
+used, with a few more verses, so the tests don't need the html document.
+"""
+
+
+import pytest
+
+from Concordance.prefix import PrefixIndex
+from Concordance.phrase import PhraseSearch, build_positions, is_phrase_query
+from Concordance.boolean import BooleanSearch, is_query
+from Concordance.postings import gallop, intersect, union, difference
+from Concordance.fuzzy import FuzzyIndex, edit_distance
+from Concordance.stems import StemIndex, build_stem_index
+from Concordance.trigram import TrigramIndex, build_trigram_index, regex_query, \
+    parse_regex_query
+import re
+from Concordance.ranking import BM25Index, build_verse_lengths, build_document_frequencies, \
+    query_words
+from Concordance.book_words import BookWords, book_slice
+from Concordance.facets import Facets, facet_offsets
+from Testing import fixture_bible
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+# Genesis 5:3 and John are added to the shared Bible for the begat, son and
+# begotten searches
+bible_dict = {
+    **fixture_bible.bible_dict,
+    'Genesis': {**fixture_bible.bible_dict['Genesis'],
+                '5:3': 'And Adam lived an hundred and thirty years, and begat a son.'},
+    'John': {'1:14': 'And the Word was made flesh, the only begotten of the Father.',
+             '3:16': 'For God so loved the world, that he gave his only begotten Son.'},
+}
+summary_dict, verse_table, concordance = fixture_bible.build_dictionaries(bible_dict)
+positions = build_positions(bible_dict)
+testaments = {'Old Testament': ['Genesis'],
+              'New Testament': ['Matthew', 'Song of Songs', 'John']}
+
+# The made up Bible has no archaic forms, so the stems get their own postings
+forms_concordance = {'say': [1], 'saith': [0, 2], 'said': [3, 3], 'believe': [4],
+                     'believeth': [2, 5], 'believest': [5], 'cometh': [1], 'come': [0],
+                     'runneth': [1], 'run': [2], 'carrieth': [3], 'carry': [4],
+                     'for': [1], 'forest': [6], 'be': [0], 'beast': [2], 'priest': [7],
+                     'hath': [8]}
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestPrefixIndex:
+    """
+    This class tests the completions used for type-ahead search.
+    """
+    prefix_index = PrefixIndex(concordance)
+
+    def test_prefix_complete_shouldpass(self):
+        """
+        Checks that every word starting with the prefix is returned, most
+        common first, with the number of times it occurs.
+        """
+        assert self.prefix_index.complete('beg') == [('begat', 3), ('begotten', 2),
+                                                     ('beginning', 1)]
+
+    def test_prefix_limit_shouldpass(self):
+        """
+        Checks that the completions are cut off at the limit and that upper
+        case and spaces in the prefix are ignored.
+        """
+        assert self.prefix_index.complete(' BEG', limit=1) == [('begat', 3)]
+
+    def test_prefix_count_shouldpass(self):
+        """
+        Checks the count of a word against the length of its postings.
+        """
+        assert self.prefix_index.count('the') == len(concordance['the'])
+
+    def test_prefix_missing_shouldfail(self):
+        """
+        Checks that a prefix no word starts with and an empty prefix return
+        nothing.
+        """
+        assert self.prefix_index.complete('xyz') == []
+        assert self.prefix_index.complete('') == []
+        assert self.prefix_index.count('xyz') == 0
+
+
+class TestPhraseSearch:
+    """
+    This class tests phrase and NEAR queries over the word positions.
+    """
+    phrase_search = PhraseSearch(concordance, positions)
+
+    def test_phrase_positions_shouldpass(self):
+        """
+        Checks that the positions line up with the concordance.
+        """
+        for word, verses in concordance.items():
+            assert len(positions[word]) == len(verses)
+
+    def test_phrase_search_shouldpass(self):
+        """
+        Checks that a quoted phrase finds only the verses with the words in
+        that order.
+        """
+        search = self.phrase_search.search
+        assert search('"the earth"').tolist() == [0, 1, 2]
+        assert search('"only begotten"').tolist() == [7, 8]
+        assert search('"begotten only"').tolist() == []
+        assert search('"Isaac begat Jacob"').tolist() == [5]
+
+    def test_phrase_near_shouldpass(self):
+        """
+        Checks that NEAR finds words within the distance in either order.
+        """
+        search = self.phrase_search.search
+        assert search('god NEAR/3 son').tolist() == []
+        assert search('son NEAR/12 god').tolist() == [8]
+        assert search('begat NEAR/2 isaac').tolist() == [5]
+        assert search('isaac NEAR/1 isaac').tolist() == []
+        assert search('isaac NEAR/2 isaac').tolist() == [5]
+
+    def test_phrase_query_shouldpass(self):
+        """
+        Checks which queries are treated as phrase queries.
+        """
+        assert is_phrase_query('"grace of God"')
+        assert is_phrase_query('love NEAR/3 neighbour')
+        assert not is_phrase_query('love near neighbour')
+        assert not is_phrase_query('grace')
+
+    def test_phrase_missing_shouldfail(self):
+        """
+        Checks that a phrase with a word that isn't in the concordance finds
+        nothing.
+        """
+        assert self.phrase_search.search('"the selah"').tolist() == []
+        assert self.phrase_search.search('selah NEAR the').tolist() == []
+
+
+class TestPostings:
+    """
+    This class tests combining sorted postings, both with a linear pass and by
+    galloping when one side is much longer.
+    """
+    evens = list(range(0, 400, 2))
+    threes = list(range(0, 400, 3))
+
+    def test_postings_gallop_shouldpass(self):
+        """
+        Checks that galloping finds the same index as a binary search from
+        every starting point.
+        """
+        for target in range(-1, 402):
+            for low in (0, 50, 199):
+                expected = max(low, sum(value < target for value in self.evens))
+                assert gallop(self.evens, target, low) == expected
+
+    @pytest.mark.parametrize("short", [[0, 6, 7, 150, 398, 399], list(range(0, 400, 3))])
+    def test_postings_combine_shouldpass(self, short):
+        """
+        Checks intersect, union and difference against sets for a short side
+        that gallops and one that doesn't.
+        """
+        assert intersect(short, self.evens).tolist() == sorted(set(short) & set(self.evens))
+        assert intersect(self.evens, short).tolist() == sorted(set(short) & set(self.evens))
+        assert union(short, self.evens).tolist() == sorted(set(short) | set(self.evens))
+        assert difference(short, self.evens).tolist() == sorted(set(short) - set(self.evens))
+        assert difference(self.evens, short).tolist() == sorted(set(self.evens) - set(short))
+
+
+class TestBooleanSearch:
+    """
+    This class tests boolean queries over the concordance.
+    """
+    boolean_search = BooleanSearch(concordance, PhraseSearch(concordance, positions),
+                                   len(verse_table))
+
+    def test_boolean_operators_shouldpass(self):
+        """
+        Checks AND, OR, NOT and two words next to each other.
+        """
+        search = self.boolean_search.search
+        assert search('begat AND isaac').tolist() == [5]
+        assert search('begat isaac').tolist() == [5]
+        assert search('begat OR begotten').tolist() == [3, 5, 7, 8]
+        assert search('begat NOT isaac').tolist() == [3]
+        assert search('begat AND NOT isaac').tolist() == [3]
+        assert search('NOT the').tolist() == [3, 5]
+
+    def test_boolean_precedence_shouldpass(self):
+        """
+        Checks that AND binds tighter than OR, that parentheses change that,
+        and that phrases and NEAR can be used as terms.
+        """
+        search = self.boolean_search.search
+        assert search('isaac OR only AND son').tolist() == [5, 8]
+        assert search('(isaac OR only) AND son').tolist() == [8]
+        assert search('"only begotten" NOT son').tolist() == [7]
+        assert search('god NEAR/2 created OR jacob').tolist() == [0, 5]
+
+    def test_boolean_query_shouldpass(self):
+        """
+        Checks which searches are run as queries.
+        """
+        assert is_query('faith AND works')
+        assert is_query('"grace"')
+        assert not is_query('grace')
+
+    @pytest.mark.parametrize("query", ['begat AND', '(begat OR isaac', 'begat )',
+                                       'OR begat', '"only begotten" NEAR son', ''])
+    def test_boolean_invalid_shouldfail(self, query):
+        """
+        Checks that queries that can't be parsed raise ValueError.
+        """
+        with pytest.raises(ValueError):
+            self.boolean_search.search(query)
+
+
+class TestFuzzyIndex:
+    """
+    This class tests the did you mean suggestions for missing words.
+    """
+    fuzzy_index = FuzzyIndex(PrefixIndex(concordance))
+
+    @pytest.mark.parametrize("first, second, distance", [('begat', 'begat', 0),
+                                                         ('begta', 'begat', 1),
+                                                         ('begot', 'begotten', 3),
+                                                         ('jacbo', 'jacob', 1),
+                                                         ('', 'son', 3)])
+    def test_fuzzy_distance_shouldpass(self, first, second, distance):
+        """
+        Checks the edit distance, where swapping two letters counts as one.
+        """
+        assert edit_distance(first, second) == distance
+        assert edit_distance(second, first) == distance
+
+    def test_fuzzy_suggest_shouldpass(self):
+        """
+        Checks that the closest words come first and that more common words
+        come first at the same distance.
+        """
+        assert self.fuzzy_index.suggest('begoten') == [('begotten', 1, 2)]
+        assert self.fuzzy_index.suggest('Abrahm') == [('abraham', 1, 1)]
+        assert self.fuzzy_index.suggest('heven') == [('heaven', 1, 1), ('heavens', 2, 1)]
+        assert self.fuzzy_index.suggest('tha', limit=2) == [('the', 1, 16), ('that', 1, 1)]
+
+    def test_fuzzy_missing_shouldfail(self):
+        """
+        Checks that words with nothing close and the empty string get no
+        suggestions, and that a word isn't suggested for itself.
+        """
+        assert self.fuzzy_index.suggest('xyzzyq') == []
+        assert self.fuzzy_index.suggest('') == []
+        assert 'begat' not in [word for word, _, _ in self.fuzzy_index.suggest('begat')]
+
+
+class TestStemIndex:
+    """
+    This class tests looking up a word by its stem to find its archaic forms.
+    """
+    stem_index = StemIndex(forms_concordance)
+
+    @pytest.mark.parametrize("word, word_stem", [('saith', 'say'), ('believeth', 'believe'),
+                                                 ('cometh', 'come'), ('runneth', 'run'),
+                                                 ('carrieth', 'carry'), ('hath', 'have'),
+                                                 ('believest', 'believe'), ('come', 'come')])
+    def test_stem_forms_shouldpass(self, word, word_stem):
+        """
+        Checks that the -eth and -est forms and the forms in the table get the
+        stem.
+        """
+        assert self.stem_index.stem(word) == word_stem
+
+    def test_stem_lookup_shouldpass(self):
+        """
+        Checks that every form of a word is found from any of them with the
+        postings merged in order.
+        """
+        assert self.stem_index.forms('Say') == ['said', 'saith', 'say']
+        assert self.stem_index.lookup('saith').tolist() == [0, 1, 2, 3, 3]
+        assert self.stem_index.lookup('believe').tolist() == [2, 4, 5, 5]
+        assert self.stem_index.lookup('have').tolist() == [8]
+
+    def test_stem_precomputed_shouldpass(self):
+        """
+        Checks that the stem index built ahead of time gives the same results.
+        """
+        stem_postings, stem_forms = build_stem_index(forms_concordance)
+        precomputed = StemIndex(forms_concordance, stem_postings, stem_forms)
+        for word in forms_concordance:
+            assert list(precomputed.lookup(word)) == list(self.stem_index.lookup(word))
+
+    @pytest.mark.parametrize("word", ['forest', 'beast', 'priest', 'for'])
+    def test_stem_not_inflected_shouldfail(self, word):
+        """
+        Checks that words that only look like -est forms, or have no other
+        forms, stay on their own.
+        """
+        assert self.stem_index.forms(word) == [word]
+        assert list(self.stem_index.lookup(word)) == forms_concordance[word]
+
+
+class TestTrigramIndex:
+    """
+    This class tests that the trigram index finds the same verses as running
+    the regex over every verse.
+    """
+    trigram_index = TrigramIndex(bible_dict, verse_table)
+
+    def test_trigram_query_shouldpass(self):
+        """
+        Checks the trigrams that have to be in a match of the regex.
+        """
+        assert regex_query(r'\bGod\b') == 'god'
+        assert regex_query(r'[Ss]on') == 'son'
+        assert regex_query(r'Isaac|Jacob') == ('or', [('and', ['aac', 'isa', 'saa']),
+                                                      ('and', ['aco', 'cob', 'jac'])])
+        assert regex_query(r'the (earth|heaven)s?') is not None
+        assert regex_query(r'.*') is None
+        assert regex_query(r'go?d') is None
+
+    @pytest.mark.parametrize("pattern, flags", [(r'\bthe (earth|heavens?)\b', 0),
+                                                (r'only begotten (Son|of)', 0),
+                                                (r'b.gat', 0), (r'^And', 0),
+                                                (r'ABRAHAM', re.IGNORECASE),
+                                                (r'(Isaac|Jacob)[.;]', 0), (r'x?', 0),
+                                                (r'[A-Z]\w+ (begat|lived)', 0)])
+    def test_trigram_search_shouldpass(self, pattern, flags):
+        """
+        Checks that only the verses that match are returned and that the
+        candidates include all of them.
+        """
+        regex = re.compile(pattern, flags)
+        expected = [ordinal for ordinal in range(len(verse_table))
+                    if regex.search(self.trigram_index.verse_text(ordinal))]
+        assert self.trigram_index.search(pattern, flags).tolist() == expected
+        assert set(expected) <= set(self.trigram_index.candidates(pattern, flags))
+
+    def test_trigram_narrows_shouldpass(self):
+        """
+        Checks that a regex with a rare string only checks a few verses.
+        """
+        assert self.trigram_index.candidates(r'Abraham|Solomon').tolist() == [5, 6]
+        assert build_trigram_index(bible_dict)['the'].tolist() == [0, 1, 2, 4, 6, 7, 8]
+
+    def test_trigram_regex_query_shouldpass(self):
+        """
+        Checks which searches are regex searches.
+        """
+        assert parse_regex_query('/Lord (God|of)/') == ('Lord (God|of)', 0)
+        assert parse_regex_query(' /lord/i ') == ('lord', re.IGNORECASE)
+        assert parse_regex_query('lord') is None
+        assert parse_regex_query('//') is None
+
+    def test_trigram_invalid_shouldfail(self):
+        """
+        Checks that an invalid regex, or one with a repeat inside a repeat
+        that could take forever, raises re.error.
+        """
+        with pytest.raises(re.error):
+            self.trigram_index.search(r'(Lord')
+        with pytest.raises(re.error):
+            self.trigram_index.search(r'(\w+\s?)*\d')
+        assert self.trigram_index.search(r'(\w{2})* God') is not None
+        with pytest.raises(re.error):
+            self.trigram_index.search(r'((\w+)?,)+')
+
+    @pytest.mark.parametrize('pattern', [r'the( \w+)? earth', r'(\w+ )?God', r'(\w+,)?',
+                                         r'(begat (\w+)?)'])
+    def test_trigram_optional_shouldpass(self, pattern):
+        """
+        Checks that an optional group around a repeat, which only matches
+        once, is still searched.
+        """
+        regex = re.compile(pattern)
+        expected = [ordinal for ordinal in range(len(verse_table))
+                    if regex.search(self.trigram_index.verse_text(ordinal))]
+        assert expected
+        assert self.trigram_index.search(pattern).tolist() == expected
+
+
+class TestBM25:
+    """
+    This class tests the ranked search.
+    """
+    bm25_index = BM25Index(bible_dict, concordance)
+
+    def test_bm25_tables_shouldpass(self):
+        """
+        Checks the number of words in each verse and the number of verses
+        each word is in, which only counts a verse once.
+        """
+        assert build_verse_lengths(bible_dict).tolist() == [10, 17, 8, 12, 12, 7, 8, 12, 13]
+        frequencies = build_document_frequencies(concordance)
+        assert frequencies['and'] == 6
+        assert frequencies['begat'] == 2
+
+    def test_bm25_order_shouldpass(self):
+        """
+        Checks that a verse with more of the words scores higher, and that a
+        word in fewer verses counts for more.
+        """
+        results = self.bm25_index.search('God begotten')
+        assert [ordinal for ordinal, _ in results] == [8, 0, 7]
+        assert results[0][1] > results[1][1] > results[2][1] > 0
+        assert self.bm25_index.idf('begotten') > self.bm25_index.idf('the')
+
+    def test_bm25_top_k_shouldpass(self):
+        """
+        Checks that only the best k verses are returned, and that ties are in
+        verse order.
+        """
+        full = self.bm25_index.search('the earth', k=10)
+        assert self.bm25_index.search('the earth', k=2) == full[:2]
+        scores = [score for _, score in full]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_bm25_operators_shouldpass(self):
+        """
+        Checks that query operators aren't scored as words.
+        """
+        assert query_words('"God so" AND NOT loved NEAR/3 world') == \
+            ['god', 'so', 'loved', 'world']
+        assert self.bm25_index.search('God OR begotten') == self.bm25_index.search('God begotten')
+
+    def test_bm25_missing_shouldfail(self):
+        """
+        Checks that words that aren't in the concordance find nothing.
+        """
+        assert self.bm25_index.search('selah') == []
+        assert self.bm25_index.search('') == []
+
+
+class TestBookWords:
+    """
+    This class tests the words of a book sliced from the concordance.
+    """
+
+    def test_book_words_counts_shouldpass(self):
+        """
+        Checks that the counts and postings of every book match the ones
+        gathered by summarizing the book.
+        """
+        for book_name, summary in summary_dict.items():
+            book_words = BookWords(concordance, verse_table, book_name)
+            assert dict(book_words) == summary['words_count']
+            for word, verse_list in summary['words_list'].items():
+                assert [verse_table.key(ordinal) for ordinal in book_words.postings(word)] == \
+                    verse_list
+                assert book_words[word] == len(verse_list)
+
+    def test_book_words_slice_shouldpass(self):
+        """
+        Checks that the slice covers the postings from start up to end.
+        """
+        assert book_slice([0, 2, 2, 5, 9], 2, 6) == (1, 4)
+        assert book_slice([0, 2, 2, 5, 9], 6, 9) == (4, 4)
+
+    def test_book_words_missing_shouldfail(self):
+        """
+        Checks that words not in the book, or not in the Bible, aren't found.
+        """
+        book_words = BookWords(concordance, verse_table, 'Matthew')
+        assert 'god' not in book_words and 'selah' not in book_words
+        with pytest.raises(KeyError):
+            book_words.postings('god')
+        with pytest.raises(KeyError):
+            BookWords(concordance, verse_table, 'Exodus')
+
+
+class TestFacets:
+    """
+    This class tests counting and filtering the results by book and
+    testament.
+    """
+
+    def test_facets_counts_shouldpass(self):
+        """
+        Checks that the counts match counting the book of every result.
+        """
+        for word in ('the', 'begat', 'god', 'only'):
+            facets = Facets(concordance[word], verse_table, testaments)
+            counts = {}
+            for ordinal in concordance[word]:
+                counts[verse_table.book(ordinal)] = counts.get(verse_table.book(ordinal), 0) + 1
+            assert dict(facets.books()) == counts
+            assert sum(facets.testaments().values()) == len(concordance[word])
+        assert facet_offsets([0, 1, 4, 6], verse_table.book_starts).tolist() == [0, 2, 3, 4, 4]
+
+    def test_facets_filter_shouldpass(self):
+        """
+        Checks that filtering keeps only the results in the book or testament,
+        in the same order and with their scores.
+        """
+        facets = Facets(concordance['the'], verse_table, testaments)
+        assert facets.filter('Matthew') == ([4, 4, 4], None)
+        assert facets.filter('New Testament')[0] == [4, 4, 4, 6, 7, 7, 7, 8]
+        assert facets.filter() == (concordance['the'], None)
+        ranked = Facets([7, 0, 8, 2], verse_table, testaments, scores=[4.0, 3.0, 2.0, 1.0])
+        assert ranked.books() == [('Genesis', 2), ('John', 2)]
+        assert ranked.filter('John') == ([7, 8], [4.0, 2.0])
+
+    def test_facets_missing_shouldfail(self):
+        """
+        Checks that a book that isn't in the Bible can't be filtered to and
+        that no results give no facets.
+        """
+        facets = Facets([], verse_table, testaments)
+        assert facets.books() == [] and facets.testaments() == {'Old Testament': 0,
+                                                                 'New Testament': 0}
+        with pytest.raises(KeyError):
+            facets.filter('Exodus')
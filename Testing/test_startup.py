@@ -0,0 +1,94 @@
+"""
+This module uses pytest to check the messages the startup handles from its
+worker thread. A stub stands in for the window and the lookup frames so the
+tests run without a display.
+"""
+
+
+from GUI import startup
+from GUI.startup import Startup
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+class StubRoot:
+    """
+    Records the status bar text and the callbacks the startup schedules
+    instead of drawing anything.
+    """
+
+    def __init__(self):
+        self.statuses = []
+        self.idle = []
+
+    def set_status(self, text):
+        self.statuses.append(text)
+
+    def set_dictionaries(self, *dictionaries):
+        pass
+
+    def set_concordance(self, concordance, indexes):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def after(self, delay, callback, *args):
+        pass
+
+    def after_idle(self, callback, *args):
+        self.idle.append((callback, args))
+
+
+class StubLookup:
+    def __init__(self, *args):
+        pass
+
+    def initialize(self):
+        pass
+
+    def set_ready(self, ready):
+        pass
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestStartup:
+    """
+    This class tests the status bar as the Bible and the concordance arrive.
+    """
+
+    def test_startup_first_run_shouldpass(self, monkeypatch):
+        """
+        Handles the Bible, a progress message and the concordance in one poll,
+        like the first run does once the dictionaries are built, and checks
+        that the time to interactive is recorded first and the report stays
+        in the status bar.
+        """
+        monkeypatch.setattr(startup, 'VerseLookup', StubLookup)
+        monkeypatch.setattr(startup, 'WordLookup', StubLookup)
+        root = StubRoot()
+        app = Startup(root, started=0)
+        app.messages.put(('bible', ({}, {}, {}, None, None)))
+        app.messages.put(('progress', 'Loading the concordance'))
+        app.messages.put(('concordance', ({}, {})))
+        app.poll()
+        for callback, args in root.idle:
+            callback(*args)
+        assert 0 < app.timings['interactive'] <= app.timings['search']
+        assert root.statuses[-1].startswith('Interactive in ')
+        assert not root.statuses[-1].startswith('Interactive in 0.00s')
+
+    def test_startup_error_shouldfail(self):
+        """
+        Checks that an error from the worker is shown in the status bar.
+        """
+        root = StubRoot()
+        app = Startup(root, started=0)
+        app.messages.put(('error', FileNotFoundError('kjv_concordance.sqlite')))
+        app.poll()
+        assert root.statuses == ["Couldn't load the concordance: kjv_concordance.sqlite"]
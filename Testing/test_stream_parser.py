@@ -0,0 +1,66 @@
+"""
+This module uses pytest to check that the streaming parser scrapes the same
+text as beautiful soup. It uses the small html document stream_parser.html in
+this directory, which has an unclosed p, a stray </p>, br elements and
+entities, so the tests run without the network or the downloaded Bible.
+"""
+
+
+from pathlib import Path
+import pytest
+
+from ScrapeText.scraper import ScrapeHTMLBible
+from ScrapeText.stream_parser import BibleStreamParser, read_text_chunks
+
+
+##############################################################################
+# Set up the variables
+##############################################################################
+html_path = Path(__file__).with_name('stream_parser.html')
+soup_text = ScrapeHTMLBible('file', file_path=html_path, parser='soup',
+                            cache_dir=None).scrape()
+
+
+##############################################################################
+# Tests
+##############################################################################
+
+
+class TestStreamParser:
+    """
+    This class tests the streaming parser against beautiful soup's html5lib
+    builder.
+    """
+
+    def test_stream_scraped_text_shouldpass(self):
+        """
+        Scrapes the document with both parsers and compares the books, their
+        order and every paragraph.
+        """
+        stream_text = ScrapeHTMLBible('file', file_path=html_path, parser='stream',
+                                      cache_dir=None).scrape()
+        assert list(stream_text) == ['Genesis', 'Matthew']
+        assert stream_text == soup_text
+
+    @pytest.mark.parametrize('chunk_size', [1, 7, 64])
+    def test_stream_chunks_shouldpass(self, chunk_size):
+        """
+        Checks that tags and entities split across chunks don't change the
+        paragraphs.
+        """
+        with open(html_path, encoding='UTF-8') as html_file:
+            pairs = list(BibleStreamParser().parse(read_text_chunks(html_file, chunk_size)))
+        genesis = [text for book_name, text in pairs
+                   if book_name == 'The First Book of Moses: Called Genesis' and text is not None]
+        assert genesis == soup_text['Genesis']
+
+    def test_stream_unclosed_paragraph_shouldpass(self):
+        """
+        Checks that a p is ended by the next p, a heading and the end of its
+        chapter, and that the book after it is still found.
+        """
+        html = ('<div class="chapter"><h2>Genesis</h2><p>1:1 one<p>1:2 two<h3>day</h3>'
+                '<p>1:3 three</div><div class="chapter"><h2>Matthew</h2><p>1:1 four</p></div>')
+        pairs = list(BibleStreamParser().parse([html]))
+        assert pairs == [('Genesis', None), ('Genesis', '1:1 one'), ('Genesis', '1:2 two'),
+                         ('Genesis', '1:3 three'), ('Matthew', None), ('Matthew', '1:1 four')]
@@ -0,0 +1,168 @@
+"""
+This module looks up references and words in bulk from the command line. Each
+line of the input is either a reference like John 3:16 or Gen 1:1-2:3, which
+is looked up as a verse or passage, or anything that can be typed in the word
+search, which is looked up as a word or query and counted. One result is
+written for every line as a line of JSON or a row of CSV.
+
+The input is read and the results written a batch of lines at a time, so only
+one batch is ever held in memory however long the input is, and the output
+can be read while it is being written. The dictionaries are loaded once, the
+same way as for the app, and the lines per second are printed to stderr at
+the end.
+
+    python cli.py references.txt --format csv > verses.csv
+    cat words.txt | python cli.py --references
+"""
+
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from Concordance.query import QueryService
+from Concordance.loader import dictionaries_exist, BACKENDS
+from ScrapeText.create_dictionaries import create_dictionaries
+
+
+BATCH_SIZE = 1000
+FORMATS = ('jsonl', 'csv')
+CSV_COLUMNS = ['input', 'type', 'reference', 'text', 'count', 'references', 'error']
+
+
+def read_batches(lines, batch_size=BATCH_SIZE):
+    """
+    Yields lists of up to batch_size stripped lines, skipping blank lines.
+    """
+    lines = (line.strip() for line in lines)
+    lines = (line for line in lines if line)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def lookup(service: QueryService, line: str, references=False, all_forms=False) -> dict:
+    """
+    Returns the result for one line of input. A reference gives the verse
+    text, or the text of every verse of a passage, and anything else the
+    number of verses found, with their references too if references is true.
+    """
+    try:
+        first, end = service.reference_parser.parse(line)
+    except ValueError:
+        pass
+    except KeyError as error:
+        return {'input': line, 'type': 'verse', 'error': error.args[0]}
+    else:
+        if end - first == 1:
+            return dict(input=line, type='verse', **service.verse_dict(first))
+        return {'input': line, 'type': 'passage', 'count': end - first,
+                'verses': service.verses(first, end)}
+
+    result = service.search(line, all_forms)
+    record = {'input': line, 'type': 'search', 'count': len(result)}
+    if result.error:
+        record['error'] = result.message
+    if references:
+        record['references'] = [service.verse_table.reference(ordinal)
+                                for ordinal in result.results]
+    return record
+
+
+class JsonLinesWriter:
+    def __init__(self, output):
+        """
+        Writes every result as a line of JSON.
+        """
+        self.output = output
+
+    def write(self, records: list[dict]):
+        self.output.write(''.join(f"{json.dumps(record)}\n" for record in records))
+
+
+class CsvWriter:
+    def __init__(self, output):
+        """
+        Writes every result as a row of CSV, with the header first and the
+        references of a search joined by semicolons. A passage has its
+        references joined the same way and its text joined by spaces.
+        """
+        self.writer = csv.DictWriter(output, CSV_COLUMNS, lineterminator='\n')
+        self.writer.writeheader()
+
+    def write(self, records: list[dict]):
+        for record in records:
+            if 'verses' in record:
+                verses = record.pop('verses')
+                record = dict(record, references=[verse['reference'] for verse in verses],
+                              text=' '.join(verse['text'] for verse in verses))
+            if 'references' in record:
+                record = dict(record, references=';'.join(record['references']))
+            self.writer.writerow(record)
+
+
+def run(service: QueryService, lines, output, output_format='jsonl', batch_size=BATCH_SIZE,
+        references=False, all_forms=False) -> int:
+    """
+    Looks up every line and writes the results to output a batch at a time.
+    Returns the number of lines looked up.
+    """
+    writer = CsvWriter(output) if output_format == 'csv' else JsonLinesWriter(output)
+    total = 0
+    for batch in read_batches(lines, batch_size):
+        writer.write([lookup(service, line, references, all_forms) for line in batch])
+        output.flush()
+        total += len(batch)
+    return total
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Look up references and words in bulk.')
+    arguments.add_argument('input', nargs='?', default='-',
+                           help='file with one reference or word per line (default: stdin)')
+    arguments.add_argument('--output', default='-', help='file to write to (default: stdout)')
+    arguments.add_argument('--format', choices=FORMATS, default='jsonl',
+                           help='jsonl or csv (default: jsonl)')
+    arguments.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                           help=f"lines looked up between writes (default: {BATCH_SIZE})")
+    arguments.add_argument('--references', action='store_true',
+                           help='list the references of every word or query, not just the count')
+    arguments.add_argument('--all-forms', action='store_true',
+                           help='include the archaic forms of single words')
+    arguments.add_argument('--backend', choices=BACKENDS, default=None,
+                           help='where to load the dictionaries from (default: the first that exists)')
+    options = arguments.parse_args()
+
+    start = time.perf_counter()
+    directory = Path.cwd()
+    if not dictionaries_exist(directory):
+        create_dictionaries(directory, database=options.backend == 'sqlite')
+    service = QueryService.load(directory, options.backend)
+    loaded = time.perf_counter()
+
+    input_file = sys.stdin if options.input == '-' else open(options.input, 'r', encoding='utf-8')
+    output_file = sys.stdout if options.output == '-' else \
+        open(options.output, 'w', encoding='utf-8', newline='')
+    try:
+        count = run(service, input_file, output_file, options.format, options.batch_size,
+                    options.references, options.all_forms)
+    except BrokenPipeError:
+        # The output was closed early, like when it is piped to head, so stop
+        # quietly without writing anything else to it
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    elapsed = time.perf_counter() - loaded
+    print(f"Loaded in {loaded - start:.2f}s. Looked up {count} lines in {elapsed:.2f}s "
+          f"({count / elapsed if elapsed else 0:.0f} lines/s)", file=sys.stderr)
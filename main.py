@@ -1,64 +1,37 @@
 """
 This module serves as the main program for the app. It contains the main
-function which reads the json files, creates a testament dictionary, and then
-creates the main window and passes it all the dictionaries. When called as the
-main program it first checks if a json concordance exists. If not it runs the
-setup modules to scrape the html and create the dictionaries and then calls the
-main function.
+function which creates the main window and starts loading the dictionaries
+(from the binary corpus file or the SQLite database if one exists, otherwise
+from the json files). The verse lookup is shown as soon as the Bible text is
+loaded and the concordance is loaded in the background, with the word search
+turned on once it is ready.
+If the dictionaries don't exist yet the setup modules are run in the
+background to scrape the html and create them first.
+
+The start time is taken before anything else is imported so that the time to
+interactive reported in the status bar includes the imports.
 """
 
 
-import json
+import time
+STARTED = time.perf_counter()
+
 from pathlib import Path
 from GUI.window import Window
-from GUI.verse_lookup import VerseLookup
-from GUI.word_lookup import WordLookup
-from ScrapeText.create_dictionaries import create_dictionaries
+from GUI.startup import Startup
 
 
-def main():
+def main(directory=Path.cwd(), backend=None):
     """
-    Reads all the json files, converts them to a dictionary, creates the
-    testaments dictionary, and then creates the root window and passes the
-    dictionaries to start the app.
+    Creates the root window, starts loading the dictionaries, the testaments
+    dictionary, the verse table and the search indexes into it from the
+    backend (the first one that exists if None) and then runs the app.
     """
-    # Read the bible json and convert to dictionary
-    bible_path = Path.joinpath(Path.cwd(), 'kjv_bible.json')
-    with open(bible_path, 'r') as bible_file:
-        bible =  json.load(bible_file)
-
-    # Read the summary json and convert to dictionary
-    summary_path = Path.joinpath(Path.cwd(), 'book_summary.json')
-    with open(summary_path, 'r') as summary_file:
-        summary =  json.load(summary_file)
-
-    # Read the concordance and convert to dictionary
-    concordance_path = Path.joinpath(Path.cwd(), 'concordance.json')
-    with open(concordance_path, 'r') as concordance_file:
-        concordance = json.load(concordance_file)
-
-    # Create the testaments dictionary
-    testaments = {}
-    index = list(bible.keys()).index('Matthew')
-    testaments['Old Testament'] = [key for key in list(bible.keys())[:index]]
-    testaments['New Testament'] = [key for key in list(bible.keys())[index:]]
-
-    # Create the window to start the app
-    root = Window(bible, summary, concordance, testaments)
-    verse_lookup = VerseLookup(root)
-    verse_lookup.initialize()
-    word_lookup = WordLookup(root, verse_lookup)
-    word_lookup.initialize()
+    root = Window()
+    startup = Startup(root, directory, STARTED, backend)
+    startup.start()
     root.initialize()
 
 
 if __name__ == '__main__':
-    if Path.exists(Path.joinpath(Path.cwd(), 'concordance.json')):
-        main()
-    else:
-        directory = Path.cwd()
-        create_dictionaries(directory)
-        main()
-
-
-
+    main()
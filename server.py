@@ -0,0 +1,318 @@
+"""
+This module serves the concordance over http so that other processes can make
+the same verse and word lookups as the app. It is a small asyncio server that
+only answers GET requests with JSON, and every request is answered from one
+QueryService that is loaded once and shared by all the connections. The
+lookups only read the indexes and are answered on the event loop between
+reads, so thousands of connections can be open at once without a thread each.
+Regex and ranked searches can take much longer, so they run on a few worker
+threads instead and are answered with 503 if they take more than
+SEARCH_TIMEOUT seconds, leaving the event loop free for the other requests.
+Connections are kept alive so a client can make many requests over one.
+
+The endpoints take their parameters in the query string:
+
+    /verse      book, chapter, verse
+    /range      ref, a reference like Gen 1:1-2:3 or Rom 8, or book, chapter,
+                start, end and end_chapter if the range runs into another
+                chapter
+    /word       word, all_forms=1 to include its archaic forms
+    /query      q, anything that can be typed in the word search, and
+                ranked=1 for the best verses first
+
+/word and /query return the number of verses found and the references of a
+page of them, from offset (0) up to limit (100) of them. facets=1 adds the
+number found in each testament and book.
+
+Run it from the directory with the corpus or json files:
+
+    python server.py --port 8321
+"""
+
+
+import argparse
+import asyncio
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from Concordance.query import QueryService
+from Concordance.loader import dictionaries_exist, BACKENDS
+from Concordance.trigram import parse_regex_query
+from ScrapeText.create_dictionaries import create_dictionaries
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8321
+PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+MAX_HEADER_SIZE = 16384
+KEEP_ALIVE_TIMEOUT = 15
+BACKLOG = 4096
+SEARCH_WORKERS = 4
+SEARCH_TIMEOUT = 5
+
+
+class HttpError(Exception):
+    """
+    Raised by an endpoint to answer with an error status and message.
+    """
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def required(params: dict, name: str) -> str:
+    """
+    Returns a parameter of the query string. Raises HttpError if it is missing.
+    """
+    value = params.get(name, '').strip()
+    if not value:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"Missing the {name} parameter")
+    return value
+
+
+def integer(params: dict, name: str, default=None) -> int:
+    """
+    Returns a whole number parameter, or the default if it isn't given.
+    Raises HttpError if it is missing without a default or isn't a number.
+    """
+    if default is not None and name not in params:
+        return default
+    value = required(params, name)
+    if not value.isdecimal():
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"The {name} parameter must be a number")
+    return int(value)
+
+
+def flag(params: dict, name: str) -> bool:
+    """
+    Checks if a yes/no parameter is turned on.
+    """
+    return params.get(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+class ConcordanceServer:
+    def __init__(self, service: QueryService, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Takes the query service to answer the requests with and the address to
+        listen on. Port 0 picks any free port.
+        """
+        self.service = service
+        self.host = host
+        self.port = port
+        self.server = None
+        self.routes = {'/verse': self.verse, '/range': self.verse_range,
+                       '/word': self.word, '/query': self.query}
+        self.executor = ThreadPoolExecutor(SEARCH_WORKERS, thread_name_prefix='search')
+
+    async def start(self):
+        """
+        Starts listening for connections.
+        """
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_SIZE, backlog=BACKLOG)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        """
+        Starts the server and answers requests until it is cancelled.
+        """
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answers the requests on one connection until the client closes it,
+        asks for it to be closed or is idle for too long.
+        """
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  KEEP_ALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                    {'error': 'The request headers are too large'}, False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    await self.send(writer, HTTPStatus.BAD_REQUEST,
+                                    {'error': 'The request line is invalid'}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # Requests are all GETs, but a body still has to be read past
+                # to get to the next request on the connection
+                length = headers.get('content-length', '0')
+                if length.isdecimal() and int(length):
+                    await reader.readexactly(int(length))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' \
+                    else connection == 'keep-alive'
+                status, body = await self.answer(method, target)
+                await self.send(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, status: HTTPStatus, body: dict, keep_alive: bool):
+        """
+        Writes a JSON response.
+        """
+        content = json.dumps(body).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(content)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                     f"\r\n".encode('latin-1') + content)
+        await writer.drain()
+
+    @staticmethod
+    def slow(target: str) -> bool:
+        """
+        Checks if a request is a regex or ranked search, which can take too
+        long to answer on the event loop.
+        """
+        url = urlsplit(target)
+        if url.path.rstrip('/') != '/query':
+            return False
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return flag(params, 'ranked') or parse_regex_query(params.get('q', '')) is not None
+
+    async def answer(self, method: str, target: str) -> tuple[HTTPStatus, dict]:
+        """
+        Returns the status and JSON body for a request, running slow searches
+        on the worker threads. A search that is still running after the
+        timeout is left to finish on its thread, but its worker can't answer
+        anything else until it does.
+        """
+        if not self.slow(target):
+            return self.respond(method, target)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self.respond, method, target), SEARCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'The search took too long'}
+
+    def respond(self, method: str, target: str) -> tuple[HTTPStatus, dict]:
+        """
+        Returns the status and JSON body for a request. An error the endpoint
+        didn't expect is printed and answered with 500 so the client still
+        gets a response.
+        """
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Only GET requests are answered'}
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip('/'))
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {'error': f"There is no {url.path} endpoint"}
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            return HTTPStatus.OK, route(params)
+        except HttpError as error:
+            return error.status, {'error': error.message}
+        except Exception:
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'The request could not be answered'}
+
+    def verse(self, params: dict) -> dict:
+        """
+        Returns the reference and text of a verse.
+        """
+        try:
+            return self.service.verse(required(params, 'book'), integer(params, 'chapter'),
+                                      integer(params, 'verse'))
+        except KeyError as error:
+            raise HttpError(HTTPStatus.NOT_FOUND, error.args[0])
+
+    def verse_range(self, params: dict) -> dict:
+        """
+        Returns the references and text of a range of verses.
+        """
+        try:
+            if 'ref' in params:
+                verses = self.service.passage(required(params, 'ref'))
+            else:
+                end_chapter = integer(params, 'end_chapter') if 'end_chapter' in params else None
+                verses = self.service.verse_range(required(params, 'book'),
+                                                  integer(params, 'chapter'),
+                                                  integer(params, 'start'), integer(params, 'end'),
+                                                  end_chapter)
+        except KeyError as error:
+            raise HttpError(HTTPStatus.NOT_FOUND, error.args[0])
+        except ValueError as error:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(error))
+        return {'count': len(verses), 'verses': verses}
+
+    def word(self, params: dict) -> dict:
+        """
+        Returns a page of the verses a word is in.
+        """
+        result = self.service.word(required(params, 'word'), flag(params, 'all_forms'))
+        return self.page(result, params)
+
+    def query(self, params: dict) -> dict:
+        """
+        Returns a page of the verses that match a query.
+        """
+        result = self.service.search(required(params, 'q'), flag(params, 'all_forms'),
+                                     flag(params, 'ranked'))
+        if result.error:
+            raise HttpError(HTTPStatus.BAD_REQUEST, result.message)
+        return self.page(result, params)
+
+    def page(self, result, params: dict) -> dict:
+        """
+        Returns the page of a search result asked for by offset and limit.
+        """
+        limit = min(integer(params, 'limit', PAGE_LIMIT), MAX_PAGE_LIMIT)
+        return self.service.result_page(result, integer(params, 'offset', 0), limit,
+                                        flag(params, 'facets'))
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description='Serve the concordance over http.')
+    arguments.add_argument('--host', default=DEFAULT_HOST,
+                           help=f"address to listen on (default: {DEFAULT_HOST})")
+    arguments.add_argument('--port', type=int, default=DEFAULT_PORT,
+                           help=f"port to listen on (default: {DEFAULT_PORT})")
+    arguments.add_argument('--backend', choices=BACKENDS, default=None,
+                           help='where to load the dictionaries from (default: the first that exists)')
+    options = arguments.parse_args()
+
+    directory = Path.cwd()
+    if not dictionaries_exist(directory):
+        create_dictionaries(directory, database=options.backend == 'sqlite')
+    service = QueryService.load(directory, options.backend)
+    service.warm()
+    concordance_server = ConcordanceServer(service, options.host, options.port)
+    print(f"Serving the concordance on http://{options.host}:{options.port}")
+    try:
+        asyncio.run(concordance_server.serve_forever())
+    except KeyboardInterrupt:
+        pass